@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+検出結果の表現によるメモリ・処理時間の比較ベンチマーク
+
+検出ごとに5キーの辞書と文字列のコピーを作る従来の方式と、
+範囲とカテゴリ番号のみを保持する Detection による現在の方式を、
+検出数の多いテキストで比較する。両方式の結果が一致することも確認する。
+
+使い方:
+    python benchmarks/bench_detections.py [--hits 2000] [--repeat 20]
+"""
+import sys
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.masking import PersonalInfoMasker
+from src.detection import format_detections
+
+# 1単位あたり電話番号・メール・日付・生年月日の4件を検出するテキスト
+HIT_UNIT = '連絡先は03-1234-5678、user{0}@example.com です。2023年4月{1}日に購入、生年月日は1980年1月1日。'
+
+
+def legacy_mask_with_regex(masker, text):
+    """
+    従来の辞書ベースの検出・重複解決・置換（比較用）
+
+    Args:
+        masker (PersonalInfoMasker): パターンを取得するマスカー
+        text (str): 入力テキスト
+
+    Returns:
+        tuple: (マスキングしたテキスト, マスキングした情報のリスト)
+    """
+    masked_text = text
+    masked_items = []
+    detection_results = []
+
+    for pattern_type, pattern in masker.patterns.items():
+        priority = masker.priorities[pattern_type]
+        for match in list(pattern.finditer(text)):
+            start, end = match.span()
+            detection_results.append({
+                'start': start,
+                'end': end,
+                'type': pattern_type,
+                'text': match.group(0),
+                'priority': priority
+            })
+
+    detection_results.sort(key=lambda x: (x['priority'], -(x['end'] - x['start'])))
+
+    processed_ranges = []
+    final_detections = []
+    for result in detection_results:
+        if any(not (result['end'] <= s or result['start'] >= e) for s, e in processed_ranges):
+            continue
+        processed_ranges.append((result['start'], result['end']))
+        final_detections.append(result)
+
+    final_detections.sort(key=lambda x: x['start'], reverse=True)
+    for detection in final_detections:
+        masked_items.append(f"{detection['type']}:{detection['text']}")
+        masked_text = (masked_text[:detection['start']] + masker.replacements[detection['type']]
+                       + masked_text[detection['end']:])
+
+    return masked_text, masked_items
+
+
+def measure(func, repeat):
+    """
+    処理時間（最良値）とメモリのピーク使用量を計測する
+
+    Args:
+        func (callable): 計測する処理
+        repeat (int): 繰り返し回数
+
+    Returns:
+        tuple: (1回あたりの秒数, ピークメモリ（バイト）)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='検出結果の表現によるメモリ・処理時間の比較')
+    parser.add_argument('--hits', type=int, default=2000, help='テキストに含める検出単位の数（1単位4件）')
+    parser.add_argument('--repeat', type=int, default=20, help='計測の繰り返し回数')
+    args = parser.parse_args()
+
+    masker = PersonalInfoMasker(use_nlp=False)
+    text = ''.join(HIT_UNIT.format(i, i % 28 + 1) for i in range(args.hits))
+
+    legacy = legacy_mask_with_regex(masker, text)
+    masked_text, detections = masker._mask_with_regex(text)
+    assert legacy == (masked_text, format_detections(detections, text, masker.categories)), '結果が一致しません'
+
+    cases = [
+        ('従来（辞書＋文字列）', lambda: legacy_mask_with_regex(masker, text)),
+        ('Detection（範囲のみ）', lambda: masker._mask_with_regex(text)),
+        ('Detection＋文字列化', lambda: format_detections(masker._mask_with_regex(text)[1], text, masker.categories)),
+    ]
+
+    print(f"テキスト長: {len(text):,} 文字 / 検出数: {len(detections):,} 件")
+    for label, func in cases:
+        seconds, peak = measure(func, args.repeat)
+        print(f"{label:<20} {seconds * 1000:8.2f} ms  ピークメモリ {peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+メモリマップ処理（--mmap）と pandas による処理のピークメモリの比較ベンチマーク
+
+問い合わせ文のカラムに加えて多数のカラムを持つ列数の多いCSVを作成し、
+process_csv と process_csv_mmap をそれぞれ別プロセスで実行して、
+処理時間とピーク常駐メモリ（RSS）を表示する。
+
+使い方:
+    python benchmarks/bench_mmap.py [--rows 200000] [--columns 40]
+"""
+import sys
+import argparse
+import csv
+import json
+import subprocess
+import tempfile
+from itertools import cycle, islice
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+DATA_FILE = project_root / 'tests' / 'large_test_data.csv'
+
+# 子プロセスで実行する処理（処理時間とピークRSSをJSONで出力する）
+CHILD_SCRIPT = '''
+import json, logging, resource, sys, time
+sys.path.insert(0, {root!r})
+logging.disable(logging.CRITICAL)
+import main
+function = getattr(main, {function!r})
+started = time.perf_counter()
+assert function({input!r}, {output!r}, 'inquiry_text', use_nlp=False)
+elapsed = time.perf_counter() - started
+print(json.dumps({{'elapsed': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+'''
+
+
+def write_wide_csv(path, rows, columns):
+    """
+    問い合わせ文と多数のカラムを持つCSVを作成する
+
+    Args:
+        path (Path): 出力先
+        rows (int): 行数
+        columns (int): 問い合わせ文以外のカラム数
+    """
+    with open(DATA_FILE, encoding='utf-8', newline='') as f:
+        texts = [row['inquiry_text'] for row in csv.DictReader(f)]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'inquiry_text', *[f"attribute_{i}" for i in range(columns)]])
+        for i, text in enumerate(islice(cycle(texts), rows)):
+            writer.writerow([i, text, *[f"value-{i}-{j}" for j in range(columns)]])
+
+
+def run(function, input_file, output_file):
+    """
+    別プロセスで処理を実行し、処理時間とピークRSSを返す
+
+    Args:
+        function (str): main.py の関数名
+        input_file (Path): 入力ファイル
+        output_file (Path): 出力ファイル
+
+    Returns:
+        dict: {'elapsed': 秒, 'max_rss_kb': ピークRSS（KB）}
+    """
+    script = CHILD_SCRIPT.format(root=str(project_root), function=function,
+                                 input=str(input_file), output=str(output_file))
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='メモリマップ処理と pandas による処理のピークメモリの比較')
+    parser.add_argument('--rows', type=int, default=200000, help='行数')
+    parser.add_argument('--columns', type=int, default=40, help='問い合わせ文以外のカラム数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_file = Path(tmp_dir) / 'wide.csv'
+        write_wide_csv(input_file, args.rows, args.columns)
+        print(f"入力: {args.rows:,} 行 x {args.columns + 2} カラム, {input_file.stat().st_size / 2**20:,.1f} MiB")
+        for label, function in (('pandas', 'process_csv'), ('mmap  ', 'process_csv_mmap')):
+            result = run(function, input_file, Path(tmp_dir) / f"{function}.csv")
+            print(f"{label}: {result['elapsed']:7.2f} 秒, ピークRSS {result['max_rss_kb'] / 1024:8,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+仮名化モードとプレースホルダーモードの処理速度の比較ベンチマーク
+
+テスト用データの問い合わせ文を繰り返して指定行数の入力を作り、
+同じ内容をプレースホルダーモード・仮名化モードでマスキングして
+1秒あたりの処理行数と仮名テーブルのヒット率を表示する。
+
+使い方:
+    python benchmarks/bench_pseudonym.py [--rows 200000] [--max-entries 100000]
+"""
+import sys
+import argparse
+import csv
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.masking import PersonalInfoMasker
+from src.pseudonym import Pseudonymizer
+
+DATA_FILE = project_root / 'tests' / 'large_test_data.csv'
+
+
+def load_texts(rows):
+    """
+    テスト用データの問い合わせ文を指定行数になるまで繰り返す
+
+    Args:
+        rows (int): 行数
+
+    Returns:
+        list: 問い合わせ文のリスト
+    """
+    with open(DATA_FILE, encoding='utf-8', newline='') as f:
+        texts = [row['inquiry_text'] for row in csv.DictReader(f)]
+    return list(islice(cycle(texts), rows))
+
+
+def run(masker, texts):
+    """
+    すべての行をマスキングし、1秒あたりの処理行数を返す
+
+    Args:
+        masker (PersonalInfoMasker): マスキング処理のインスタンス
+        texts (list): 問い合わせ文のリスト
+
+    Returns:
+        float: 1秒あたりの処理行数
+    """
+    started = time.perf_counter()
+    for text in texts:
+        masker.mask_personal_info(text)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='仮名化モードとプレースホルダーモードの処理速度の比較')
+    parser.add_argument('--rows', type=int, default=200000, help='処理する行数')
+    parser.add_argument('--max-entries', type=int, default=100000, help='仮名テーブルの上限件数')
+    args = parser.parse_args()
+
+    texts = load_texts(args.rows)
+    pseudonymizer = Pseudonymizer(b'benchmark-key', max_entries=args.max_entries)
+    placeholder_rate = run(PersonalInfoMasker(use_nlp=False), texts)
+    pseudonym_rate = run(PersonalInfoMasker(use_nlp=False, pseudonymizer=pseudonymizer), texts)
+
+    lookups = pseudonymizer.hits + pseudonymizer.misses
+    print(f"行数: {len(texts):,}")
+    print(f"プレースホルダー: {placeholder_rate:10,.0f} 行/秒")
+    print(f"仮名化          : {pseudonym_rate:10,.0f} 行/秒 ({pseudonym_rate / placeholder_rate - 1:+.1%})")
+    print(f"仮名テーブル    : {len(pseudonymizer):,} 件, ヒット率 {pseudonymizer.hits / max(lookups, 1):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ワーカープロセスからのマスキング結果の受け渡し方式（pickle / 共有メモリ）の比較ベンチマーク
+
+テストデータを一度マスキングした結果を繰り返して指定行数分の結果を作り、
+ワーカープロセスから親プロセスへ受け渡す時間を比較する。マスキング自体の時間を
+除いた受け渡しのコストのみを測るため、ワーカーは結果を組み立てて返すだけとする。
+
+使い方:
+    python benchmarks/bench_shm_transport.py [--rows 1000000] [--chunk-rows 10000] [--workers 2]
+"""
+import sys
+import argparse
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import cycle, islice
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.shm_transport import TRANSPORTS, pack_columns, unpack_columns
+
+DATA_FILE = project_root / 'tests' / 'large_test_data.csv'
+
+# ワーカープロセスで使うマスキング結果の見本
+_templates = None
+
+
+def load_templates():
+    """
+    テストデータをマスキングし、結果の見本を作成する
+
+    Returns:
+        list: (マスキング後テキスト, マスキング項目, カウント) のリスト
+    """
+    import pandas as pd
+    from src.batch import mask_records
+    from src.masking import PersonalInfoMasker
+
+    texts = pd.read_csv(DATA_FILE)['inquiry_text'].tolist()
+    masked_texts, masked_items, counts = mask_records(PersonalInfoMasker(use_nlp=False), texts)
+    return list(zip(masked_texts, masked_items, counts))
+
+
+def _init(templates):
+    global _templates
+    _templates = templates
+
+
+def _build(rows):
+    # 行ごとに別の文字列オブジェクトとなるよう複製する（実際のマスキング結果と同じ条件にする）
+    results = [tuple((value + ' ')[:-1] for value in template) for template in islice(cycle(_templates), rows)]
+    return [list(column) for column in zip(*results)]
+
+
+def _task(rows, transport):
+    columns = _build(rows)
+    return pack_columns(columns, transport)
+
+
+def measure_serialization(templates, rows, transport, repeat=5):
+    """
+    1プロセス内で、1チャンク分の直列化から復元までの時間を測る
+
+    Args:
+        templates (list): マスキング結果の見本
+        rows (int): 1チャンクの行数
+        transport (str): 受け渡しの方式
+        repeat (int): 繰り返し回数（最小値を返す）
+
+    Returns:
+        float: 1チャンクあたりの秒数
+    """
+    _init(templates)
+    columns = _build(rows)
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        unpack_columns(pickle.loads(pickle.dumps(pack_columns(columns, transport), protocol=pickle.HIGHEST_PROTOCOL)))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure_pool(templates, rows, chunk_rows, workers, transport):
+    """
+    ワーカープロセスで作成した結果を親プロセスで受け取るまでの時間を測る
+
+    Args:
+        templates (list): マスキング結果の見本
+        rows (int): 総行数
+        chunk_rows (int): 1タスクの行数
+        workers (int): ワーカープロセス数
+        transport (str): 受け渡しの方式
+
+    Returns:
+        tuple: (全体の秒数, 親プロセスのCPU時間（秒）)
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(templates,)) as executor:
+        # ワーカープロセスの起動を計測に含めない
+        list(executor.map(_build, [1] * workers))
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        futures = [executor.submit(_task, min(chunk_rows, rows - start), transport)
+                   for start in range(0, rows, chunk_rows)]
+        # 結果の受信・復元は親プロセスの管理スレッドとこのスレッドで行われるため、CPU時間で比較する
+        for future in futures:
+            unpack_columns(future.result())
+        elapsed = time.perf_counter() - started
+        cpu_time = time.process_time() - cpu_started
+    return elapsed, cpu_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='マスキング結果の受け渡し方式の比較')
+    parser.add_argument('--rows', type=int, default=1000000, help='総行数')
+    parser.add_argument('--chunk-rows', type=int, default=10000, help='1タスクの行数')
+    parser.add_argument('--workers', type=int, default=2, help='ワーカープロセス数')
+    args = parser.parse_args()
+
+    templates = load_templates()
+    print(f"{args.rows:,} 行, {args.chunk_rows:,} 行/タスク, {args.workers} ワーカー")
+    for transport in TRANSPORTS:
+        per_chunk = measure_serialization(templates, args.chunk_rows, transport)
+        elapsed, cpu_time = measure_pool(templates, args.rows, args.chunk_rows, args.workers, transport)
+        print(f"{transport:6}: 直列化〜復元 {per_chunk * 1000:7.2f} ミリ秒/タスク, "
+              f"全体 {elapsed:6.2f} 秒 (親プロセスのCPU時間 {cpu_time:6.2f} 秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,147 +4,886 @@
 import os
 import sys
 import argparse
-import pandas as pd
+import glob
 from pathlib import Path
-from tqdm import tqdm
 import logging
 import time
 
 from src.masking import PersonalInfoMasker
-from src.counter import count_masked_info, format_count_result
+from src.pipeline import CSVPipeline, DEFAULT_CHUNK_ROWS as DEFAULT_PIPELINE_CHUNK_ROWS
+from src.batch import SCHEDULES, mask_records, process_files, format_summary, format_skip_rates
+from src.io_utils import atomic_output, default_output_path
+from src.checkpoint import CheckpointManifest, hash_texts
+from src.compression import detect_compression, open_input, read_csv, write_csv
+from src.quarantine import ErrorPolicy, QuarantineWriter, FALLBACK_MODES
+from src.config_utils import load_config, get_list_setting
+from src.registry import build_engine
+from src.log_utils import setup_logging
+from src.memory import MemoryMonitor, format_memory_stats, parse_memory_size
+from src.metrics import DEFAULT_SNAPSHOT_INTERVAL, MetricsRegistry, MetricsServer, SnapshotWriter
+from src.shm_transport import TRANSPORTS
 
-# ロガーの設定
-# 以前の設定をリセット
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
+# このモジュール用のロガーを取得
+logger = logging.getLogger(__name__)
+
+# チェックポイント処理の1チャンクあたりの既定行数
+DEFAULT_CHECKPOINT_ROWS = 100000
+
+# メモリマップ処理で一度にマスキングする行数
+DEFAULT_MMAP_BATCH_ROWS = 10000
+
+def process_csv(input_file, output_file, inquiry_column, use_nlp=True, masker=None,
+                checkpoint_rows=None, resume=False, keep_checkpoint=False,
+                policy=None, quarantine=None, engine=None, workers=1,
+                chunk_rows=DEFAULT_PIPELINE_CHUNK_ROWS, transport='pickle', schedule='adaptive', memory=None,
+                metrics=None, alignment=False, pseudonymizer=None):
+    """
+    CSVファイルを処理して個人情報をマスキングする
+
+    読み込み・マスキング・書き出しは上限付きのキューでつないだパイプラインで並行して行う。
 
-# ログディレクトリが存在しない場合は作成
-log_dir = Path('logs')
-log_dir.mkdir(exist_ok=True)
+    Args:
+        input_file (str): 入力CSVファイルパス
+        output_file (str): 出力CSVファイルパス
+        inquiry_column (str): 問い合わせ文のカラム名
+        use_nlp (bool): NLPを使用するかどうか
+        masker (PersonalInfoMasker): 使い回すマスキング処理のインスタンス（省略時は新規作成）
+        checkpoint_rows (int): 指定時はこの行数ごとに結果をコミットするチェックポイント処理を行う
+        resume (bool): 既存のチェックポイントから処理を再開するかどうか
+        keep_checkpoint (bool): 完了後も部分ファイルとマニフェストを残すかどうか
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー（省略時は1行の失敗で処理全体が失敗）
+        quarantine (QuarantineWriter): 失敗した行の書き出し先
+        engine (PatternEngine): パターンエンジン（省略時は config.ini から組み立てた既定のエンジン）
+        workers (int): マスキングを行うワーカープロセス数（1の場合は masker を使って呼び出し元で処理）
+        chunk_rows (int): パイプラインの1チャンクあたりの行数
+        transport (str): ワーカープロセスからのマスキング結果の受け渡しの方式（'pickle' または 'shm'）
+        schedule (str): ワーカープロセスに渡すタスクの分割方式（'adaptive' または 'rows'）
+        memory (MemoryMonitor): 開始済みのメモリの監視（上限に近づいた場合は処理中のチャンク数を減らす）
+        metrics (MetricsRegistry): 処理行数・検出数・キューの深さなどを記録するメトリクス（省略可）
+        alignment (bool): 元のテキストとマスキング後のテキストの位置の対応のカラムを出力するかどうか
+        pseudonymizer (Pseudonymizer): ワーカープロセスで仮名化する場合のインスタンス
+            （masker を指定した場合は masker の仮名化を使う）
 
-# ログファイルのパス
-log_path = log_dir / 'masking.log'
+    Returns:
+        bool: 処理成功したかどうか
+    """
+    from tqdm import tqdm
 
-# コンソール出力ハンドラ
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
+    if checkpoint_rows or resume:
+        return process_csv_checkpointed(
+            input_file, output_file, inquiry_column, use_nlp=use_nlp, masker=masker,
+            chunk_rows=checkpoint_rows or DEFAULT_CHECKPOINT_ROWS, resume=resume,
+            keep_checkpoint=keep_checkpoint, policy=policy, quarantine=quarantine,
+            engine=engine
+        )
 
-# ファイル出力ハンドラ
-file_handler = logging.FileHandler(log_path, mode='a', encoding='utf-8')
-file_handler.setLevel(logging.INFO)
+    try:
+        # マスキング処理のインスタンスを作成（ワーカープロセスで処理する場合は各ワーカーで作成する）
+        if masker is None and workers <= 1:
+            masker = PersonalInfoMasker(use_nlp=use_nlp, engine=engine)
+        if masker is not None:
+            masker.take_stats()
 
-# フォーマッタ
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
+        # 読み込み・マスキング・書き出しを並行して処理する
+        logger.info(f"CSVファイル '{input_file}' を {chunk_rows} 行ずつ処理し、'{output_file}' に保存します...")
+        pipeline = CSVPipeline(
+            input_file, output_file, inquiry_column, masker=masker, workers=workers,
+            chunk_rows=chunk_rows, policy=policy, quarantine=quarantine, use_nlp=use_nlp, engine=engine,
+            pseudonymizer=masker.pseudonymizer if masker is not None else pseudonymizer, transport=transport,
+            schedule=schedule, memory=memory, metrics=metrics, alignment=alignment
+        )
+        with tqdm(desc="マスキング処理中", unit="行") as progress:
+            try:
+                pipeline.run(progress)
+            finally:
+                logger.info("パイプラインの各段の処理状況:\n" + pipeline.format_stats())
 
-# rootロガーにハンドラを追加
-logging.root.setLevel(logging.INFO)
-logging.root.addHandler(console_handler)
-logging.root.addHandler(file_handler)
+        if pipeline.failures:
+            logger.warning(f"{pipeline.failures} 行の処理に失敗したため、代替出力で補完しました")
+        logger.info(f"アンカーによる走査の省略率: {format_skip_rates(pipeline.scan)}")
+        logger.info("処理が完了しました")
+        return True
 
-# このモジュール用のロガーを取得
-logger = logging.getLogger(__name__)
+    except Exception as e:
+        logger.error(f"処理中にエラーが発生しました: {e}")
+        return False
 
-def process_csv(input_file, output_file, inquiry_column, use_nlp=True):
+def process_csv_checkpointed(input_file, output_file, inquiry_column, use_nlp=True, masker=None,
+                             chunk_rows=DEFAULT_CHECKPOINT_ROWS, resume=False, keep_checkpoint=False,
+                             policy=None, quarantine=None, engine=None):
     """
-    CSVファイルを処理して個人情報をマスキングする
+    CSVファイルをチャンクごとにコミットしながら処理する
+
+    各チャンクの結果は '<出力ファイル>.parts/' 以下に部分ファイルとして書き込み、
+    入力行オフセットとハッシュをマニフェストに記録する。resume=True の場合は
+    マニフェストに記録済みのチャンクを読み飛ばし、最後に部分ファイルを連結して
+    最終出力を作成する。
 
     Args:
         input_file (str): 入力CSVファイルパス
         output_file (str): 出力CSVファイルパス
         inquiry_column (str): 問い合わせ文のカラム名
         use_nlp (bool): NLPを使用するかどうか
+        masker (PersonalInfoMasker): 使い回すマスキング処理のインスタンス（省略時は新規作成）
+        chunk_rows (int): 1チャンクあたりの行数
+        resume (bool): 既存のチェックポイントから処理を再開するかどうか
+        keep_checkpoint (bool): 完了後も部分ファイルとマニフェストを残すかどうか
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+        quarantine (QuarantineWriter): 失敗した行の書き出し先
+        engine (PatternEngine): パターンエンジン（省略時は config.ini から組み立てた既定のエンジン）
 
     Returns:
         bool: 処理成功したかどうか
     """
+    import pandas as pd
+    from tqdm import tqdm
+
+    source = None
     try:
-        # CSVファイルを読み込む
-        logger.info(f"CSVファイル '{input_file}' を読み込んでいます...")
-        df = pd.read_csv(input_file)
-
-        if inquiry_column not in df.columns:
-            logger.error(f"指定されたカラム '{inquiry_column}' がCSVファイルに存在しません")
-            return False
-
-        # マスキング処理のインスタンスを作成
-        masker = PersonalInfoMasker(use_nlp=use_nlp)
-
-        # 進捗状況表示用のtqdmを設定
-        logger.info("マスキング処理を開始します...")
-
-        # 新しいカラムを追加
-        df['masked_inquiry'] = ''
-        df['masked_items'] = ''
-        df['mask_count'] = ''
-
-        # 各行を処理
-        for idx in tqdm(range(len(df)), desc="マスキング処理中"):
-            # 問い合わせ文を取得
-            inquiry_text = df.at[idx, inquiry_column]
-
-            # マスキング処理を実行
-            if pd.notna(inquiry_text) and isinstance(inquiry_text, str):
-                masked_text, masked_items = masker.mask_personal_info(inquiry_text)
-
-                # カウント情報を生成
-                count_info = count_masked_info(masked_items)
-                count_str = format_count_result(count_info)
-
-                # マスキング後のテキストとマスキング情報を保存
-                df.at[idx, 'masked_inquiry'] = masked_text
-                df.at[idx, 'masked_items'] = ','.join(masked_items) if masked_items else ''
-                df.at[idx, 'mask_count'] = count_str
+        manifest = CheckpointManifest(f"{output_file}.parts", input_file, inquiry_column, chunk_rows)
+        if resume:
+            done = manifest.load()
+            logger.info(f"チェックポイントから再開します（処理済みチャンク: {done}）")
+        else:
+            manifest.cleanup()
+
+        logger.info(f"CSVファイル '{input_file}' を {chunk_rows} 行ずつ処理します...")
+        source = open_input(input_file)
+        reader = pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+        num_chunks = 0
+        skipped = 0
+        start_row = 0
+        failures = []
+        for index, chunk in enumerate(tqdm(reader, desc="マスキング処理中（チャンク）")):
+            if inquiry_column not in chunk.columns:
+                logger.error(f"指定されたカラム '{inquiry_column}' がCSVファイルに存在しません")
+                return False
+
+            texts = chunk[inquiry_column].tolist()
+            input_hash = hash_texts(texts)
+
+            if resume and manifest.is_done(index, start_row, input_hash):
+                skipped += 1
             else:
-                # 無効な入力の場合は空の値を設定
-                df.at[idx, 'masked_inquiry'] = ''
-                df.at[idx, 'masked_items'] = ''
-                df.at[idx, 'mask_count'] = 'name:0,phone:0,date:0,email:0,address:0,company:0,total:0'
+                if masker is None:
+                    masker = PersonalInfoMasker(use_nlp=use_nlp, engine=engine)
+                num_failures = len(failures)
+                try:
+                    masked_texts, masked_items, counts = mask_records(
+                        masker, texts, policy=policy, failures=failures, row_offset=start_row
+                    )
+                finally:
+                    if quarantine is not None:
+                        quarantine.write(input_file, failures[num_failures:])
+                chunk['masked_inquiry'] = masked_texts
+                chunk['masked_items'] = masked_items
+                chunk['mask_count'] = counts
+                manifest.commit(index, start_row, len(chunk), input_hash, chunk, header=(index == 0))
 
-        # 処理結果をCSVに保存
-        logger.info(f"処理結果を '{output_file}' に保存しています...")
-        df.to_csv(output_file, index=False)
+            start_row += len(chunk)
+            num_chunks += 1
 
-        logger.info("処理が完了しました")
+        if num_chunks == 0:
+            # データ行がない場合はヘッダーのみを出力する
+            df = read_csv(input_file, dtype=str, keep_default_na=False)
+            if inquiry_column not in df.columns:
+                logger.error(f"指定されたカラム '{inquiry_column}' がCSVファイルに存在しません")
+                return False
+            df = df.reindex(columns=[*df.columns, 'masked_inquiry', 'masked_items', 'mask_count'])
+            with atomic_output(output_file) as tmp_path:
+                write_csv(df, tmp_path, detect_compression(output_file), index=False)
+        else:
+            logger.info(f"処理結果を '{output_file}' に連結しています（スキップしたチャンク: {skipped}）...")
+            manifest.assemble(output_file, num_chunks)
+
+        if not keep_checkpoint:
+            manifest.cleanup()
+        if failures:
+            logger.warning(f"{len(failures)} 行の処理に失敗したため、代替出力で補完しました")
+
+        logger.info(f"処理が完了しました。合計 {start_row} 件のデータを処理しました。")
+        return True
+
+    except Exception as e:
+        logger.error(f"処理中にエラーが発生しました: {e}")
+        logger.info("--resume を指定して再実行すると、コミット済みのチャンクから再開できます")
+        return False
+    finally:
+        if source is not None:
+            source.close()
+
+def process_csv_incremental(input_file, output_file, inquiry_column, id_column=None, delta_file=None,
+                           watermark_file=None, use_nlp=True, masker=None, chunk_rows=DEFAULT_CHECKPOINT_ROWS,
+                           policy=None, quarantine=None, engine=None):
+    """
+    前回の実行以降に追加・変更された行のみをマスキングする
+
+    ウォーターマーク（ID ごとの行ハッシュ、または行ハッシュの集合）と比較して処理対象の行を選ぶ。
+    delta_file を指定した場合は処理した行のみを差分ファイルに書き出し、指定しない場合は
+    既存の出力ファイルの末尾に追記する（ID を指定していて内容が変わった行がある場合は、
+    出力ファイル内の古い行を除いてから追記する。ID を指定しない場合は追記のみ行い、
+    内容が変わった行の古い結果は出力に残る）。
+
+    Args:
+        input_file (str): 入力CSVファイルパス
+        output_file (str): 追記先の出力CSVファイルパス（delta_file 指定時は使用しない）
+        inquiry_column (str): 問い合わせ文のカラム名
+        id_column (str): 行を識別する ID カラム名（省略時は行ハッシュの集合で判定）
+        delta_file (str): 差分ファイルパス（省略時は出力ファイルに追記）
+        watermark_file (str): ウォーターマークファイルパス（省略時は '<出力ファイル>.watermark.json'）
+        use_nlp (bool): NLPを使用するかどうか
+        masker (PersonalInfoMasker): 使い回すマスキング処理のインスタンス（省略時は新規作成）
+        chunk_rows (int): 入力を読み込む1チャンクあたりの行数
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+        quarantine (QuarantineWriter): 失敗した行の書き出し先
+        engine (PatternEngine): パターンエンジン（省略時は config.ini から組み立てた既定のエンジン）
+
+    Returns:
+        bool: 処理成功したかどうか
+    """
+    import pandas as pd
+    from tqdm import tqdm
+    from src.incremental import Watermark, append_rows, read_header, recover_output
+
+    try:
+        input_columns = read_csv(input_file, nrows=0).columns.tolist()
+        for column in (inquiry_column, id_column):
+            if column and column not in input_columns:
+                logger.error(f"指定されたカラム '{column}' がCSVファイルに存在しません")
+                return False
+        output_columns = [*input_columns, 'masked_inquiry', 'masked_items', 'mask_count']
+
+        watermark = Watermark(watermark_file or f"{output_file}.watermark.json", inquiry_column, id_column)
+        has_previous = watermark.load()
+        if has_previous and not delta_file:
+            # 追記先が前回完了時の状態と一致し、カラムも同じ場合のみ差分を追記する
+            if (not recover_output(output_file, watermark)
+                    or pd.read_csv(output_file, nrows=0).columns.tolist() != output_columns):
+                logger.warning(f"出力ファイル '{output_file}' が前回の記録と一致しないため、すべての行を処理します")
+                has_previous = False
+        if not has_previous:
+            watermark.reset()
+
+        delta_path = delta_file or f"{output_file}.delta.csv"
+        logger.info(f"CSVファイル '{input_file}' から新しい行・変更された行を抽出しています...")
+        start_row = 0
+        processed = 0
+        changed = set()
+        failures = []
+        with open_input(input_file) as source, atomic_output(delta_path) as tmp_path:
+            reader = pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+            pd.DataFrame(columns=output_columns).to_csv(tmp_path, index=False)
+            for chunk in tqdm(reader, desc="マスキング処理中（差分）"):
+                selected, chunk_changed = watermark.select(chunk)
+                changed |= chunk_changed
+                if selected:
+                    if masker is None:
+                        masker = PersonalInfoMasker(use_nlp=use_nlp, engine=engine)
+                    rows = chunk.iloc[selected].copy()
+                    num_failures = len(failures)
+                    try:
+                        masked_texts, masked_items, counts = mask_records(
+                            masker, rows[inquiry_column].tolist(), policy=policy,
+                            failures=failures, row_offset=processed
+                        )
+                    finally:
+                        # 失敗した行の行番号を入力ファイル上の行番号に戻す
+                        failures[num_failures:] = [
+                            (start_row + selected[row - processed], reason, text)
+                            for row, reason, text in failures[num_failures:]
+                        ]
+                        if quarantine is not None:
+                            quarantine.write(input_file, failures[num_failures:])
+                    rows['masked_inquiry'] = masked_texts
+                    rows['masked_items'] = masked_items
+                    rows['mask_count'] = counts
+                    rows.to_csv(tmp_path, mode='a', index=False, header=False)
+                    processed += len(selected)
+                start_row += len(chunk)
+
+        if not id_column and watermark.missing():
+            # 行ハッシュで判定する場合、内容が変わった行は古い結果を特定できないため置き換えられない
+            logger.warning(f"前回処理した {watermark.missing()} 行が今回の入力にありません。内容が変わった行は"
+                           "新しい行として追記され、古い行の結果も出力に残ります"
+                           "（置き換えるには --id-column を指定してください）")
+
+        output_size = None
+        if not delta_file:
+            if not has_previous:
+                os.replace(delta_path, output_file)
+            elif changed:
+                # 内容が変わった行の古い結果を除いてから、差分を追記する
+                with atomic_output(output_file) as tmp_path:
+                    with open(tmp_path, 'wb') as f:
+                        f.write(read_header(output_file))
+                    for chunk in pd.read_csv(output_file, chunksize=chunk_rows, dtype=str, keep_default_na=False):
+                        chunk[~chunk[id_column].isin(changed)].to_csv(tmp_path, mode='a', index=False, header=False)
+                    append_rows(tmp_path, delta_path)
+                os.remove(delta_path)
+            else:
+                append_rows(output_file, delta_path)
+                os.remove(delta_path)
+            output_size = os.path.getsize(output_file)
+
+        # 出力を書き終えてからウォーターマークを更新する
+        watermark.save(output_size)
+        if failures:
+            logger.warning(f"{len(failures)} 行の処理に失敗したため、代替出力で補完しました")
+
+        logger.info(f"処理が完了しました。全 {start_row} 行のうち {processed} 行（うち変更 {len(changed)} 行）を"
+                    f"処理し、'{delta_file or output_file}' に書き出しました。")
+        return True
+
+    except Exception as e:
+        logger.error(f"処理中にエラーが発生しました: {e}")
+        return False
+
+def process_csv_mmap(input_file, output_file, inquiry_column, use_nlp=True, masker=None,
+                     batch_rows=DEFAULT_MMAP_BATCH_ROWS, policy=None, quarantine=None, engine=None):
+    """
+    入力ファイルをメモリマップし、問い合わせ文のカラムのみを解析してマスキングする
+
+    入力のレコードは解析せずにバイト列をそのまま出力にコピーし、他の処理と同じく末尾に
+    masked_inquiry、masked_items、mask_count のカラムを追加する。
+
+    Args:
+        input_file (str): 入力CSVファイルパス（UTF-8）
+        output_file (str): 出力CSVファイルパス
+        inquiry_column (str): 問い合わせ文のカラム名
+        use_nlp (bool): NLPを使用するかどうか
+        masker (PersonalInfoMasker): 使い回すマスキング処理のインスタンス（省略時は新規作成）
+        batch_rows (int): 一度にマスキングする行数
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+        quarantine (QuarantineWriter): 失敗した行の書き出し先
+        engine (PatternEngine): パターンエンジン（省略時は config.ini から組み立てた既定のエンジン）
+
+    Returns:
+        bool: 処理成功したかどうか
+    """
+    from tqdm import tqdm
+    from src.mmap_csv import MappedCSV
+
+    try:
+        logger.info(f"CSVファイル '{input_file}' をメモリマップしています...")
+        with MappedCSV(input_file) as reader:
+            if inquiry_column not in reader.columns:
+                logger.error(f"指定されたカラム '{inquiry_column}' がCSVファイルに存在しません")
+                return False
+            column_index = reader.columns.index(inquiry_column)
+
+            if masker is None:
+                masker = PersonalInfoMasker(use_nlp=use_nlp, engine=engine)
+
+            failures = []
+            processed = 0
+
+            def flush(records, out):
+                nonlocal processed
+                # 対象フィールドはマスキングする直前にまとめてデコードする
+                texts = [reader.field_text(record) for record in records]
+                num_failures = len(failures)
+                try:
+                    masked_texts, masked_items, counts = mask_records(
+                        masker, texts, policy=policy, failures=failures, row_offset=processed
+                    )
+                finally:
+                    if quarantine is not None:
+                        quarantine.write(input_file, failures[num_failures:])
+                for record, masked_text, items, count in zip(records, masked_texts, masked_items, counts):
+                    reader.write_record(out, record, (masked_text, items, count))
+                processed += len(records)
+                reader.release(records[-1].end)
+
+            logger.info("マスキング処理を開始します...")
+            with atomic_output(output_file) as tmp_path:
+                with open(tmp_path, 'wb', buffering=1 << 20) as out:
+                    reader.write_header(out, ['masked_inquiry', 'masked_items', 'mask_count'])
+                    batch = []
+                    for record in tqdm(reader.records(column_index), desc="マスキング処理中"):
+                        batch.append(record)
+                        if len(batch) >= batch_rows:
+                            flush(batch, out)
+                            batch = []
+                    if batch:
+                        flush(batch, out)
+
+        if failures:
+            logger.warning(f"{len(failures)} 行の処理に失敗したため、代替出力で補完しました")
+        logger.info(f"処理が完了しました。合計 {processed} 件のデータを処理しました。")
         return True
 
     except Exception as e:
         logger.error(f"処理中にエラーが発生しました: {e}")
         return False
 
+def expand_inputs(patterns):
+    """
+    入力ファイル指定（グロブパターンを含む）を実在するファイルのリストに展開する
+
+    Args:
+        patterns (list): 入力ファイルパスまたはグロブパターンのリスト
+
+    Returns:
+        list: 重複を除いた入力ファイルパスのリスト（指定順）
+    """
+    input_files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isfile(path) and path not in input_files:
+                input_files.append(path)
+    return input_files
+
+def build_engine_from_args(args):
+    """
+    コマンドライン引数で指定された設定ファイル・パターン定義ファイルからパターンエンジンを組み立てる
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+
+    Returns:
+        PatternEngine: 組み立てたエンジン
+    """
+    config = load_config(args.config)
+    pattern_files = get_list_setting(config, 'patterns', 'pattern_files') + (args.pattern_file or [])
+    enabled = parse_categories(args.only) if args.only else None
+    disabled = parse_categories(args.skip) if args.skip else None
+    return build_engine(config, pattern_files=pattern_files, enabled=enabled, disabled=disabled)
+
+def build_pseudonymizer_from_args(args):
+    """
+    コマンドライン引数で仮名化が指定されている場合、仮名化のインスタンスを作成する
+
+    --pseudonym-table で指定したファイルが存在する場合は、保存済みの仮名テーブルを読み込む。
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+
+    Returns:
+        Pseudonymizer: 仮名化のインスタンス（仮名化しない場合は None）
+    """
+    if not args.pseudonymize:
+        return None
+
+    from src.pseudonym import build_pseudonymizer
+    pseudonymizer = build_pseudonymizer(load_config(args.config))
+    if args.pseudonym_table and os.path.exists(args.pseudonym_table):
+        pseudonymizer.load(args.pseudonym_table)
+        logger.info(f"仮名テーブル '{args.pseudonym_table}' を読み込みました ({len(pseudonymizer)} 件)")
+    return pseudonymizer
+
+def save_pseudonym_table(args, pseudonymizer):
+    """
+    --pseudonym-table が指定されている場合、仮名テーブルを保存する
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        pseudonymizer (Pseudonymizer): 仮名化のインスタンス（None の場合は何もしない）
+    """
+    if pseudonymizer is not None and args.pseudonym_table:
+        pseudonymizer.save(args.pseudonym_table)
+        logger.info(f"仮名テーブルを '{args.pseudonym_table}' に保存しました ({len(pseudonymizer)} 件)")
+
+def parse_categories(value):
+    """
+    カンマ区切りのカテゴリ指定をリストに変換する
+
+    Args:
+        value (str): カンマ区切りのカテゴリ名
+
+    Returns:
+        list: カテゴリ名のリスト
+    """
+    return [category.strip() for category in value.split(',') if category.strip()]
+
+def run_daemon(args, metrics=None):
+    """
+    常駐モードで起動し、ウォーム状態のマスカーでジョブを処理し続ける
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        metrics (MetricsRegistry): ジョブの処理状況を記録するメトリクス（省略可）
+
+    Returns:
+        int: 終了コード
+    """
+    from src.daemon import MaskingDaemon
+
+    pseudonymizer = build_pseudonymizer_from_args(args)
+    masker = PersonalInfoMasker(use_nlp=not args.no_nlp, engine=build_engine_from_args(args),
+                                pseudonymizer=pseudonymizer)
+    policy = ErrorPolicy(args.fallback, max_errors=args.max_errors, max_error_rate=args.max_error_rate)
+
+    def process_file(input_file, output_file, column):
+        quarantine = QuarantineWriter(f"{output_file}.quarantine.csv")
+        quarantine.remove_stale()
+        return process_csv(input_file, output_file, column, masker=masker,
+                           policy=policy, quarantine=quarantine, metrics=metrics)
+
+    daemon = MaskingDaemon(masker, process_file, poll_interval=args.poll_interval, metrics=metrics,
+                           input_root=args.input_root, output_root=args.output_root)
+
+    try:
+        if args.watch:
+            if not args.column:
+                logger.error("--watch を使用する場合は -c/--column を指定してください")
+                return 1
+            output_dir = args.output or str(Path(args.watch) / 'masked')
+            daemon.watch_directory(args.watch, output_dir, args.column)
+        else:
+            daemon.serve(args.host, args.serve, default_column=args.column)
+    except KeyboardInterrupt:
+        daemon.stop()
+        logger.info("常駐モードを終了します")
+    finally:
+        # 常駐中に作成した仮名は終了時にまとめて保存する
+        save_pseudonym_table(args, pseudonymizer)
+
+    return 0
+
+def run_shard_mode(args, parser):
+    """
+    分散処理のためのシャード分割・シャード単位の処理・結合を行う
+
+    --shard N で入力をシャードディレクトリに分割し、各ノードは --shard-index K で
+    自分のシャードのみを処理する。最後に --merge で全シャードの完了を確認して連結する。
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        parser (argparse.ArgumentParser): 引数エラーの報告に使うパーサー
+
+    Returns:
+        int: 終了コード
+    """
+    from src.sharding import ShardManifest
+
+    # 分割
+    if args.shard is not None:
+        input_files = expand_inputs(args.input or [])
+        if len(input_files) != 1:
+            parser.error('--shard を使用する場合は -i/--input で入力ファイルを1つ指定してください')
+        manifest = ShardManifest(args.shard_dir or f"{input_files[0]}.shards")
+        try:
+            manifest.split(input_files[0], args.shard)
+        except (ValueError, ImportError, OSError) as e:
+            logger.error(f"シャードの分割に失敗しました: {e}")
+            return 1
+        return 0
+
+    if not args.shard_dir:
+        parser.error('--shard-index / --merge を使用する場合は --shard-dir を指定してください')
+    manifest = ShardManifest(args.shard_dir)
+    try:
+        manifest.load()
+    except (OSError, ValueError) as e:
+        logger.error(f"シャードのマニフェストを読み込めません: {e}")
+        return 1
+
+    # 結合
+    if args.merge:
+        output_file = args.output or default_output_path(
+            str(Path(manifest.header['input_file']).with_suffix('.csv'))
+        )
+        try:
+            manifest.merge(output_file)
+        except (RuntimeError, OSError) as e:
+            logger.error(f"シャードの結合に失敗しました: {e}")
+            return 1
+        return 0
+
+    # シャード単位の処理（各ノードで実行）
+    if not args.column:
+        parser.error('--shard-index を使用する場合は -c/--column を指定してください')
+    index = args.shard_index
+    try:
+        manifest.verify_input(index)
+        engine = build_engine_from_args(args)
+        pseudonymizer = build_pseudonymizer_from_args(args)
+    except (ValueError, OSError) as e:
+        logger.error(f"シャード {index} を処理できません: {e}")
+        return 1
+    masker = PersonalInfoMasker(use_nlp=not args.no_nlp, engine=engine, pseudonymizer=pseudonymizer)
+
+    output_file = str(manifest.output_path(index))
+    policy = ErrorPolicy(args.fallback, max_errors=args.max_errors, max_error_rate=args.max_error_rate)
+    quarantine = QuarantineWriter(args.quarantine or f"{output_file}.quarantine.csv")
+    if not args.resume:
+        quarantine.remove_stale()
+    success = process_csv(
+        str(manifest.input_path(index)), output_file, args.column, masker=masker,
+        checkpoint_rows=args.checkpoint_rows, resume=args.resume,
+        keep_checkpoint=args.keep_checkpoint, policy=policy, quarantine=quarantine
+    )
+    if quarantine.count:
+        logger.warning(f"失敗した {quarantine.count} 行を '{quarantine.path}' に書き出しました")
+    if not success:
+        return 1
+
+    manifest.mark_done(index)
+    save_pseudonym_table(args, pseudonymizer)
+    logger.info(f"シャード {index}/{manifest.num_shards} の処理が完了しました")
+    return 0
+
+
+def start_metrics(args):
+    """
+    --metrics-port / --metrics-file の指定に従ってメトリクスの公開を開始する
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+
+    Returns:
+        tuple: (MetricsRegistry, 開始した公開方法のリスト)。どちらも指定しない場合は (None, [])
+
+    Raises:
+        OSError: ポートを待ち受けられない場合
+    """
+    if args.metrics_port is None and not args.metrics_file:
+        return None, []
+    registry = MetricsRegistry()
+    exporters = []
+    if args.metrics_port is not None:
+        exporters.append(MetricsServer(registry, args.metrics_host, args.metrics_port).start())
+    if args.metrics_file:
+        exporters.append(SnapshotWriter(registry, args.metrics_file, args.metrics_interval).start())
+    return registry, exporters
+
+
+def stop_metrics(exporters):
+    """
+    メトリクスの公開を停止する（スナップショットは最後の値を書き出す）
+
+    Args:
+        exporters (list): start_metrics で開始した公開方法のリスト
+    """
+    for exporter in exporters:
+        exporter.stop()
+
+
+def run_masking(args, input_files, policy, engine, pseudonymizer, memory=None, metrics=None):
+    """
+    コマンドライン引数に従って入力ファイルをマスキングする
+
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+        input_files (list): 展開済みの入力ファイルパスのリスト
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+        engine (PatternEngine): パターンエンジン
+        pseudonymizer (Pseudonymizer): 仮名化のインスタンス（仮名化しない場合は None）
+        memory (MemoryMonitor): 開始済みのメモリの監視（--max-memory を指定しない場合は None）
+        metrics (MetricsRegistry): メトリクス（--metrics-port / --metrics-file を指定しない場合は None）
+
+    Returns:
+        int: 終了コード
+    """
+    # ワーカープロセスで作成した仮名は、タスクの結果と一緒に受け取ってこのプロセスのテーブルに集める
+    if pseudonymizer is not None and args.pseudonym_table and args.workers > 1:
+        pseudonymizer.record_new()
+
+    # 単一ファイルの場合は読み込み・マスキング・書き出しのパイプラインで処理する
+    if len(input_files) == 1:
+        output_file = args.output or default_output_path(input_files[0])
+        quarantine = QuarantineWriter(args.quarantine or f"{output_file}.quarantine.csv")
+        if not args.resume:
+            quarantine.remove_stale()
+        masker = None
+        if pseudonymizer is not None and args.workers <= 1:
+            masker = PersonalInfoMasker(not args.no_nlp, engine=engine, pseudonymizer=pseudonymizer)
+        if args.mmap:
+            success = process_csv_mmap(
+                input_files[0], output_file, args.column, not args.no_nlp, masker=masker,
+                policy=policy, quarantine=quarantine, engine=engine
+            )
+        elif args.incremental:
+            success = process_csv_incremental(
+                input_files[0], output_file, args.column, id_column=args.id_column,
+                delta_file=args.delta, watermark_file=args.watermark, use_nlp=not args.no_nlp,
+                masker=masker, policy=policy, quarantine=quarantine, engine=engine
+            )
+        else:
+            success = process_csv(
+                input_files[0], output_file, args.column, not args.no_nlp, masker=masker,
+                checkpoint_rows=args.checkpoint_rows, resume=args.resume,
+                keep_checkpoint=args.keep_checkpoint, policy=policy, quarantine=quarantine,
+                engine=engine, workers=args.workers,
+                chunk_rows=args.chunk_rows if args.workers > 1 else DEFAULT_PIPELINE_CHUNK_ROWS,
+                transport=args.transport, schedule=args.schedule, memory=memory, metrics=metrics,
+                alignment=args.alignment, pseudonymizer=pseudonymizer
+            )
+        if success:
+            save_pseudonym_table(args, pseudonymizer)
+        if quarantine.count:
+            logger.warning(f"失敗した {quarantine.count} 行を '{quarantine.path}' に書き出しました")
+        return 0 if success else 1
+
+    # 複数ファイルの場合、-o は出力ディレクトリとして扱う
+    jobs = [(input_file, default_output_path(input_file, args.output)) for input_file in input_files]
+
+    quarantine_path = args.quarantine or str(
+        Path(jobs[0][1]).parent / f"quarantine_{time.strftime('%Y%m%d%H%M%S')}.csv"
+    )
+    quarantine = QuarantineWriter(quarantine_path)
+    summary = process_files(
+        jobs, args.column, use_nlp=not args.no_nlp, workers=args.workers,
+        chunk_rows=args.chunk_rows, io_workers=args.io_workers,
+        policy=policy, quarantine=quarantine, engine=engine, pseudonymizer=pseudonymizer,
+        transport=args.transport, schedule=args.schedule, memory=memory, metrics=metrics,
+        alignment=args.alignment
+    )
+    logger.info("処理結果のサマリー:\n" + format_summary(summary))
+    save_pseudonym_table(args, pseudonymizer)
+    if quarantine.count:
+        logger.warning(f"失敗した {quarantine.count} 行を '{quarantine.path}' に書き出しました")
+
+    return 0 if not summary['failed'] else 1
+
+
 def main():
     """
     メイン処理
     """
     # コマンドライン引数のパーサーを設定
     parser = argparse.ArgumentParser(description='個人情報マスキングプログラム')
-    parser.add_argument('-i', '--input', required=True, help='入力CSVファイルパス')
-    parser.add_argument('-o', '--output', help='出力CSVファイルパス（省略時は自動生成）')
-    parser.add_argument('-c', '--column', required=True, help='問い合わせ文のカラム名')
+    parser.add_argument('-i', '--input', nargs='+', help='入力CSVファイルパス（複数指定・グロブパターン可）')
+    parser.add_argument('-o', '--output', help='出力CSVファイルパス（省略時は自動生成）。複数入力・常駐モードでは出力ディレクトリ')
+    parser.add_argument('-c', '--column', help='問い合わせ文のカラム名')
     parser.add_argument('--no-nlp', action='store_true', help='NLP処理を使用しない')
+    parser.add_argument('--watch', metavar='DIR', help='入力ディレクトリを監視し、到着したCSVを順次処理する常駐モード')
+    parser.add_argument('--serve', metavar='PORT', type=int, help='ローカルソケットでジョブを受け付ける常駐モード')
+    parser.add_argument('--host', default='127.0.0.1', help='--serve の待ち受けアドレス')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='--watch のポーリング間隔（秒）')
+    parser.add_argument('--input-root', metavar='DIR',
+                        help='--serve のファイルのジョブで入力として許可するディレクトリ（配下のパスのみ受け付ける）')
+    parser.add_argument('--output-root', metavar='DIR',
+                        help='--serve のファイルのジョブで出力として許可するディレクトリ（配下のパスのみ受け付ける）')
+    parser.add_argument('--workers', type=int, default=1, help='マスキングを行うワーカープロセス数')
+    parser.add_argument('--chunk-rows', type=int, default=1000, help='1タスクあたりの行数の目安')
+    parser.add_argument('--schedule', choices=SCHEDULES, default='adaptive',
+                        help='ワーカーが複数の場合のタスクの分割方式（adaptive: 処理時間に応じた文字数の予算, rows: 行数）')
+    parser.add_argument('--transport', choices=TRANSPORTS, default='pickle',
+                        help='ワーカープロセスからのマスキング結果の受け渡し方式（shm: 共有メモリ）')
+    parser.add_argument('--max-memory', metavar='SIZE',
+                        help='本体とワーカープロセスの RSS の合計の上限（例: 4G）。上限に近づくと処理中のチャンク数と '
+                             'nlp.pipe のバッチサイズを減らし、最後にピーク値を報告する')
+    parser.add_argument('--metrics-port', metavar='PORT', type=int,
+                        help='メトリクスを http://<--metrics-host>:PORT/metrics（Prometheus 形式）と /metrics.json で公開する')
+    parser.add_argument('--metrics-host', default='127.0.0.1', help='--metrics-port の待ち受けアドレス')
+    parser.add_argument('--metrics-file', metavar='FILE', help='メトリクスの JSON スナップショットを一定間隔で書き出すファイル')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_SNAPSHOT_INTERVAL,
+                        help='--metrics-file の書き出し間隔（秒）')
+    parser.add_argument('--io-workers', type=int, default=2, help='同時に読み書きするファイル数の上限')
+    parser.add_argument('--checkpoint-rows', type=int, help='この行数ごとに結果をコミットするチェックポイント処理を行う')
+    parser.add_argument('--resume', action='store_true', help='前回中断したチェックポイントから処理を再開する')
+    parser.add_argument('--keep-checkpoint', action='store_true', help='完了後も部分ファイルとマニフェストを残す')
+    parser.add_argument('--fallback', choices=FALLBACK_MODES, default='regex',
+                        help='処理に失敗した行の代替出力（regex: 正規表現のみで再処理, redact: 全文を伏せる）')
+    parser.add_argument('--max-errors', type=int, help='許容する失敗行数の上限（超えた場合は処理を中断）')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='許容する失敗率の上限（既定: 0.01）')
+    parser.add_argument('--quarantine', help='失敗した行の書き出し先（省略時は出力ファイル名から自動生成）')
+    parser.add_argument('--config', default='config.ini', help='設定ファイルパス')
+    parser.add_argument('--pattern-file', action='append', help='追加のパターン定義ファイル（複数指定可）')
+    parser.add_argument('--log-json', action='store_true', help='ログをJSON形式で出力する')
+    parser.add_argument('--only', metavar='CATEGORIES', help='検出対象とするカテゴリ（カンマ区切り、例: phone,email）')
+    parser.add_argument('--skip', metavar='CATEGORIES', help='検出対象から除外するカテゴリ（カンマ区切り）')
+    parser.add_argument('--pseudonymize', action='store_true',
+                        help='プレースホルダーの代わりに鍵付きハッシュによる仮名（例: [氏名_7f3a9c01]）で置き換える')
+    parser.add_argument('--pseudonym-table', metavar='FILE',
+                        help='仮名テーブルの読み込み・保存先（元の値を含むため取り扱いに注意）')
+    parser.add_argument('--incremental', action='store_true',
+                        help='前回の実行以降に追加・変更された行のみを処理し、出力に追記する')
+    parser.add_argument('--id-column', help='--incremental で行を識別する ID カラム（省略時は行ハッシュで判定し、変更された行は追記のみ）')
+    parser.add_argument('--delta', metavar='FILE', help='--incremental で処理した行のみを書き出す差分ファイル')
+    parser.add_argument('--watermark', metavar='FILE',
+                        help='--incremental のウォーターマークファイル（省略時は <出力ファイル>.watermark.json）')
+    parser.add_argument('--shard', metavar='N', type=int, help='入力（CSV / Parquet）をN個のシャードに分割する')
+    parser.add_argument('--shard-dir', help='シャードディレクトリ（省略時は <入力ファイル>.shards）')
+    parser.add_argument('--shard-index', metavar='K', type=int, help='シャードディレクトリのK番目のシャードのみを処理する')
+    parser.add_argument('--merge', action='store_true', help='全シャードの完了を確認し、出力を連結する')
+    parser.add_argument('--mmap', action='store_true',
+                        help='入力をメモリマップし、問い合わせ文のカラムのみを置き換えて出力する（列数の多い大きなファイル向け）')
+    parser.add_argument('--alignment', action='store_true',
+                        help='元のテキストとマスキング後のテキストの位置の対応を mask_alignment カラムに出力する')
 
     args = parser.parse_args()
 
-    # 入出力ファイルのパスを設定
-    input_file = args.input
+    # ログ出力を設定（書き込みは別スレッドで行う）
+    setup_logging(load_config(args.config), json_format=True if args.log_json else None)
+
+    # 常駐モード
+    if args.watch or args.serve is not None:
+        try:
+            metrics, exporters = start_metrics(args)
+        except OSError as e:
+            logger.error(f"メトリクスの公開を開始できませんでした: {e}")
+            return 1
+        try:
+            return run_daemon(args, metrics)
+        finally:
+            stop_metrics(exporters)
 
-    if not os.path.exists(input_file):
-        logger.error(f"入力ファイル '{input_file}' が見つかりません")
+    # 分散処理（シャード分割・シャード単位の処理・結合）
+    if args.shard is not None or args.shard_index is not None or args.merge:
+        return run_shard_mode(args, parser)
+
+    if not args.input or not args.column:
+        parser.error('-i/--input と -c/--column は必須です')
+
+    # 入力ファイルを展開（グロブパターンにも対応）
+    input_files = expand_inputs(args.input)
+    if not input_files:
+        logger.error(f"入力ファイル '{' '.join(args.input)}' が見つかりません")
         return 1
 
-    if args.output:
-        output_file = args.output
-    else:
-        # 出力ファイル名を自動生成
-        input_path = Path(input_file)
-        timestamp = time.strftime('%Y%m%d%H%M%S')
-        output_file = str(input_path.parent / f"{input_path.stem}_masked_{timestamp}{input_path.suffix}")
+    if args.resume and not args.output:
+        parser.error('--resume を使用する場合は -o/--output で前回と同じ出力ファイルを指定してください')
+
+    if (args.checkpoint_rows or args.resume) and (len(input_files) > 1 or args.workers > 1):
+        parser.error('チェックポイント処理は単一ファイル・単一ワーカーでのみ使用できます')
 
-    # 処理を実行
-    success = process_csv(input_file, output_file, args.column, not args.no_nlp)
+    if args.incremental:
+        if len(input_files) > 1 or args.workers > 1 or args.checkpoint_rows or args.resume:
+            parser.error('--incremental は単一ファイル・単一ワーカーでのみ使用でき、チェックポイント処理とは併用できません')
+        if not args.output and not (args.delta and args.watermark):
+            parser.error('--incremental を使用する場合は -o/--output（または --delta と --watermark）を指定してください')
+        if detect_compression(args.output or '') or detect_compression(args.delta or ''):
+            parser.error('--incremental の出力は追記するため、圧縮形式では出力できません')
 
-    return 0 if success else 1
+    if args.mmap and (len(input_files) > 1 or args.workers > 1 or args.checkpoint_rows
+                      or args.resume or args.incremental):
+        parser.error('--mmap は単一ファイル・単一ワーカーでのみ使用でき、チェックポイント処理・差分処理とは併用できません')
+    if args.mmap and (detect_compression(input_files[0]) or detect_compression(args.output or '')):
+        parser.error('--mmap は圧縮されていない入出力でのみ使用できます')
+    if args.alignment and (args.checkpoint_rows or args.resume or args.incremental or args.mmap):
+        parser.error('--alignment はチェックポイント処理・差分処理・--mmap とは併用できません')
+
+    policy = ErrorPolicy(args.fallback, max_errors=args.max_errors, max_error_rate=args.max_error_rate)
+    try:
+        engine = build_engine_from_args(args)
+    except (ValueError, OSError) as e:
+        parser.error(f"パターン設定の読み込みに失敗しました: {e}")
+    try:
+        pseudonymizer = build_pseudonymizer_from_args(args)
+    except (ValueError, OSError) as e:
+        parser.error(f"仮名化の設定に失敗しました: {e}")
+    try:
+        max_memory = parse_memory_size(args.max_memory) if args.max_memory else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        metrics, exporters = start_metrics(args)
+    except OSError as e:
+        logger.error(f"メトリクスの公開を開始できませんでした: {e}")
+        return 1
+    memory = MemoryMonitor(max_memory).start() if max_memory else None
+    try:
+        return run_masking(args, input_files, policy, engine, pseudonymizer, memory, metrics)
+    finally:
+        stop_metrics(exporters)
+        if memory is not None:
+            memory.stop()
+            logger.info(f"メモリ使用量: {format_memory_stats(memory.stats())}")
 
 if __name__ == '__main__':
     sys.exit(main())
\ No newline at end of file
@@ -6,9 +6,7 @@ import sys
 import os
 import argparse
 import logging
-import pandas as pd
 from pathlib import Path
-from tqdm import tqdm
 
 # プロジェクトのルートディレクトリをパスに追加
 project_root = Path(__file__).parent.parent
@@ -16,36 +14,7 @@ sys.path.insert(0, str(project_root))
 
 from src.masking import PersonalInfoMasker
 from src.counter import count_masked_info, format_count_result
-
-# ロガーの設定
-# 以前の設定をリセット
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-# ログディレクトリが存在しない場合は作成
-log_dir = Path('logs')
-log_dir.mkdir(exist_ok=True)
-
-# ログファイルのパス
-log_path = log_dir / 'masking.log'
-
-# コンソール出力ハンドラ
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-
-# ファイル出力ハンドラ
-file_handler = logging.FileHandler(log_path, mode='a', encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-
-# フォーマッタ
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-file_handler.setFormatter(formatter)
-
-# rootロガーにハンドラを追加
-logging.root.setLevel(logging.INFO)
-logging.root.addHandler(console_handler)
-logging.root.addHandler(file_handler)
+from src.log_utils import setup_logging
 
 # このモジュール用のロガーを取得
 logger = logging.getLogger(__name__)
@@ -63,6 +32,9 @@ def process_csv(input_file, output_file, inquiry_column, use_nlp=True):
     Returns:
         bool: 処理成功したかどうか
     """
+    import pandas as pd
+    from tqdm import tqdm
+
     try:
         # CSVファイルを読み込み
         logger.info(f"CSVファイル '{input_file}' を読み込んでいます...")
@@ -135,6 +107,9 @@ def main():
 
     args = parser.parse_args()
 
+    # ログ出力を設定（書き込みは別スレッドで行う）
+    setup_logging()
+
     # 入出力ファイルのパスを設定
     input_file = args.input
     if not args.output:
@@ -0,0 +1,304 @@
+"""
+元のテキストとマスキング後のテキストの位置の対応（アライメント）
+
+マスキングでは、検出範囲の置換のあとに二重括弧の修正・連続したプレースホルダーの
+集約・不自然な語尾の削除・空白の集約といった後処理でテキストを書き換えるため、
+マスキング後のテキストの位置から元のテキストの位置を単純な計算では求められない。
+
+Alignment は、マスキング後のテキストを元のテキストとの対応を持つ区間の並びとして
+保持し、書き換えのたびに区間を更新する（書き換え後に差分を取り直すことはしない）。
+区間には、元のテキストをそのまま写した区間と、書き換えた区間の2種類がある。
+書き換えた区間は、元のテキストの範囲（長さ0の場合は挿入）とマスキング後の範囲
+（長さ0の場合は削除）の対応だけを持つ。
+"""
+import json
+from bisect import bisect_right
+from typing import NamedTuple
+
+
+class AlignedSpan(NamedTuple):
+    """
+    元のテキストとマスキング後のテキストで対応する1つの区間
+    """
+    orig_start: int
+    orig_end: int
+    masked_start: int
+    masked_end: int
+    changed: bool   # 書き換えた区間かどうか（False の場合は元のテキストと同じ文字列）
+
+
+def substitute(pattern, repl, text, alignment=None):
+    """
+    pattern.sub(repl, text) と同じ置換を行い、アライメントを更新する
+
+    Args:
+        pattern (re.Pattern): 置換する正規表現
+        repl (str or callable): 置換文字列（グループ参照を含むテンプレート）または置換関数
+        text (str): 現在のマスキング後のテキスト
+        alignment (Alignment): 更新するアライメント（None の場合は置換のみ行う）
+
+    Returns:
+        str: 置換後のテキスト
+    """
+    if alignment is None:
+        return pattern.sub(repl, text)
+    edits = [(match.start(), match.end(), repl(match) if callable(repl) else match.expand(repl))
+             for match in pattern.finditer(text)]
+    return alignment.apply(text, edits)
+
+
+def replace_text(old, new, text, alignment=None):
+    """
+    text.replace(old, new) と同じ置換を行い、アライメントを更新する
+
+    Args:
+        old (str): 置換する文字列
+        new (str): 置換後の文字列
+        text (str): 現在のマスキング後のテキスト
+        alignment (Alignment): 更新するアライメント（None の場合は置換のみ行う）
+
+    Returns:
+        str: 置換後のテキスト
+    """
+    if alignment is None or not old:
+        return text.replace(old, new)
+    edits = []
+    position = text.find(old)
+    while position >= 0:
+        edits.append((position, position + len(old), new))
+        position = text.find(old, position + len(old))
+    return alignment.apply(text, edits)
+
+
+class Alignment:
+    """
+    元のテキストとマスキング後のテキストの位置の対応
+    """
+
+    def __init__(self, length):
+        """
+        初期化（書き換え前の、元のテキスト全体をそのまま写した状態）
+
+        Args:
+            length (int): 元のテキストの文字数
+        """
+        self.orig_length = length
+        self.masked_length = length
+        # (マスキング後の開始, マスキング後の終了, 元の開始, 元の終了, 書き換えたかどうか) のリスト
+        self._spans = [(0, length, 0, length, False)] if length else []
+
+    @property
+    def spans(self):
+        """
+        区間の一覧（元のテキスト・マスキング後のテキストのどちらについても、先頭から隙間なく並ぶ）
+
+        Returns:
+            list: AlignedSpan のリスト
+        """
+        return [AlignedSpan(orig_start, orig_end, masked_start, masked_end, changed)
+                for masked_start, masked_end, orig_start, orig_end, changed in self._spans]
+
+    def changes(self):
+        """
+        書き換えた区間の一覧
+
+        Returns:
+            list: 書き換えた区間の AlignedSpan のリスト
+        """
+        return [span for span in self.spans if span.changed]
+
+    def apply(self, text, edits):
+        """
+        現在のマスキング後のテキストを書き換え、区間を更新する
+
+        置換前後の文字列に共通する先頭・末尾は書き換えていないものとして扱う。
+        書き換える範囲が書き換え済みの区間の途中から始まる（終わる）場合は、その区間全体を
+        書き換える範囲に含める（区間の中の位置の対応は分からないため）。
+
+        Args:
+            text (str): 現在のマスキング後のテキスト
+            edits (list): 重ならない (開始位置, 終了位置, 置換後の文字列) のリスト（位置の昇順）
+
+        Returns:
+            str: 書き換えたテキスト
+        """
+        regions = self._regions(text, edits)
+        if not regions:
+            return text
+
+        spans = self._spans
+        result = []
+        index = 0        # 次に処理する区間
+        position = 0     # 処理済みのマスキング後の位置
+        offset = 0       # 書き換え後のマスキング後の位置
+
+        def copy_until(stop):
+            # stop より前の区間をそのまま（写した区間は stop で分割して）書き換え後の位置に移す
+            nonlocal index, position, offset
+            while index < len(spans) and spans[index][0] < stop:
+                masked_start, masked_end, orig_start, orig_end, changed = spans[index]
+                end = min(masked_end, stop)
+                if changed:
+                    result.append((offset, offset + end - position, orig_start, orig_end, True))
+                else:
+                    shift = position - masked_start
+                    result.append((offset, offset + end - position, orig_start + shift,
+                                   orig_start + shift + end - position, False))
+                offset += end - position
+                position = end
+                if end < masked_end:
+                    break
+                index += 1
+
+        pieces = []
+        for start, end, replacement in regions:
+            pieces.append(text[position:start])
+            copy_until(start)
+
+            # 書き換える範囲の元のテキストの範囲を求める（範囲の両端にある削除済みの区間も含める）
+            if index < len(spans):
+                masked_start, _, orig_start, _, changed = spans[index]
+                orig_begin = orig_start if changed else orig_start + start - masked_start
+            else:
+                orig_begin = self.orig_length
+            orig_finish = orig_begin
+            while index < len(spans) and (spans[index][0] < end or spans[index][0] == spans[index][1] == end):
+                masked_start, masked_end, orig_start, orig_end, changed = spans[index]
+                if not changed and masked_end > end:
+                    orig_finish = orig_start + end - masked_start
+                    break
+                orig_finish = orig_end
+                index += 1
+
+            result.append((offset, offset + len(replacement), orig_begin, orig_finish, True))
+            offset += len(replacement)
+            position = end
+            pieces.append(replacement)
+
+        pieces.append(text[position:])
+        copy_until(len(text))
+        # 末尾に残った削除済みの区間
+        result.extend((offset, offset, orig_start, orig_end, True)
+                      for _, _, orig_start, orig_end, _ in spans[index:])
+        self._spans = _merge_copies(result)
+        self.masked_length = offset
+        return ''.join(pieces)
+
+    def _regions(self, text, edits):
+        # 共通する先頭・末尾を除き、書き換え済みの区間の途中で切れないよう広げ、重なる範囲をまとめる
+        spans = self._spans
+        starts = [span[0] for span in spans]
+        groups = []   # [広げた開始位置, 広げた終了位置, [(開始位置, 終了位置, 置換後の文字列), ...]]
+        for start, end, replacement in edits:
+            old = text[start:end]
+            limit = min(len(old), len(replacement))
+            prefix = 0
+            while prefix < limit and old[prefix] == replacement[prefix]:
+                prefix += 1
+            suffix = 0
+            while suffix < limit - prefix and old[-1 - suffix] == replacement[-1 - suffix]:
+                suffix += 1
+            start += prefix
+            end -= suffix
+            replacement = replacement[prefix:len(replacement) - suffix]
+            if start == end and not replacement:
+                continue
+
+            # 書き換え済みの区間の途中で始まる・終わる場合は区間全体に広げる
+            region_start, region_end = start, end
+            index = bisect_right(starts, start) - 1
+            if index >= 0 and spans[index][4] and spans[index][0] < start < spans[index][1]:
+                region_start = spans[index][0]
+            index = bisect_right(starts, end) - 1
+            if index >= 0 and spans[index][4] and spans[index][0] < end < spans[index][1]:
+                region_end = spans[index][1]
+
+            if groups and region_start < groups[-1][1]:
+                groups[-1][1] = max(groups[-1][1], region_end)
+                groups[-1][2].append((start, end, replacement))
+            else:
+                groups.append([region_start, region_end, [(start, end, replacement)]])
+
+        regions = []
+        for region_start, region_end, group in groups:
+            pieces = []
+            position = region_start
+            for start, end, replacement in group:
+                pieces.append(text[position:start])
+                pieces.append(replacement)
+                position = end
+            pieces.append(text[position:region_end])
+            regions.append((region_start, region_end, ''.join(pieces)))
+        return regions
+
+    def to_original(self, start, end):
+        """
+        マスキング後のテキストの範囲を元のテキストの範囲に変換する
+
+        Args:
+            start (int): マスキング後のテキストの開始位置
+            end (int): マスキング後のテキストの終了位置
+
+        Returns:
+            tuple: 元のテキストの (開始位置, 終了位置)（書き換えた区間にかかる場合はその区間全体に広げる）
+        """
+        return self._convert(start, end, source=0, target=2)
+
+    def to_masked(self, start, end):
+        """
+        元のテキストの範囲をマスキング後のテキストの範囲に変換する
+
+        Args:
+            start (int): 元のテキストの開始位置
+            end (int): 元のテキストの終了位置
+
+        Returns:
+            tuple: マスキング後のテキストの (開始位置, 終了位置)（書き換えた区間にかかる場合はその区間全体に広げる）
+        """
+        return self._convert(start, end, source=2, target=0)
+
+    def _convert(self, start, end, source, target):
+        # source / target は区間のタプルの位置（0: マスキング後, 2: 元）
+        begin = finish = None
+        for span in self._spans:
+            span_start, span_end = span[source], span[source + 1]
+            if begin is None and start < span_end:
+                begin = span[target] if span[4] else span[target] + start - span_start
+            if span_start < end <= span_end:
+                finish = span[target + 1] if span[4] else span[target] + end - span_start
+                break
+        length = self.masked_length if target == 0 else self.orig_length
+        if begin is None:
+            begin = length
+        if finish is None or end <= start:
+            finish = begin
+        return begin, max(begin, finish)
+
+
+def _merge_copies(spans):
+    # 隣り合う写した区間を1つにまとめ、長さ0の区間を除く
+    merged = []
+    for span in spans:
+        if span[0] == span[1] and span[2] == span[3]:
+            continue
+        if merged and not span[4] and not merged[-1][4]:
+            previous = merged[-1]
+            merged[-1] = (previous[0], span[1], previous[2], span[3], False)
+        else:
+            merged.append(span)
+    return merged
+
+
+def format_alignment(alignment):
+    """
+    書き換えた区間を CSV に出力する文字列に変換する
+
+    Args:
+        alignment (Alignment): アライメント
+
+    Returns:
+        str: [[元の開始, 元の終了, マスキング後の開始, マスキング後の終了], ...] の JSON
+            （書き換えていない部分は、直前の書き換えた区間からのずれで求められる）
+    """
+    return json.dumps([[span.orig_start, span.orig_end, span.masked_start, span.masked_end]
+                       for span in alignment.changes()], separators=(',', ':'))
@@ -0,0 +1,694 @@
+"""
+複数ファイルの一括マスキング処理を行うモジュール
+
+入力ファイル群をタスクに分割（大きなファイルは分割、小さなファイルは
+まとめて1タスクに詰める）し、共有のワーカープールで処理する。ワーカーが複数の場合、
+タスクの大きさは既定では文字数の予算で決める（src/scheduler.py）。
+
+一括処理ではファイル全体をメモリに読み込むため、一定以上の大きさのファイルは
+一括処理の後に1ファイルずつパイプライン（src/pipeline.py）でチャンク単位に処理する。
+"""
+import logging
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .alignment import Alignment, format_alignment
+from .counter import count_masked_info, format_count_result
+from .detection import format_detections
+from .log_utils import worker_log_settings
+from .memory import install_pressure_flag
+from .quarantine import ErrorBudgetExceeded, describe_error
+from .registry import get_default_engine
+from .scheduler import AdaptiveScheduler, format_scheduler_stats, text_lengths
+from .shm_transport import discard_columns, pack_columns, start_tracker, unpack_columns
+
+logger = logging.getLogger(__name__)
+
+# 入力が無効な行に設定するカウント情報
+EMPTY_COUNT = format_count_result(count_masked_info([]))
+
+# ワーカープロセスごとに保持するマスカー
+_worker_masker = None
+
+# タスクの分割方式（'adaptive': 文字数の予算で分割, 'rows': 行数で分割）
+SCHEDULES = ('adaptive', 'rows')
+
+# 1ワーカーあたりの投入済みで未完了のタスク数の上限
+IN_FLIGHT_PER_WORKER = 2
+
+# 元のテキストとマスキング後のテキストの位置の対応を出力するカラム
+ALIGNMENT_COLUMN = 'mask_alignment'
+
+# この大きさ（バイト、圧縮されている場合は圧縮後）以上のファイルは全体を読み込まず、チャンク単位に処理する
+STREAM_FILE_BYTES = 256 << 20
+
+# 入力CSVの読み込み方法（1ファイルのパイプライン処理と同じく、すべてのカラムを文字列のまま扱う）
+READ_OPTIONS = {'dtype': str, 'keep_default_na': False}
+
+
+def mask_records(masker, texts, totals=None, policy=None, failures=None, row_offset=0, alignment=False):
+    """
+    テキストのリストをまとめてマスキングする
+
+    policy を指定した場合、行の処理中に発生した例外はその行だけに閉じ込め、
+    代替出力で埋めて処理を続ける。try/except はループ全体を囲むだけなので、
+    失敗しない行には例外処理のコストがかからない。
+
+    Args:
+        masker (PersonalInfoMasker): マスキング処理のインスタンス
+        texts (iterable): 問い合わせ文（文字列以外は無効な入力として扱う）
+        totals (Counter): 種類ごとの検出数を加算するカウンター（省略可）
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー（省略時は例外をそのまま送出）
+        failures (list): 失敗した行の (行番号, 失敗理由, テキスト) を追加するリスト
+            （複数回の呼び出しで共有すると、エラーバジェットは累計で判定される）
+        row_offset (int): texts の先頭行の行番号
+        alignment (bool): 元のテキストとマスキング後のテキストの位置の対応（format_alignment の JSON）も返すかどうか
+
+    Returns:
+        tuple: (マスキング後テキストのリスト, マスキング項目文字列のリスト, カウント文字列のリスト)
+            alignment が True の場合は、末尾に位置の対応のリストを加えた4要素
+
+    Raises:
+        ErrorBudgetExceeded: 失敗した行数がポリシーの上限を超えた場合
+    """
+    masked_texts = []
+    masked_items_list = []
+    count_list = []
+    alignment_list = []
+    if failures is None:
+        failures = []
+
+    def append_result(masked_text, masked_items, text_alignment=None):
+        count_info = count_masked_info(masked_items)
+        if totals is not None:
+            totals.update(count_info)
+        masked_texts.append(masked_text)
+        masked_items_list.append(','.join(masked_items) if masked_items else '')
+        count_list.append(format_count_result(count_info))
+        if alignment:
+            alignment_list.append(format_alignment(text_alignment))
+
+    iterator = iter(texts)
+    while True:
+        try:
+            for text in iterator:
+                if not isinstance(text, str):
+                    # 無効な入力の場合は空の値を設定
+                    masked_texts.append('')
+                    masked_items_list.append('')
+                    count_list.append(EMPTY_COUNT)
+                    if alignment:
+                        alignment_list.append('[]')
+                elif alignment:
+                    masked_text, detections, text_alignment = masker.mask_aligned(text)
+                    append_result(masked_text, format_detections(detections, text, masker.categories),
+                                  text_alignment)
+                else:
+                    append_result(*masker.mask_personal_info(text))
+            break
+        except ErrorBudgetExceeded:
+            raise
+        except Exception as e:
+            if policy is None:
+                raise
+            # 失敗した行だけを代替出力で埋め、次の行から処理を続ける
+            failures.append((row_offset + len(masked_texts), describe_error(e), text))
+            policy.check(len(failures), row_offset + len(masked_texts) + 1)
+            masked_text, masked_items = policy.fallback_result(text, masker.engine, masker.pseudonymizer)
+            text_alignment = None
+            if alignment:
+                # 代替出力は行の処理とは別に作るため、行全体を書き換えた区間として記録する
+                text = text if isinstance(text, str) else ''
+                text_alignment = Alignment(len(text))
+                text_alignment.apply(text, [(0, len(text), masked_text)])
+            append_result(masked_text, masked_items, text_alignment)
+
+    if alignment:
+        return masked_texts, masked_items_list, count_list, alignment_list
+    return masked_texts, masked_items_list, count_list
+
+
+def plan_tasks(file_rows, chunk_rows):
+    """
+    ファイルごとの行数からタスクを組み立てる
+
+    chunk_rows 以上の行を持つファイルは chunk_rows 行ずつに分割し、
+    それより小さいファイルは合計が chunk_rows を超えない範囲で1タスクにまとめる。
+
+    Args:
+        file_rows (list): (ファイル番号, 行数) のリスト
+        chunk_rows (int): 1タスクあたりの行数の目安
+
+    Returns:
+        list: タスクのリスト。各タスクは (ファイル番号, 開始行, 終了行) のリスト
+    """
+    tasks = []
+    pack = []
+    pack_rows = 0
+
+    for file_index, num_rows in file_rows:
+        if num_rows >= chunk_rows:
+            for start in range(0, num_rows, chunk_rows):
+                tasks.append([(file_index, start, min(start + chunk_rows, num_rows))])
+            continue
+
+        if pack and pack_rows + num_rows > chunk_rows:
+            tasks.append(pack)
+            pack = []
+            pack_rows = 0
+        pack.append((file_index, 0, num_rows))
+        pack_rows += num_rows
+
+    if pack:
+        tasks.append(pack)
+
+    return tasks
+
+
+def _init_worker(use_nlp, engine=None, pseudonymizer=None):
+    """
+    ワーカープロセスの初期化（マスカーを一度だけ作成する）
+
+    Args:
+        use_nlp (bool): NLPを使用するかどうか
+        engine (PatternEngine): 親プロセスで組み立てたパターンエンジン
+        pseudonymizer (Pseudonymizer): 親プロセスで作成した仮名化のインスタンス（仮名テーブルごと渡される）
+    """
+    global _worker_masker
+    from .masking import PersonalInfoMasker
+    _worker_masker = PersonalInfoMasker(use_nlp=use_nlp, engine=engine, pseudonymizer=pseudonymizer)
+
+
+def _init_process_worker(use_nlp, engine=None, pseudonymizer=None, pressure_flag=None, log_settings=None):
+    """
+    ワーカープロセスの初期化（ログ設定とマスカーの作成）
+
+    Args:
+        use_nlp (bool): NLPを使用するかどうか
+        engine (PatternEngine): 親プロセスで組み立てたパターンエンジン
+        pseudonymizer (Pseudonymizer): 親プロセスで作成した仮名化のインスタンス
+        pressure_flag (RawValue): 親プロセスの MemoryMonitor と共有するメモリ逼迫のフラグ
+        log_settings (tuple): 親プロセスのログの送り先（log_utils.worker_log_settings の戻り値）
+    """
+    from .log_utils import configure_worker_logging
+    configure_worker_logging(log_settings)
+    install_pressure_flag(pressure_flag)
+    _init_worker(use_nlp, engine, pseudonymizer)
+
+
+def _mask_task(task, policy=None, transport='pickle', alignment=False):
+    """
+    ワーカープロセスで1タスク分のテキストをマスキングする
+
+    Args:
+        task (list): (ファイル番号, 開始行, テキストのリスト) のリスト
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+        transport (str): マスキング結果の受け渡しの方式（'shm' の場合は共有メモリに書き込み、
+            受け取る側で unpack_columns を呼ぶ）
+        alignment (bool): 位置の対応のカラムもマスキング結果に含めるかどうか
+
+    Returns:
+        tuple: ((ファイル番号, 開始行, マスキング結果, 失敗した行のリスト) のリスト, 種類ごとの検出数,
+            アンカーによる走査の省略の統計, ワーカーでの処理時間（秒）,
+            このタスクで新しく作成した仮名（仮名を記録していない場合は None）)
+    """
+    started = time.perf_counter()
+    totals = Counter()
+    results = []
+    _worker_masker.take_stats()
+    for file_index, start, texts in task:
+        failures = []
+        masked = mask_records(_worker_masker, texts, totals, policy=policy, failures=failures, row_offset=start,
+                              alignment=alignment)
+        results.append((file_index, start, pack_columns(masked, transport), failures))
+    pseudonymizer = _worker_masker.pseudonymizer
+    new_pseudonyms = pseudonymizer.take_new() if pseudonymizer is not None else None
+    return results, totals, _worker_masker.take_stats(), time.perf_counter() - started, new_pseudonyms
+
+
+class _FailedTaskMasker:
+    """
+    タスク全体が失敗した場合に、各行を失敗した行として mask_records に渡すためのマスカーの代わり
+
+    どの行でもタスクの失敗の原因となった例外を送出するため、各行はポリシーの代替出力で埋められる。
+    """
+
+    def __init__(self, error, engine=None, pseudonymizer=None):
+        self.error = error
+        self.engine = engine
+        self.pseudonymizer = pseudonymizer
+
+    def mask_personal_info(self, text):
+        raise self.error
+
+    def mask_aligned(self, text):
+        raise self.error
+
+
+def fallback_task(payload, policy, error, engine=None, pseudonymizer=None, alignment=False):
+    """
+    タスク全体が失敗した場合に、タスクのすべての行をポリシーの代替出力で埋める
+
+    ワーカープロセスを異常終了させた可能性のある行を呼び出し元のプロセスで同じ方法で
+    再処理しないよう、各行は policy.fallback_result（正規表現のみでの再処理、または全文を伏せる）
+    で埋め、失敗した行として記録する。
+
+    Args:
+        payload (list): 失敗したタスク（(ファイル番号, 開始行, テキストのリスト) のリスト）
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+        error (Exception): タスクの失敗の原因となった例外（隔離ファイルの失敗理由になる）
+        engine (PatternEngine): 代替出力の再処理に使うパターンエンジン
+        pseudonymizer (Pseudonymizer): 代替出力の再処理で仮名化する場合のインスタンス
+        alignment (bool): 位置の対応のカラムもマスキング結果に含めるかどうか
+
+    Returns:
+        tuple: _mask_task と同じ形式の結果（処理時間は0、新しく作成した仮名は None）
+
+    Raises:
+        ErrorBudgetExceeded: 失敗した行数がポリシーの上限を超えた場合
+    """
+    masker = _FailedTaskMasker(error, engine, pseudonymizer)
+    totals = Counter()
+    results = []
+    for file_index, start, texts in payload:
+        failures = []
+        masked = mask_records(masker, texts, totals, policy=policy, failures=failures, row_offset=start,
+                              alignment=alignment)
+        results.append((file_index, start, masked, failures))
+    return results, totals, {'rows': 0, 'skipped': Counter()}, 0.0, None
+
+
+def discard_task_results(future):
+    """
+    受け取らなかったタスクの結果が共有メモリにある場合は解放する
+
+    Args:
+        future (Future): _mask_task のフューチャー
+    """
+    if not future.done() or future.cancelled() or future.exception() is not None:
+        return
+    for _, _, masked, _ in future.result()[0]:
+        discard_columns(masked)
+
+
+class _InlineExecutor:
+    """
+    ワーカー数が1の場合に呼び出し元のプロセスでタスクを実行する簡易エグゼキューター
+    """
+
+    def __init__(self, use_nlp, engine=None, pseudonymizer=None):
+        _init_worker(use_nlp, engine, pseudonymizer)
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def process_files(jobs, inquiry_column, use_nlp=True, workers=1, chunk_rows=1000, io_workers=2,
+                  policy=None, quarantine=None, engine=None, pseudonymizer=None, transport='pickle',
+                  schedule='adaptive', memory=None, metrics=None, alignment=False, stream_bytes=STREAM_FILE_BYTES):
+    """
+    複数のCSVファイルを共有のワーカープールでマスキングする
+
+    policy を指定した場合、行単位の失敗は代替出力で埋めて quarantine に記録する。
+    ワーカープロセスが異常終了した場合は、プールを作り直して失敗したタスクを一度だけ
+    再投入する。それでも失敗したタスク（またはそれ以外の理由で失敗したタスク）は、
+    そのタスクの各行を代替出力で埋めて quarantine に記録する。失敗行数がエラーバジェットを
+    超えた場合は残りのタスクを取り消し、未完了のファイルは出力しない。
+
+    タスクは完了に合わせて順に投入し、未完了のタスク数をワーカー数に比例した上限に抑える。
+    schedule が 'adaptive' でワーカーが複数の場合は、完了したタスクの処理時間から
+    次に投入するタスクの文字数予算を決める。memory を指定した場合、メモリ使用量が上限に
+    近づくと未完了のタスク数の上限を下げる。
+
+    stream_bytes 以上の大きさのファイルは全体を読み込まず、一括処理の後に1ファイルずつ
+    CSVPipeline でチャンク単位に処理する（出力は一括処理した場合と同じ）。
+
+    Args:
+        jobs (list): (入力ファイルパス, 出力ファイルパス) のリスト
+        inquiry_column (str): 問い合わせ文のカラム名
+        use_nlp (bool): NLPを使用するかどうか
+        workers (int): マスキングを行うワーカープロセス数
+        chunk_rows (int): 1タスクあたりの行数の目安（schedule が 'rows' またはワーカー数が1の場合）
+        io_workers (int): 同時に読み書きするファイル数の上限
+        policy (ErrorPolicy): 行単位で失敗した場合のポリシー（省略時は失敗したタスクのファイルを失敗扱い）
+        quarantine (QuarantineWriter): 失敗した行の書き出し先
+        engine (PatternEngine): ワーカーに渡すパターンエンジン（省略時は既定のエンジン）
+        pseudonymizer (Pseudonymizer): 指定した場合は仮名化する（仮名は鍵と値のみで決まるため、
+            ワーカーごとのテーブルで作成した仮名も一致する）
+        transport (str): ワーカープロセスからのマスキング結果の受け渡しの方式（'pickle' または 'shm'）
+        schedule (str): タスクの分割方式（'adaptive' または 'rows'）
+        memory (MemoryMonitor): 開始済みのメモリの監視（省略時は監視しない）
+        metrics (MetricsRegistry): 処理行数・検出数・未完了のタスク数などを記録するメトリクス（省略可）
+        alignment (bool): 元のテキストとマスキング後のテキストの位置の対応を ALIGNMENT_COLUMN に出力するかどうか
+        stream_bytes (int): この大きさ（バイト）以上のファイルはチャンク単位に処理する
+
+    Returns:
+        dict: 全ファイルを通した処理結果のサマリー
+    """
+    import os
+
+    from .compression import detect_compression, read_csv, write_csv
+    from .io_utils import atomic_output
+
+    start_time = time.perf_counter()
+    summary = {
+        'files': len(jobs),
+        'succeeded': 0,
+        'failed': [],
+        'rows': 0,
+        'counts': Counter(),
+        'errors': 0,
+        'aborted': None,
+        'scan': {'rows': 0, 'skipped': Counter()},
+        'scheduler': None,
+    }
+
+    # 大きなファイルは全体を読み込まず、一括処理の後にチャンク単位で処理する
+    streamed = []
+    batched = []
+    for index, (input_file, _) in enumerate(jobs):
+        try:
+            large = os.path.getsize(input_file) >= stream_bytes
+        except OSError:
+            large = False  # 読み込みの失敗として扱う
+        (streamed if large else batched).append(index)
+
+    # 入力ファイルの読み込み（同時読み込み数を io_workers に制限する）
+    frames = {}
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+        futures = {io_pool.submit(read_csv, jobs[index][0], **READ_OPTIONS): index for index in batched}
+        for future in as_completed(futures):
+            index = futures[future]
+            input_file = jobs[index][0]
+            try:
+                df = future.result()
+            except Exception as e:
+                logger.error(f"'{input_file}' の読み込みに失敗しました: {e}")
+                summary['failed'].append(input_file)
+                continue
+            if inquiry_column not in df.columns:
+                logger.error(f"指定されたカラム '{inquiry_column}' が '{input_file}' に存在しません")
+                summary['failed'].append(input_file)
+                continue
+            frames[index] = df
+
+    # 大きなファイルは分割し、小さなファイルはまとめてタスクを作る
+    indices = sorted(index for index, df in frames.items() if len(df))
+    if schedule == 'adaptive' and workers > 1:
+        scheduler = AdaptiveScheduler(workers)
+        planned = scheduler.plan([(index, text_lengths(frames[index][inquiry_column].tolist()))
+                                  for index in indices])
+        logger.info(f"{len(frames)} ファイルを文字数に応じたタスクに分割し、{workers} ワーカーで処理します")
+    else:
+        scheduler = None
+        tasks = plan_tasks([(index, len(frames[index])) for index in indices], chunk_rows)
+        planned = ((task, 0) for task in tasks)
+        logger.info(f"{len(frames)} ファイルを {len(tasks)} タスクに分割し、{workers} ワーカーで処理します")
+
+    results = {index: [None] * len(df) for index, df in frames.items()}
+    remaining = {index: len(df) for index, df in frames.items()}
+
+    def write_output(index):
+        df = frames.pop(index)
+        columns = list(zip(*results.pop(index))) if len(df) else [()] * (4 if alignment else 3)
+        df['masked_inquiry'] = list(columns[0])
+        df['masked_items'] = list(columns[1])
+        df['mask_count'] = list(columns[2])
+        if alignment:
+            df[ALIGNMENT_COLUMN] = list(columns[3])
+        output_file = jobs[index][1]
+        with atomic_output(output_file) as tmp_path:
+            write_csv(df, tmp_path, detect_compression(output_file), index=False)
+        logger.info(f"処理結果を '{output_file}' に保存しました ({len(df)} 件)")
+        return len(df)
+
+    # パターンエンジンは親プロセスで一度だけ組み立て、ワーカーには定義のみを送る
+    if engine is None:
+        engine = get_default_engine()
+
+    def start_executor():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker,
+                                   initargs=(use_nlp, engine, pseudonymizer,
+                                             memory.pressure_flag if memory is not None else None,
+                                             worker_log_settings()))
+
+    if workers > 1:
+        if transport == 'shm':
+            start_tracker()
+        executor = start_executor()
+    else:
+        transport = 'pickle'
+        executor = _InlineExecutor(use_nlp, engine, pseudonymizer)
+
+    io_pool = ThreadPoolExecutor(max_workers=io_workers)
+    write_futures = {}
+    futures = {}
+    consumed = set()
+    # ワーカープロセスの異常終了で失敗し、作り直したプールに再投入するタスク
+    retries = []
+    try:
+        # 行数0のファイルはそのまま出力する
+        for index in [index for index, rows in remaining.items() if rows == 0]:
+            write_futures[io_pool.submit(write_output, index)] = index
+
+        def completed():
+            # 完了したタスクの分だけ次のタスクを投入する（スケジューラーは投入時点の予算で分割する）
+            pending = set()
+            limit = max(1, workers) * IN_FLIGHT_PER_WORKER
+            while True:
+                while len(pending) < limit:
+                    if memory is not None and memory.should_wait(len(pending), limit):
+                        break
+                    if retries:
+                        payload, chars, retried = retries.pop()
+                    else:
+                        planned_task = next(planned, None)
+                        if planned_task is None:
+                            break
+                        task, chars = planned_task
+                        payload = [
+                            (index, start, frames[index][inquiry_column].iloc[start:stop].tolist())
+                            for index, start, stop in task
+                        ]
+                        retried = False
+                    try:
+                        future = executor.submit(_mask_task, payload, policy, transport, alignment)
+                    except BrokenProcessPool:
+                        # プールの異常終了を受け取る前の投入は、プールを作り直した後に投入し直す
+                        retries.append((payload, chars, retried))
+                        break
+                    futures[future] = (payload, chars, retried, executor)
+                    pending.add(future)
+                if not pending:
+                    return
+                if metrics is not None:
+                    metrics.set('queue_depth', len(pending), ('tasks',))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from done
+
+        rows_done = 0
+        for future in completed():
+            payload, chars, retried, pool = futures[future]
+            consumed.add(future)
+            try:
+                task_results, totals, scan, elapsed, new_pseudonyms = future.result()
+                if scheduler is not None:
+                    scheduler.record(chars, elapsed)
+            except ErrorBudgetExceeded as e:
+                summary['aborted'] = str(e)
+                break
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool) and not retried:
+                    # ワーカープロセスが異常終了した場合は、プールを作り直してタスクを一度だけ再投入する
+                    if pool is executor:
+                        logger.warning(f"ワーカープロセスが異常終了したため、プールを作り直します: {e}")
+                        executor.shutdown(wait=True)
+                        executor = start_executor()
+                    retries.append((payload, chars, True))
+                    continue
+                if policy is None:
+                    logger.error(f"タスクの処理に失敗しました: {e}")
+                    for index, _, _ in payload:
+                        if index in remaining:
+                            remaining.pop(index)
+                            summary['failed'].append(jobs[index][0])
+                    continue
+                # ワーカーを異常終了させた可能性のある行は再処理せず、代替出力で埋めて隔離する
+                rows = sum(len(texts) for _, _, texts in payload)
+                logger.warning(f"タスクの処理に失敗したため、{rows} 行を代替出力で補完します: {e}")
+                try:
+                    task_results, totals, scan, _, new_pseudonyms = fallback_task(payload, policy, e, engine,
+                                                                                  pseudonymizer, alignment)
+                except ErrorBudgetExceeded as e:
+                    summary['aborted'] = str(e)
+                    break
+
+            if new_pseudonyms:
+                # ワーカーで作成した仮名を親プロセスのテーブルに集める（--pseudonym-table で保存するため）
+                pseudonymizer.merge(new_pseudonyms)
+            summary['counts'].update(totals)
+            summary['scan']['rows'] += scan['rows']
+            summary['scan']['skipped'].update(scan['skipped'])
+            if metrics is not None:
+                metrics.record_masker_stats(scan)
+            for index, start, masked, failures in task_results:
+                columns = unpack_columns(masked)
+                rows_done += len(columns[0])
+                if metrics is not None:
+                    metrics.inc('rows_total', len(columns[0]))
+                    metrics.inc('row_errors_total', len(failures))
+                if failures:
+                    summary['errors'] += len(failures)
+                    if quarantine is not None:
+                        quarantine.write(jobs[index][0], failures)
+                if index not in remaining:
+                    continue
+                rows = list(zip(*columns))
+                results[index][start:start + len(rows)] = rows
+                remaining[index] -= len(rows)
+                if remaining[index] == 0:
+                    write_futures[io_pool.submit(write_output, index)] = index
+
+            if policy is not None:
+                try:
+                    policy.check(summary['errors'], rows_done)
+                except ErrorBudgetExceeded as e:
+                    summary['aborted'] = str(e)
+                    break
+
+        if summary['aborted']:
+            logger.error(f"エラーバジェットを超えたため処理を中断します: {summary['aborted']}")
+            for future in futures:
+                future.cancel()
+            for index, rows in remaining.items():
+                if rows > 0:
+                    summary['failed'].append(jobs[index][0])
+
+        for future in as_completed(write_futures):
+            input_file = jobs[write_futures[future]][0]
+            try:
+                summary['rows'] += future.result()
+                summary['succeeded'] += 1
+            except Exception as e:
+                logger.error(f"'{input_file}' の出力に失敗しました: {e}")
+                summary['failed'].append(input_file)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        io_pool.shutdown(wait=True)
+        if transport == 'shm':
+            for future in set(futures) - consumed:
+                discard_task_results(future)
+
+    if streamed:
+        _process_streamed(streamed, jobs, inquiry_column, summary, use_nlp=use_nlp, workers=workers, policy=policy,
+                          quarantine=quarantine, engine=engine, pseudonymizer=pseudonymizer, transport=transport,
+                          schedule=schedule, memory=memory, metrics=metrics, alignment=alignment)
+
+    summary['elapsed'] = time.perf_counter() - start_time
+    summary['counts'] = dict(summary['counts'])
+    if scheduler is not None:
+        summary['scheduler'] = scheduler.stats()
+    if metrics is not None:
+        metrics.set('queue_depth', 0, ('tasks',))
+        metrics.inc('files_total', summary['succeeded'], ('succeeded',))
+        metrics.inc('files_total', len(summary['failed']), ('failed',))
+    return summary
+
+
+def _process_streamed(indices, jobs, inquiry_column, summary, workers=1, **options):
+    """
+    大きなファイルを1ファイルずつパイプラインでチャンク単位に処理し、結果をサマリーに加える
+
+    Args:
+        indices (list): 処理するファイルの jobs の添字
+        jobs (list): (入力ファイルパス, 出力ファイルパス) のリスト
+        inquiry_column (str): 問い合わせ文のカラム名
+        summary (dict): process_files のサマリー（処理結果を加算する）
+        workers (int): マスキングを行うワーカープロセス数
+        **options: CSVPipeline に渡す引数
+    """
+    from .pipeline import CSVPipeline
+
+    for index in indices:
+        input_file, output_file = jobs[index]
+        if summary['aborted']:
+            summary['failed'].append(input_file)
+            continue
+        logger.info(f"'{input_file}' は大きいため、チャンク単位で処理します")
+        # ワーカー数が1の場合は、一括処理で作成したマスカーを使い回す
+        pipeline = CSVPipeline(input_file, output_file, inquiry_column, workers=workers,
+                               masker=_worker_masker if workers <= 1 else None, **options)
+        try:
+            rows = pipeline.run()
+        except ErrorBudgetExceeded as e:
+            summary['aborted'] = str(e)
+            summary['failed'].append(input_file)
+            logger.error(f"エラーバジェットを超えたため処理を中断します: {e}")
+        except Exception as e:
+            logger.error(f"'{input_file}' の処理に失敗しました: {e}")
+            summary['failed'].append(input_file)
+        else:
+            summary['succeeded'] += 1
+            summary['rows'] += rows
+            logger.info(f"処理結果を '{output_file}' に保存しました ({rows} 件)")
+        finally:
+            summary['errors'] += pipeline.failures
+            summary['counts'].update(pipeline.counts)
+            summary['scan']['rows'] += pipeline.scan['rows']
+            summary['scan']['skipped'].update(pipeline.scan['skipped'])
+
+
+def format_skip_rates(stats):
+    """
+    アンカーによる走査の省略率を表示用の文字列に変換する
+
+    Args:
+        stats (dict): PersonalInfoMasker.take_stats の戻り値の形式の統計
+
+    Returns:
+        str: カテゴリごとの省略率（例: 'email:97.5%, phone:64.0%'）
+    """
+    rows = stats['rows']
+    if not rows:
+        return 'なし'
+    return ', '.join(f"{category}:{count / rows:.1%}" for category, count in sorted(stats['skipped'].items()))
+
+
+def format_summary(summary):
+    """
+    一括処理のサマリーを表示用の文字列に変換する
+
+    Args:
+        summary (dict): process_files の戻り値
+
+    Returns:
+        str: フォーマットされたサマリー
+    """
+    counts = summary['counts']
+    rows_per_sec = summary['rows'] / summary['elapsed'] if summary['elapsed'] > 0 else 0.0
+    lines = [
+        f"ファイル数: {summary['files']} (成功: {summary['succeeded']}, 失敗: {len(summary['failed'])})",
+        f"処理行数: {summary['rows']} ({summary['elapsed']:.2f}秒, {rows_per_sec:.1f} 行/秒)",
+        f"検出数: {format_count_result({**count_masked_info([]), **counts})}",
+    ]
+    if summary.get('scan', {}).get('rows'):
+        lines.append(f"アンカーによる走査の省略率: {format_skip_rates(summary['scan'])}")
+    if summary.get('scheduler'):
+        lines.append(f"タスクの分割: {format_scheduler_stats(summary['scheduler'])}")
+    if summary.get('errors'):
+        lines.append(f"失敗した行数: {summary['errors']}（代替出力で補完）")
+    if summary.get('aborted'):
+        lines.append(f"中断: {summary['aborted']}")
+    for input_file in summary['failed']:
+        lines.append(f"失敗: {input_file}")
+    return '\n'.join(lines)
@@ -0,0 +1,204 @@
+"""
+チャンク単位のチェックポイント管理モジュール
+
+大きな入力をチャンクごとに処理し、処理済みのチャンクを部分ファイルとして
+コミットする。マニフェストに入力オフセットとハッシュを記録しておくことで、
+中断後に --resume で処理済みチャンクを読み飛ばして再開できる。
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from .compression import detect_compression, open_output
+from .io_utils import atomic_output
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def hash_texts(texts):
+    """
+    テキストのリストからハッシュ値を計算する
+
+    Args:
+        texts (iterable): テキストのリスト（文字列以外は str() で変換する）
+
+    Returns:
+        str: SHA-256 の16進文字列
+    """
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """
+    ファイル内容のハッシュ値を計算する
+
+    Args:
+        path (str): ファイルパス
+
+    Returns:
+        str: SHA-256 の16進文字列
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CheckpointManifest:
+    """
+    チャンクごとの処理状況を記録するマニフェスト
+    """
+
+    def __init__(self, checkpoint_dir, input_file, inquiry_column, chunk_rows):
+        """
+        初期化
+
+        Args:
+            checkpoint_dir (str): 部分ファイルとマニフェストを置くディレクトリ
+            input_file (str): 入力ファイルパス
+            inquiry_column (str): 問い合わせ文のカラム名
+            chunk_rows (int): 1チャンクあたりの行数
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.manifest_path = self.checkpoint_dir / 'manifest.json'
+        stat = os.stat(input_file)
+        self.header = {
+            'version': MANIFEST_VERSION,
+            'input_file': os.path.abspath(input_file),
+            'input_size': stat.st_size,
+            'inquiry_column': inquiry_column,
+            'chunk_rows': chunk_rows,
+        }
+        self.chunks = {}
+
+    def load(self):
+        """
+        既存のマニフェストを読み込む
+
+        入力ファイル・カラム・チャンクサイズのいずれかが異なる場合は
+        再開できないため、記録を破棄して最初から処理する。
+
+        Returns:
+            int: 再開可能なチャンク数
+        """
+        if not self.manifest_path.exists():
+            return 0
+
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest.get('header') != self.header:
+            logger.warning("チェックポイントの条件が現在の入力と一致しないため、最初から処理します")
+            self.chunks = {}
+            return 0
+
+        self.chunks = {int(index): chunk for index, chunk in manifest.get('chunks', {}).items()}
+        return len(self.chunks)
+
+    def save(self):
+        """
+        マニフェストをアトミックに保存する
+        """
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            'header': self.header,
+            'chunks': {str(index): chunk for index, chunk in sorted(self.chunks.items())},
+        }
+        with atomic_output(self.manifest_path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    def part_path(self, index):
+        """
+        チャンクの部分ファイルパスを返す
+
+        Args:
+            index (int): チャンク番号
+
+        Returns:
+            Path: 部分ファイルパス
+        """
+        return self.checkpoint_dir / f"part-{index:06d}.csv"
+
+    def is_done(self, index, start_row, input_hash):
+        """
+        チャンクが処理済みかどうかを判定する
+
+        マニフェストの記録に加え、部分ファイルのハッシュも照合する。
+
+        Args:
+            index (int): チャンク番号
+            start_row (int): チャンク先頭の入力行オフセット
+            input_hash (str): チャンクの入力テキストのハッシュ
+
+        Returns:
+            bool: 処理済みで部分ファイルも正しい場合 True
+        """
+        chunk = self.chunks.get(index)
+        if not chunk or chunk['start_row'] != start_row or chunk['input_sha256'] != input_hash:
+            return False
+
+        part_path = self.part_path(index)
+        if not part_path.exists() or hash_file(part_path) != chunk['output_sha256']:
+            logger.warning(f"チャンク {index} の部分ファイルが不正なため、再処理します")
+            return False
+        return True
+
+    def commit(self, index, start_row, num_rows, input_hash, df, header):
+        """
+        チャンクの処理結果を部分ファイルとして書き込み、マニフェストに記録する
+
+        Args:
+            index (int): チャンク番号
+            start_row (int): チャンク先頭の入力行オフセット
+            num_rows (int): チャンクの行数
+            input_hash (str): チャンクの入力テキストのハッシュ
+            df (pd.DataFrame): マスキング済みのチャンク
+            header (bool): CSVヘッダーを出力するかどうか（先頭チャンクのみ True）
+        """
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        part_path = self.part_path(index)
+        with atomic_output(part_path) as tmp_path:
+            df.to_csv(tmp_path, index=False, header=header)
+
+        self.chunks[index] = {
+            'start_row': start_row,
+            'rows': num_rows,
+            'input_sha256': input_hash,
+            'output_sha256': hash_file(part_path),
+        }
+        self.save()
+
+    def assemble(self, output_file, num_chunks):
+        """
+        コミット済みの部分ファイルを順に連結して最終出力を作成する
+
+        Args:
+            output_file (str): 出力ファイルパス
+            num_chunks (int): チャンク数
+        """
+        missing = [index for index in range(num_chunks) if index not in self.chunks]
+        if missing:
+            raise RuntimeError(f"未処理のチャンクがあります: {missing[:10]}")
+
+        with atomic_output(output_file) as tmp_path:
+            with open_output(tmp_path, detect_compression(output_file)) as out:
+                for index in range(num_chunks):
+                    with open(self.part_path(index), 'rb') as part:
+                        shutil.copyfileobj(part, out)
+
+    def cleanup(self):
+        """
+        部分ファイルとマニフェストを削除する
+        """
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
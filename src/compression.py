@@ -0,0 +1,448 @@
+"""
+圧縮された入出力（gzip / zstd）のストリーミング処理モジュール
+
+.csv.gz / .csv.zst の入力を一時ファイルに展開せず、別スレッドで展開しながら
+読み込めるようにする。展開・圧縮のスレッドとマスキング処理の間は上限付きの
+キューでつなぎ、I/O と CPU 処理を重ねて実行する（zlib・zstd は処理中に GIL を
+解放するため、スレッドでも並行して動作する）。
+
+複数フレームからなる zstd ファイルは、フレーム境界を求めてフレームごとに並列に
+展開する。zstd で出力する場合も一定サイズごとのフレームに分けて並列に圧縮する
+ため、出力したファイルは次回の入力時に並列に展開できる。
+
+zstd の入出力には zstandard パッケージが必要（gzip は標準ライブラリのみで動作する）。
+"""
+import gzip
+import io
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 圧縮形式
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+
+# 拡張子と圧縮形式の対応
+COMPRESSION_SUFFIXES = {
+    '.gz': COMPRESSION_GZIP,
+    '.gzip': COMPRESSION_GZIP,
+    '.zst': COMPRESSION_ZSTD,
+    '.zstd': COMPRESSION_ZSTD,
+}
+
+# 展開・圧縮スレッドとの間でやり取りするデータの単位（バイト）
+STREAM_BLOCK_SIZE = 1 << 20
+
+# スレッド間のキューに保持するブロック数の上限
+QUEUE_BLOCKS = 8
+
+# zstd で出力する際の1フレームあたりの展開後のサイズ（バイト）
+ZSTD_FRAME_SIZE = 8 << 20
+
+# zstd の圧縮レベルの既定値
+ZSTD_DEFAULT_LEVEL = 3
+
+# zstd のフレーム・ブロックの定数
+ZSTD_MAGIC = 0xFD2FB528
+ZSTD_SKIPPABLE_MAGIC_MASK = 0xFFFFFFF0
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+ZSTD_BLOCK_RLE = 1
+
+# キューの終端を表す値
+_END = object()
+
+
+def detect_compression(path):
+    """
+    ファイル名の拡張子から圧縮形式を判定する
+
+    Args:
+        path (str): ファイルパス
+
+    Returns:
+        str: 圧縮形式（'gzip' / 'zstd'）、圧縮されていない場合は None
+    """
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(str(path))[1].lower())
+
+
+def strip_compression_suffix(path):
+    """
+    圧縮形式の拡張子を除いたファイルパスを返す
+
+    Args:
+        path (str): ファイルパス
+
+    Returns:
+        tuple: (拡張子を除いたパス, 圧縮形式の拡張子（圧縮されていない場合は空文字列）)
+    """
+    base, suffix = os.path.splitext(str(path))
+    if suffix.lower() in COMPRESSION_SUFFIXES:
+        return base, suffix
+    return str(path), ''
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd の入出力には zstandard が必要です（pip install zstandard）") from e
+    return zstandard
+
+
+def _default_threads():
+    return min(4, os.cpu_count() or 1)
+
+
+class _QueueReader(io.RawIOBase):
+    """
+    別スレッドが展開したデータを上限付きキューから読み込むファイルオブジェクト
+    """
+
+    def __init__(self, produce):
+        """
+        初期化（展開スレッドを開始する）
+
+        Args:
+            produce (callable): ブロックを1つずつ渡すコールバックを受け取り、展開したデータを渡す関数
+        """
+        super().__init__()
+        self._queue = queue.Queue(maxsize=QUEUE_BLOCKS)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b'')
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, args=(produce,), name='decompress', daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # 読み込み側が閉じられた場合は待機をやめる
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, produce):
+        try:
+            produce(self._put)
+        except BaseException as e:
+            self._put(e)
+        else:
+            self._put(_END)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            if self._finished:
+                return 0
+            item = self._queue.get()
+            if item is _END:
+                self._finished = True
+                return 0
+            if isinstance(item, BaseException):
+                self._finished = True
+                raise item
+            self._buffer = memoryview(item)
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
+
+
+class _QueueWriter(io.RawIOBase):
+    """
+    書き込んだデータを上限付きキュー経由で別スレッドに渡して圧縮するファイルオブジェクト
+    """
+
+    def __init__(self, consume):
+        """
+        初期化（圧縮スレッドを開始する）
+
+        Args:
+            consume (callable): データを1ブロックずつ返すイテレーターを受け取り、圧縮して書き出す関数
+        """
+        super().__init__()
+        self._queue = queue.Queue(maxsize=QUEUE_BLOCKS)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(consume,), name='compress', daemon=True)
+        self._thread.start()
+
+    def _blocks(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            yield item
+
+    def _run(self, consume):
+        try:
+            consume(self._blocks())
+        except BaseException as e:
+            self._error = e
+            # 書き込み側が待機し続けないよう、残りのデータを読み捨てる
+            for _ in self._blocks():
+                pass
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(bytes(data))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._queue.put(_END)
+            self._thread.join()
+            super().close()
+            if self._error is not None:
+                raise self._error
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('zstd のフレームが途中で終わっています')
+    return data
+
+
+def zstd_frame_spans(path):
+    """
+    zstd ファイルのフレームごとの範囲を求める（ヘッダーとブロックヘッダーのみを読む）
+
+    Args:
+        path (str): zstd ファイルパス
+
+    Returns:
+        list: (開始オフセット, 長さ) のリスト（スキップ可能フレームは含まない）
+
+    Raises:
+        ValueError: zstd の形式として不正な場合
+    """
+    spans = []
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        position = 0
+        while position < size:
+            f.seek(position)
+            magic = int.from_bytes(_read_exact(f, 4), 'little')
+            if magic & ZSTD_SKIPPABLE_MAGIC_MASK == ZSTD_SKIPPABLE_MAGIC:
+                position += 8 + int.from_bytes(_read_exact(f, 4), 'little')
+                continue
+            if magic != ZSTD_MAGIC:
+                raise ValueError(f"'{path}' の {position} バイト目は zstd のフレームではありません")
+
+            descriptor = _read_exact(f, 1)[0]
+            content_size_flag = descriptor >> 6
+            single_segment = descriptor >> 5 & 1
+            has_checksum = descriptor >> 2 & 1
+            dictionary_id_flag = descriptor & 3
+            header_size = (
+                (0 if single_segment else 1)
+                + (0, 1, 2, 4)[dictionary_id_flag]
+                + (single_segment, 2, 4, 8)[content_size_flag]
+            )
+            offset = position + 5 + header_size
+
+            while True:
+                f.seek(offset)
+                block_header = int.from_bytes(_read_exact(f, 3), 'little')
+                last_block = block_header & 1
+                block_type = block_header >> 1 & 3
+                block_size = block_header >> 3
+                offset += 3 + (1 if block_type == ZSTD_BLOCK_RLE else block_size)
+                if last_block:
+                    break
+            if has_checksum:
+                offset += 4
+            if offset > size:
+                raise ValueError('zstd のフレームが途中で終わっています')
+            spans.append((position, offset - position))
+            position = offset
+    return spans
+
+
+def _produce_gzip(path):
+    def produce(put):
+        with gzip.open(path, 'rb') as f:
+            while True:
+                block = f.read(STREAM_BLOCK_SIZE)
+                if not block or not put(block):
+                    return
+    return produce
+
+
+def _produce_zstd(path, threads):
+    zstandard = _import_zstandard()
+
+    def produce(put):
+        spans = zstd_frame_spans(path)
+        if len(spans) <= 1 or threads <= 1:
+            # 単一フレームの場合は順に展開する
+            with open(path, 'rb') as f:
+                reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                while True:
+                    block = reader.read(STREAM_BLOCK_SIZE)
+                    if not block or not put(block):
+                        return
+
+        def decompress(span):
+            start, length = span
+            with open(path, 'rb') as f:
+                f.seek(start)
+                frame = f.read(length)
+            # 展開後のサイズがヘッダーにないフレームにも対応するため、decompressobj で展開する
+            return zstandard.ZstdDecompressor().decompressobj().decompress(frame)
+
+        # 複数フレームの場合は、先読みするフレーム数を制限して並列に展開する
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='zstd') as pool:
+            pending = []
+            spans = iter(spans)
+            for span in spans:
+                pending.append(pool.submit(decompress, span))
+                if len(pending) >= threads * 2:
+                    break
+            while pending:
+                block = pending.pop(0).result()
+                span = next(spans, None)
+                if span is not None:
+                    pending.append(pool.submit(decompress, span))
+                if block and not put(block):
+                    for future in pending:
+                        future.cancel()
+                    return
+    return produce
+
+
+def open_input(path, compression='infer', threads=None):
+    """
+    入力ファイルを開く（圧縮されている場合は別スレッドで展開しながら読み込む）
+
+    Args:
+        path (str): 入力ファイルパス
+        compression (str): 圧縮形式（'infer' の場合は拡張子から判定、None の場合は非圧縮）
+        threads (int): zstd の並列展開に使うスレッド数（省略時は CPU 数、上限4）
+
+    Returns:
+        BinaryIO: 展開後のデータを読み込むファイルオブジェクト
+    """
+    if compression == 'infer':
+        compression = detect_compression(path)
+    if compression is None:
+        return open(path, 'rb')
+    if compression == COMPRESSION_GZIP:
+        produce = _produce_gzip(path)
+    elif compression == COMPRESSION_ZSTD:
+        produce = _produce_zstd(path, threads or _default_threads())
+    else:
+        raise ValueError(f"未対応の圧縮形式です: {compression}")
+    return io.BufferedReader(_QueueReader(produce), buffer_size=STREAM_BLOCK_SIZE)
+
+
+def _consume_gzip(path, level):
+    def consume(blocks):
+        with gzip.open(path, 'wb', compresslevel=level if level is not None else 6) as f:
+            for block in blocks:
+                f.write(block)
+    return consume
+
+
+def _consume_zstd(path, level, threads):
+    zstandard = _import_zstandard()
+    level = level if level is not None else ZSTD_DEFAULT_LEVEL
+
+    def frames(blocks):
+        # 一定サイズごとに区切って1フレームにする
+        pending = bytearray()
+        for block in blocks:
+            pending += block
+            while len(pending) >= ZSTD_FRAME_SIZE:
+                yield bytes(pending[:ZSTD_FRAME_SIZE])
+                del pending[:ZSTD_FRAME_SIZE]
+        if pending:
+            yield bytes(pending)
+
+    def compress(data):
+        # ZstdCompressor はスレッド間で共有できないため、フレームごとに作成する
+        return zstandard.ZstdCompressor(level=level, write_content_size=True).compress(data)
+
+    def consume(blocks):
+        # 先行して圧縮するフレーム数を制限し、順番どおりに書き出す
+        with open(path, 'wb') as f, ThreadPoolExecutor(max_workers=threads, thread_name_prefix='zstd') as pool:
+            pending = []
+            for frame in frames(blocks):
+                pending.append(pool.submit(compress, frame))
+                if len(pending) >= threads * 2:
+                    f.write(pending.pop(0).result())
+            for future in pending:
+                f.write(future.result())
+    return consume
+
+
+def open_output(path, compression='infer', level=None, threads=None):
+    """
+    出力ファイルを開く（圧縮する場合は別スレッドで圧縮しながら書き込む）
+
+    Args:
+        path (str): 出力ファイルパス
+        compression (str): 圧縮形式（'infer' の場合は拡張子から判定、None の場合は非圧縮）
+        level (int): 圧縮レベル（省略時は gzip 6、zstd 3）
+        threads (int): zstd の並列圧縮に使うスレッド数（省略時は CPU 数、上限4）
+
+    Returns:
+        BinaryIO: 書き込み用のファイルオブジェクト（close 時に圧縮の完了を待つ）
+    """
+    if compression == 'infer':
+        compression = detect_compression(path)
+    if compression is None:
+        return open(path, 'wb')
+    if compression == COMPRESSION_GZIP:
+        consume = _consume_gzip(path, level)
+    elif compression == COMPRESSION_ZSTD:
+        consume = _consume_zstd(path, level, threads or _default_threads())
+    else:
+        raise ValueError(f"未対応の圧縮形式です: {compression}")
+    return io.BufferedWriter(_QueueWriter(consume), buffer_size=STREAM_BLOCK_SIZE)
+
+
+def read_csv(path, **kwargs):
+    """
+    CSVファイルを pandas で読み込む（圧縮されている場合は展開しながら読み込む）
+
+    Args:
+        path (str): 入力ファイルパス
+        **kwargs: pd.read_csv に渡す引数（chunksize は指定できない）
+
+    Returns:
+        pd.DataFrame: 読み込んだデータ
+    """
+    import pandas as pd
+    with open_input(path) as f:
+        return pd.read_csv(f, **kwargs)
+
+
+def write_csv(df, path, compression=None, **kwargs):
+    """
+    DataFrame をCSVとして書き出す（圧縮する場合は別スレッドで圧縮しながら書き込む）
+
+    Args:
+        df (pd.DataFrame): 書き出すデータ
+        path (str): 出力ファイルパス（アトミックな書き込みの一時ファイルなど）
+        compression (str): 圧縮形式（最終的な出力ファイル名から detect_compression で判定したもの）
+        **kwargs: DataFrame.to_csv に渡す引数
+    """
+    with open_output(path, compression) as f:
+        df.to_csv(f, **kwargs)
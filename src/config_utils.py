@@ -4,18 +4,24 @@
 import configparser
 from pathlib import Path
 
+# プロジェクトルートの設定ファイル
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / 'config.ini'
+
 
 def load_config(config_file='config.ini'):
     """
     設定ファイルを読み込む
 
+    config_file が存在しない場合は、プロジェクトルートの config.ini を読み込む。
+
     Args:
         config_file (str): 設定ファイルパス
 
     Returns:
         configparser.ConfigParser: 設定オブジェクト
     """
-    config = configparser.ConfigParser()
+    # タイムスタンプ書式などに % を含むため補間は無効にする
+    config = configparser.ConfigParser(interpolation=None)
     config_path = Path(config_file)
 
     # デフォルト設定
@@ -36,20 +42,66 @@ def load_config(config_file='config.ini'):
 
     config['logging'] = {
         'level': 'INFO',
-        'log_file': 'logs/masking.log'
+        'log_file': 'logs/masking.log',
+        'format': 'text',
+        'rate_limit': '10',
+        'rate_limit_interval': '60'
     }
 
     config['nlp'] = {
         'japanese_model': 'ja_core_news_md'
     }
 
+    config['patterns'] = {
+        'enabled': '',
+        'disabled': '',
+        'pattern_files': ''
+    }
+
     # 設定ファイルが存在すれば読み込む
+    if not config_path.exists() and config_file == 'config.ini':
+        config_path = DEFAULT_CONFIG_PATH
     if config_path.exists():
-        config.read(config_path)
+        config.read(config_path, encoding='utf-8')
 
     return config
 
 
+def get_setting(config, section, key, fallback=None):
+    """
+    設定値を取得する（値を囲む引用符は取り除く）
+
+    Args:
+        config (configparser.ConfigParser): 設定オブジェクト
+        section (str): セクション名
+        key (str): キー名
+        fallback (str): 設定がない場合の値
+
+    Returns:
+        str: 設定値
+    """
+    value = config.get(section, key, fallback=fallback)
+    if isinstance(value, str) and len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        value = value[1:-1]
+    return value
+
+
+def get_list_setting(config, section, key):
+    """
+    カンマ区切りの設定値をリストとして取得する
+
+    Args:
+        config (configparser.ConfigParser): 設定オブジェクト
+        section (str): セクション名
+        key (str): キー名
+
+    Returns:
+        list: 空要素を除いた値のリスト
+    """
+    value = get_setting(config, section, key, fallback='') or ''
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
 if __name__ == "__main__":
     # 設定ファイルのテスト読み込み
     config = load_config()
@@ -0,0 +1,303 @@
+"""
+常駐型のマスキングワーカー
+
+pandas や spaCy のインポート、PersonalInfoMasker の初期化といった起動コストを
+一度だけ支払い、入力ディレクトリの監視またはローカルソケット経由で
+到着したジョブを順次処理する。
+
+ソケットに接続できるクライアントは任意のパスを指定できるため、ファイルのジョブは
+設定した入力・出力のルートディレクトリの配下のパスのみを受け付ける。
+"""
+import json
+import logging
+import shutil
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from .compression import COMPRESSION_SUFFIXES
+from .io_utils import default_output_path
+
+logger = logging.getLogger(__name__)
+
+# 監視対象とするファイル名のパターン（圧縮されたCSVも含む）
+DEFAULT_PATTERNS = ('*.csv',) + tuple(f"*.csv{suffix}" for suffix in COMPRESSION_SUFFIXES)
+
+
+class _JobServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class MaskingDaemon:
+    """
+    ウォーム状態のマスカーを保持したままジョブを処理する常駐ワーカー
+    """
+
+    def __init__(self, masker, process_file, poll_interval=1.0, patterns=DEFAULT_PATTERNS, metrics=None,
+                 input_root=None, output_root=None):
+        """
+        初期化
+
+        Args:
+            masker (PersonalInfoMasker): 使い回すマスキング処理のインスタンス
+            process_file (callable): (入力パス, 出力パス, カラム名) を受け取り、
+                成功可否を返すファイル処理関数
+            poll_interval (float): ディレクトリ監視のポーリング間隔（秒）
+            patterns (tuple): 監視対象とするファイル名のパターン
+            metrics (MetricsRegistry): ジョブ数・テキスト単体のマスキングを記録するメトリクス
+                （ファイル処理の行数などは process_file 側で記録する）
+            input_root (str): ソケット経由のファイルのジョブで入力として許可するディレクトリ
+            output_root (str): ソケット経由のファイルのジョブで出力として許可するディレクトリ
+                （どちらかを省略した場合、ソケット経由のファイルのジョブは受け付けない）
+        """
+        self.masker = masker
+        self.process_file = process_file
+        self.poll_interval = poll_interval
+        self.patterns = patterns
+        self.metrics = metrics
+        self.input_root = Path(input_root).resolve() if input_root else None
+        self.output_root = Path(output_root).resolve() if output_root else None
+        self.stop_event = threading.Event()
+        # spaCyのモデルなどはスレッドセーフではないため、ジョブは直列に処理する
+        self._lock = threading.Lock()
+        self.processed_count = 0
+        self.failed_count = 0
+
+    def stop(self):
+        """
+        監視ループ・ソケットサーバーを停止する
+        """
+        self.stop_event.set()
+
+    def run_job(self, input_file, output_file, column):
+        """
+        1件のファイルジョブを処理する
+
+        Args:
+            input_file (str): 入力ファイルパス
+            output_file (str): 出力ファイルパス
+            column (str): 問い合わせ文のカラム名
+
+        Returns:
+            bool: 処理成功したかどうか
+        """
+        with self._lock:
+            start = time.perf_counter()
+            success = self.process_file(input_file, output_file, column)
+            elapsed = time.perf_counter() - start
+
+        if self.metrics is not None:
+            self.metrics.inc('files_total', 1, ('succeeded' if success else 'failed',))
+        if success:
+            self.processed_count += 1
+            logger.info(f"'{input_file}' を処理しました ({elapsed:.2f}秒)")
+        else:
+            self.failed_count += 1
+            logger.error(f"'{input_file}' の処理に失敗しました")
+        return success
+
+    def mask_text(self, text):
+        """
+        1件のテキストをマスキングする
+
+        Args:
+            text (str): 入力テキスト
+
+        Returns:
+            tuple: (マスキングしたテキスト, マスキングした情報のリスト)
+        """
+        with self._lock:
+            result = self.masker.mask_personal_info(text)
+            if self.metrics is not None:
+                self.metrics.inc('rows_total')
+                self.metrics.record_masker_stats(self.masker.take_stats())
+            return result
+
+    def _find_ready_files(self, input_dir, previous):
+        """
+        書き込みが完了したとみなせるファイルを探す
+
+        直前のポーリングとサイズ・更新時刻が変わっていないファイルのみを
+        処理対象とし、書き込み途中のファイルを拾わないようにする。
+        ドットで始まる一時ファイルは対象外とする。
+
+        Args:
+            input_dir (Path): 監視対象ディレクトリ
+            previous (dict): 前回ポーリング時の {パス: (サイズ, 更新時刻)}
+
+        Returns:
+            tuple: (処理対象ファイルのリスト, 今回ポーリング時の状態)
+        """
+        current = {}
+        ready = []
+        paths = {path for pattern in self.patterns for path in input_dir.glob(pattern)}
+        for path in sorted(paths):
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            stat = path.stat()
+            current[path] = (stat.st_size, stat.st_mtime)
+            if previous.get(path) == current[path]:
+                ready.append(path)
+        return ready, current
+
+    def watch_directory(self, input_dir, output_dir, column, processed_dir=None, failed_dir=None):
+        """
+        入力ディレクトリを監視し、到着したファイルを順次処理する
+
+        処理済みの入力ファイルは processed_dir（省略時は入力ディレクトリ直下の
+        processed/）へ、失敗したものは failed_dir（省略時は failed/）へ移動する。
+        出力ファイル名には日時を付け、同じ名前の入力が再び到着しても以前の出力を上書きしない。
+
+        Args:
+            input_dir (str): 監視対象ディレクトリ
+            output_dir (str): 出力ディレクトリ
+            column (str): 問い合わせ文のカラム名
+            processed_dir (str): 処理済みファイルの移動先
+            failed_dir (str): 処理失敗ファイルの移動先
+        """
+        input_dir = Path(input_dir)
+        output_dir = Path(output_dir)
+        processed_dir = Path(processed_dir) if processed_dir else input_dir / 'processed'
+        failed_dir = Path(failed_dir) if failed_dir else input_dir / 'failed'
+        for directory in (output_dir, processed_dir, failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        logger.info(f"ディレクトリ '{input_dir}' の監視を開始します")
+        previous = {}
+        while not self.stop_event.is_set():
+            ready, previous = self._find_ready_files(input_dir, previous)
+            for path in ready:
+                if self.stop_event.is_set():
+                    break
+                output_file = default_output_path(str(path), output_dir)
+                success = self.run_job(str(path), output_file, column)
+                destination = processed_dir if success else failed_dir
+                shutil.move(str(path), str(destination / path.name))
+                previous.pop(path, None)
+            self.stop_event.wait(self.poll_interval)
+        logger.info("ディレクトリの監視を終了しました")
+
+    @staticmethod
+    def _resolve_within(path, root):
+        """
+        リクエストで指定されたパスをルートディレクトリの配下に解決する
+
+        相対パスはルートディレクトリからのパスとみなす。.. やシンボリックリンクを
+        解決した結果がルートディレクトリの外を指す場合は None を返す。
+
+        Args:
+            path (str): リクエストで指定されたパス
+            root (Path): 解決済みのルートディレクトリ
+
+        Returns:
+            Path: 解決したパス（ルートディレクトリの外の場合は None）
+        """
+        resolved = (root / path).resolve()
+        if resolved != root and root not in resolved.parents:
+            return None
+        return resolved
+
+    def handle_request(self, request, default_column=None):
+        """
+        ソケット経由で受け取った1件のリクエストを処理する
+
+        リクエストは {"text": ...} によるテキスト単体のマスキング、または
+        {"input": ..., "output": ..., "column": ...} によるファイル処理のいずれか。
+        ファイル処理の入力・出力は、input_root・output_root の配下のパスのみを受け付ける。
+
+        Args:
+            request (dict): リクエスト内容
+            default_column (str): column が省略された場合に使うカラム名
+
+        Returns:
+            dict: レスポンス内容
+        """
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'リクエストはJSONオブジェクトで指定してください'}
+
+        if 'text' in request:
+            if not isinstance(request['text'], str):
+                return {'ok': False, 'error': 'text には文字列を指定してください'}
+            masked_text, masked_items = self.mask_text(request['text'])
+            return {'ok': True, 'masked_text': masked_text, 'masked_items': masked_items}
+
+        input_file = request.get('input')
+        output_file = request.get('output')
+        column = request.get('column', default_column)
+        if not input_file or not output_file or not column:
+            return {'ok': False, 'error': 'input, output, column を指定してください'}
+        if not all(isinstance(value, str) for value in (input_file, output_file, column)):
+            return {'ok': False, 'error': 'input, output, column には文字列を指定してください'}
+        if self.input_root is None or self.output_root is None:
+            return {'ok': False, 'error': '入力・出力のルートディレクトリが設定されていないため、ファイルのジョブは受け付けません'}
+
+        input_path = self._resolve_within(input_file, self.input_root)
+        if input_path is None:
+            return {'ok': False, 'error': f"入力ファイルは '{self.input_root}' の配下を指定してください"}
+        output_path = self._resolve_within(output_file, self.output_root)
+        if output_path is None:
+            return {'ok': False, 'error': f"出力ファイルは '{self.output_root}' の配下を指定してください"}
+        if not input_path.is_file():
+            return {'ok': False, 'error': f"入力ファイル '{input_file}' が見つかりません"}
+
+        success = self.run_job(str(input_path), str(output_path), column)
+        return {'ok': success, 'output': str(output_path)}
+
+    def serve(self, host='127.0.0.1', port=8765, default_column=None):
+        """
+        ローカルソケットでジョブを受け付ける
+
+        1行1リクエストのJSONを受け取り、1行のJSONで結果を返す。
+
+        Args:
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート
+            default_column (str): リクエストで column が省略された場合のカラム名
+        """
+        server = self.create_server(host, port, default_column)
+        logger.info(f"{host}:{server.server_address[1]} でジョブの受け付けを開始します")
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            self.stop_event.wait()
+        finally:
+            server.shutdown()
+            server.server_close()
+            logger.info("ジョブの受け付けを終了しました")
+
+    def create_server(self, host, port, default_column=None):
+        """
+        ジョブ受け付け用のソケットサーバーを作成する
+
+        Args:
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート（0の場合は空きポートを割り当てる）
+            default_column (str): リクエストで column が省略された場合のカラム名
+
+        Returns:
+            socketserver.ThreadingTCPServer: 作成したサーバー
+        """
+        daemon = self
+
+        class _JobHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        response = {'ok': False, 'error': 'リクエストをJSONとして解釈できません'}
+                    else:
+                        try:
+                            response = daemon.handle_request(request, default_column)
+                        except Exception as e:
+                            # 例外の内容はクライアントに返さず、ログにのみ記録する
+                            logger.error(f"リクエストの処理中にエラーが発生しました: {e}")
+                            response = {'ok': False, 'error': 'リクエストの処理中にエラーが発生しました'}
+                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+
+        return _JobServer((host, port), _JobHandler)
@@ -0,0 +1,56 @@
+"""
+検出結果のコンパクトな表現
+
+検出結果は元テキスト上の範囲とカテゴリ番号（PatternEngine.categories の添字）だけを
+保持するタプルとして扱う。検出した文字列やカテゴリ名は、呼び出し側が必要とした
+時点で元テキスト・カテゴリ一覧から取り出す。
+"""
+from typing import NamedTuple
+
+
+class Detection(NamedTuple):
+    """
+    1件の検出結果
+    """
+    start: int
+    end: int
+    code: int
+
+    def text(self, source):
+        """
+        検出した文字列を取り出す
+
+        Args:
+            source (str): 検出に使った元のテキスト
+
+        Returns:
+            str: 検出した文字列
+        """
+        return source[self.start:self.end]
+
+    def category(self, categories):
+        """
+        カテゴリ名を取り出す
+
+        Args:
+            categories (tuple): カテゴリ名の一覧（PatternEngine.categories）
+
+        Returns:
+            str: カテゴリ名
+        """
+        return categories[self.code]
+
+
+def format_detections(detections, source, categories):
+    """
+    検出結果を「カテゴリ:文字列」形式のリストに変換する
+
+    Args:
+        detections (list): Detection のリスト
+        source (str): 検出に使った元のテキスト
+        categories (tuple): カテゴリ名の一覧（PatternEngine.categories）
+
+    Returns:
+        list: マスキングした情報のリスト
+    """
+    return [f"{categories[code]}:{source[start:end]}" for start, end, code in detections]
@@ -0,0 +1,222 @@
+"""
+追記型エクスポートの差分処理（ウォーターマーク）モジュール
+
+前回の実行で処理した行を、ID カラムごとの行ハッシュ、または行ハッシュの集合として
+ウォーターマークファイルに記録する。次回の実行では新しい行と内容が変わった行のみを
+マスキングし、既存の出力への追記または差分ファイルとして書き出す。
+
+ウォーターマークには今回の入力にある行のみを記録するため、大きさは入力の行数に比例し
+（行ハッシュの集合で 1 行あたり約 20 バイト）、入力からなくなった行は次回の保存で除かれる。
+"""
+import json
+import logging
+import os
+from pathlib import Path
+
+from .io_utils import atomic_output
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_VERSION = 1
+
+# ウォーターマークの種類
+MODE_ID = 'id'
+MODE_HASH = 'hash'
+
+
+def hash_rows(df):
+    """
+    行ごとのハッシュ値を計算する（実行をまたいで同じ値になる）
+
+    Args:
+        df (pd.DataFrame): 対象のデータフレーム
+
+    Returns:
+        list: 行ごとのハッシュ値（int）のリスト
+    """
+    import pandas as pd
+    return [int(value) for value in pd.util.hash_pandas_object(df, index=False)]
+
+
+class Watermark:
+    """
+    前回までに処理した行を記録するウォーターマーク
+
+    id_column を指定した場合は ID ごとの行ハッシュを記録し、新しい ID と内容が変わった ID の
+    行を処理対象とする。指定しない場合は行ハッシュの集合を記録し、集合にない行を処理対象とする
+    （内容が変わった行も新しい行として扱われ、出力には追記のみ行うため古い行の結果も残る）。
+    """
+
+    def __init__(self, path, inquiry_column, id_column=None):
+        """
+        初期化
+
+        Args:
+            path (str): ウォーターマークファイルのパス
+            inquiry_column (str): 問い合わせ文のカラム名
+            id_column (str): 行を識別する ID カラム名（省略時は行ハッシュの集合で判定）
+        """
+        self.path = Path(path)
+        self.header = {
+            'version': WATERMARK_VERSION,
+            'mode': MODE_ID if id_column else MODE_HASH,
+            'inquiry_column': inquiry_column,
+            'id_column': id_column,
+        }
+        self.id_column = id_column
+        self.output_size = None
+        # 前回までの記録
+        self._rows = {}
+        self._hashes = set()
+        # 今回の入力から作成する記録
+        self._next_rows = {}
+        self._next_hashes = set()
+
+    def load(self):
+        """
+        前回のウォーターマークを読み込む
+
+        カラムや判定方法が今回の指定と異なる場合は記録を使わない。
+
+        Returns:
+            bool: 前回の記録を使用できる場合 True
+        """
+        if not self.path.exists():
+            return False
+
+        with open(self.path, encoding='utf-8') as f:
+            watermark = json.load(f)
+
+        if watermark.get('header') != self.header:
+            logger.warning("ウォーターマークの条件が今回の指定と一致しないため、すべての行を処理します")
+            return False
+
+        self.output_size = watermark.get('output_size')
+        if self.id_column:
+            self._rows = watermark.get('rows', {})
+        else:
+            self._hashes = set(watermark.get('hashes', []))
+        return True
+
+    def reset(self):
+        """
+        前回の記録を破棄する（すべての行を新しい行として扱う）
+        """
+        self._rows = {}
+        self._hashes = set()
+        self.output_size = None
+
+    def select(self, chunk):
+        """
+        チャンクのうち処理対象（新しい行・内容が変わった行）を選び、今回の記録に追加する
+
+        Args:
+            chunk (pd.DataFrame): 入力のチャンク（dtype=str で読み込んだもの）
+
+        Returns:
+            tuple: (処理対象の行位置のリスト, 内容が変わった行の ID の集合)
+        """
+        hashes = hash_rows(chunk)
+        selected = []
+        changed = set()
+
+        if self.id_column:
+            for position, (row_id, row_hash) in enumerate(zip(chunk[self.id_column].tolist(), hashes)):
+                previous = self._rows.get(row_id)
+                if previous != row_hash:
+                    selected.append(position)
+                    if previous is not None:
+                        changed.add(row_id)
+                self._next_rows[row_id] = row_hash
+        else:
+            for position, row_hash in enumerate(hashes):
+                if row_hash not in self._hashes:
+                    selected.append(position)
+                self._next_hashes.add(row_hash)
+
+        return selected, changed
+
+    def missing(self):
+        """
+        前回の記録にあり、今回の入力になかった行の数を返す（select ですべてのチャンクを処理した後に呼ぶ）
+
+        Returns:
+            int: 前回の記録にない行の数
+        """
+        if self.id_column:
+            return len(self._rows.keys() - self._next_rows.keys())
+        return len(self._hashes - self._next_hashes)
+
+    def save(self, output_size=None):
+        """
+        今回の入力から作成した記録をアトミックに保存する
+
+        Args:
+            output_size (int): 追記後の出力ファイルのサイズ（次回、中断された追記を検出するために使う）
+        """
+        watermark = {'header': self.header, 'output_size': output_size}
+        if self.id_column:
+            watermark['rows'] = self._next_rows
+        else:
+            watermark['hashes'] = sorted(self._next_hashes)
+
+        with atomic_output(self.path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(watermark, f, ensure_ascii=False)
+
+
+def read_header(path):
+    """
+    CSVファイルのヘッダー行（改行を含む）を読み込む
+
+    Args:
+        path (str): CSVファイルパス
+
+    Returns:
+        bytes: ヘッダー行
+    """
+    with open(path, 'rb') as f:
+        return f.readline()
+
+
+def append_rows(output_file, delta_file):
+    """
+    差分ファイルのデータ行（ヘッダーを除く）を出力ファイルの末尾に追記する
+
+    Args:
+        output_file (str): 追記先の出力ファイル
+        delta_file (str): 差分ファイル（ヘッダー付き）
+
+    Returns:
+        int: 追記後の出力ファイルのサイズ
+    """
+    with open(delta_file, 'rb') as src, open(output_file, 'ab') as dst:
+        src.readline()
+        for block in iter(lambda: src.read(1 << 20), b''):
+            dst.write(block)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return os.path.getsize(output_file)
+
+
+def recover_output(output_file, watermark):
+    """
+    前回の追記が中断されていた場合、出力ファイルを前回完了時のサイズまで切り詰める
+
+    Args:
+        output_file (str): 出力ファイルパス
+        watermark (Watermark): 読み込み済みのウォーターマーク
+
+    Returns:
+        bool: 出力ファイルが前回の記録と整合している場合 True
+    """
+    if watermark.output_size is None or not os.path.exists(output_file):
+        return False
+
+    size = os.path.getsize(output_file)
+    if size > watermark.output_size:
+        logger.warning(f"前回の追記が中断されていたため、'{output_file}' を前回完了時の状態に戻します")
+        with open(output_file, 'r+b') as f:
+            f.truncate(watermark.output_size)
+        return True
+    return size == watermark.output_size
@@ -0,0 +1,78 @@
+"""
+ファイル入出力のユーティリティモジュール
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .compression import strip_compression_suffix
+
+# 新規作成するファイルの権限（mkstemp の一時ファイルは 0600 のため、置き換える前に通常のファイルと同じ権限にする）
+# umask は取得時に一度書き換える必要があるため、スレッドが動き出す前のインポート時に一度だけ取得する
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_output(output_file, mode=None):
+    """
+    出力ファイルをアトミックに書き込むためのコンテキストマネージャ
+
+    同じディレクトリに一時ファイルを作成してそのパスを返し、ブロックが
+    正常に終了した場合のみ os.replace で出力ファイルに置き換える。
+    途中で例外が発生した場合は一時ファイルを削除し、出力ファイルには
+    一切手を加えない。出力ファイルの権限は、mode を指定した場合はその権限、
+    指定しない場合は既存のファイルがあればその権限を引き継ぎ、
+    なければ umask に従う（通常の open で作成した場合と同じ）。
+
+    Args:
+        output_file (str): 最終的な出力ファイルパス
+        mode (int): 出力ファイルの権限（例: 0o600）
+
+    Yields:
+        str: 書き込み先の一時ファイルパス
+    """
+    output_path = Path(output_file)
+    output_dir = output_path.parent
+    if str(output_dir) and not output_dir.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{output_path.name}.", suffix='.tmp', dir=str(output_dir) or '.'
+    )
+    os.close(fd)
+
+    try:
+        yield tmp_path
+        if mode is None:
+            try:
+                mode = os.stat(output_path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def default_output_path(input_file, output_dir=None):
+    """
+    入力ファイルパスから出力ファイルパスを自動生成する
+
+    Args:
+        input_file (str): 入力ファイルパス
+        output_dir (str): 出力ディレクトリ（省略時は入力ファイルと同じディレクトリ）
+
+    Returns:
+        str: 出力ファイルパス
+    """
+    # 圧縮された入力（例: data.csv.gz）は、出力も同じ形式で圧縮する（例: data_masked_<日時>.csv.gz）
+    base, compression_suffix = strip_compression_suffix(input_file)
+    input_path = Path(base)
+    timestamp = time.strftime('%Y%m%d%H%M%S')
+    directory = Path(output_dir) if output_dir else input_path.parent
+    return str(directory / f"{input_path.stem}_masked_{timestamp}{input_path.suffix}{compression_suffix}")
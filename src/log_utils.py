@@ -0,0 +1,251 @@
+"""
+ログ設定のユーティリティモジュール
+
+ライブラリのモジュールはロガーを取得するだけでルートロガーの設定は行わない。
+実行スクリプトは setup_logging を一度呼び出し、ログの書き込みを
+QueueHandler / QueueListener 経由で別スレッドに任せる。
+
+ワーカープロセスのログはプロセス間のキューで親プロセスに送り、親プロセスの
+間引きのフィルタを通して同じログファイル・形式で書き出す。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .config_utils import load_config, get_setting
+
+# テキスト形式のログフォーマット
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 現在動作中のリスナー
+_listener = None
+
+# 現在のリスナーにつないだ QueueHandler と間引きのフィルタ（停止時に抑制件数を書き出すため）
+_queue_handler = None
+_rate_limit_filter = None
+
+# ワーカープロセスのログを受け取るプロセス間のキューと、親プロセスの QueueHandler に転送するリスナー
+_worker_queue = None
+_worker_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    ログレコードを1行のJSONに変換するフォーマッタ
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    同じ呼び出し箇所からの警告を一定時間あたりの件数に制限するフィルタ
+
+    行ごとに出力される警告がログ出力を占有しないよう、WARNING のレコードを
+    呼び出し箇所（ファイル・行番号）単位で間引く。INFO 以下（ファイルごとの処理結果など）と
+    ERROR 以上は常に出力する。間引いた件数は、同じ箇所から次に出力されるレコードの
+    メッセージに付記し、それまでに出力されなかった件数は take_suppressed で取り出す。
+    """
+
+    def __init__(self, limit=10, interval=60.0):
+        """
+        初期化
+
+        Args:
+            limit (int): interval 秒あたりに出力する最大件数
+            interval (float): 集計する時間幅（秒）
+        """
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno != logging.WARNING:
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, count + 1, 0)
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (同じ箇所のログ {suppressed} 件を抑制しました)"
+            record.args = None
+        return True
+
+    def take_suppressed(self):
+        """
+        まだ付記していない抑制件数をレコードとして取り出し、カウントを0に戻す
+
+        Returns:
+            list: 呼び出し箇所ごとの抑制件数を伝える WARNING の LogRecord のリスト
+        """
+        records = []
+        with self._lock:
+            for key, (window_start, count, suppressed) in self._windows.items():
+                if not suppressed:
+                    continue
+                name, pathname, lineno = key
+                records.append(logging.LogRecord(name, logging.WARNING, pathname, lineno,
+                                                 f"同じ箇所のログ {suppressed} 件を抑制しました", None, None))
+                self._windows[key] = (window_start, count, 0)
+        return records
+
+
+def setup_logging(config=None, level=None, log_file=None, json_format=None, console=True):
+    """
+    非同期のログ出力を設定する
+
+    ルートロガーには QueueHandler のみを登録し、コンソール・ファイルへの書き込みは
+    QueueListener のスレッドで行う。引数を省略した項目は config.ini の [logging]
+    セクション（level, log_file, format, rate_limit, rate_limit_interval）から読み込む。
+
+    Args:
+        config (configparser.ConfigParser): 設定オブジェクト（省略時は config.ini を読み込む）
+        level (str): ログレベル
+        log_file (str): ログファイルパス（空文字の場合はファイルに出力しない）
+        json_format (bool): JSON形式で出力するかどうか
+        console (bool): 標準出力にも出力するかどうか
+
+    Returns:
+        logging.handlers.QueueListener: 開始したリスナー
+    """
+    global _listener, _queue_handler, _rate_limit_filter
+
+    if config is None:
+        config = load_config()
+    if level is None:
+        level = get_setting(config, 'logging', 'level', 'INFO')
+    if log_file is None:
+        log_file = get_setting(config, 'logging', 'log_file', 'logs/masking.log')
+    if json_format is None:
+        json_format = get_setting(config, 'logging', 'format', 'text').lower() == 'json'
+    rate_limit = int(get_setting(config, 'logging', 'rate_limit', '10'))
+    rate_limit_interval = float(get_setting(config, 'logging', 'rate_limit_interval', '60'))
+
+    shutdown_logging()
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+
+    # コンソール出力ハンドラ
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    # ファイル出力ハンドラ（ログディレクトリが存在しない場合は作成）
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    # 以前の設定をリセットし、rootロガーには QueueHandler のみを登録する
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _rate_limit_filter = RateLimitFilter(rate_limit, rate_limit_interval)
+    _queue_handler.addFilter(_rate_limit_filter)
+    logging.root.addHandler(_queue_handler)
+    logging.root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def worker_log_settings():
+    """
+    ワーカープロセスに渡すログの設定を返す（configure_worker_logging の引数）
+
+    初めて呼び出した時点でプロセス間のキューを作成し、ワーカープロセスから届いたログを
+    親プロセスの QueueHandler（間引きのフィルタ付き）に転送するリスナーを開始する。
+
+    Returns:
+        tuple: (プロセス間のキュー, ログレベル)。setup_logging を呼んでいない場合は None
+    """
+    global _worker_queue, _worker_listener
+    if _queue_handler is None:
+        return None
+    if _worker_queue is None:
+        _worker_queue = multiprocessing.Queue()
+        _worker_listener = logging.handlers.QueueListener(_worker_queue, _queue_handler)
+        _worker_listener.start()
+    return _worker_queue, logging.root.level
+
+
+def shutdown_logging():
+    """
+    リスナーを停止し、キューに残ったログと、間引いたまま付記できなかった抑制件数をすべて書き出す
+    """
+    global _listener, _queue_handler, _rate_limit_filter, _worker_queue, _worker_listener
+    if _worker_listener is not None:
+        # ワーカープロセスから届いたログを先に親プロセスのキューへ移す
+        _worker_listener.stop()
+        _worker_queue.close()
+        _worker_queue = _worker_listener = None
+    if _queue_handler is not None:
+        # 抑制件数のレコード自体は間引かないよう、フィルタを通さずにキューに入れる
+        for record in _rate_limit_filter.take_suppressed():
+            _queue_handler.emit(record)
+        _queue_handler = _rate_limit_filter = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_worker_logging(settings=None):
+    """
+    ワーカープロセスのログ出力を設定する
+
+    親プロセスから引き継いだハンドラ（親のスレッド用のキュー宛て）を外し、settings の
+    プロセス間のキューに送る。親プロセスでは、設定された間引き・ログファイル・形式で書き出す。
+    settings がない場合（親プロセスで setup_logging を呼んでいない場合）は、WARNING 以上のみを
+    間引いたうえで標準エラー出力に書き出す。
+
+    Args:
+        settings (tuple): worker_log_settings の戻り値
+    """
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    if settings is not None:
+        log_queue, level = settings
+        logging.root.addHandler(logging.handlers.QueueHandler(log_queue))
+        logging.root.setLevel(level)
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handler.addFilter(RateLimitFilter())
+    logging.root.addHandler(handler)
+    logging.root.setLevel(logging.WARNING)
+
+
+atexit.register(shutdown_logging)
@@ -3,132 +3,245 @@
 """
 import re
 import logging
-from .patterns import PATTERNS, MASK_REPLACEMENTS
-from .nlp_utils import detect_personal_info_with_nlp
-
-# ロガーの設定
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+import time
+from bisect import bisect_right
+from collections import Counter
+from .alignment import Alignment, replace_text, substitute
+from .detection import Detection, format_detections
+from .registry import get_default_engine
+from .nlp_utils import detect_personal_info_with_nlp, get_nlp, NLP_CATEGORIES
+from .pseudonym import placeholder_pattern
+from .normalize import normalize_text
+
+# ロガーの取得（ルートロガーの設定は実行スクリプト側で行う）
 logger = logging.getLogger(__name__)
 
+# 後処理で使う正規表現
+DOUBLE_BRACKET_PATTERN = re.compile(r'\[\[([^\]]+)\]\]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def _new_stats():
+    # 処理の統計の初期値（detections はカテゴリ番号ごとの検出数）
+    return {'rows': 0, 'skipped': Counter(), 'chars': 0, 'seconds': Counter(), 'detections': Counter()}
+
+
 class PersonalInfoMasker:
     """
     個人情報マスキングを行うクラス
     """
 
-    def __init__(self, use_nlp=True):
+    def __init__(self, use_nlp=True, engine=None, enabled_categories=None, pseudonymizer=None, normalize=True):
         """
         初期化
 
         Args:
             use_nlp (bool): NLPを使用するかどうか
+            engine (PatternEngine): パターンエンジン（省略時は config.ini から組み立てた既定のエンジン）
+            enabled_categories (iterable): 検出対象とするカテゴリ（省略時はエンジンのすべてのカテゴリ）。
+                対象外のカテゴリは正規表現・NLPのどちらでも検出処理自体を行わない
+            pseudonymizer (Pseudonymizer): 指定した場合、プレースホルダーの代わりに
+                値ごとの仮名（例: [氏名_7f3a9c01]）で置き換える
+            normalize (bool): 正規表現の照合前に全角英数字・半角カナ・ハイフンの表記ゆれを
+                正規化するかどうか（置換は元のテキストに対して行う）
         """
-        self.use_nlp = use_nlp
-        self.patterns = PATTERNS
-        self.replacements = MASK_REPLACEMENTS
-        logger.info(f"PersonalInfoMasker を初期化しました。NLP使用: {use_nlp}")
-
-    def _mask_with_regex(self, text):
+        engine = engine if engine is not None else get_default_engine()
+        if enabled_categories is not None:
+            engine = engine.subset(enabled_categories)
+        self.engine = engine
+        # NLPで検出できるカテゴリが1つも有効でない場合はNLP処理自体を省略する
+        self.nlp_categories = NLP_CATEGORIES & set(engine.replacements)
+        self.use_nlp = use_nlp and bool(self.nlp_categories)
+        # spaCyはNLPを使用する場合のみインポート・ロードする（ロードに失敗した場合は正規表現のみで処理）
+        if self.use_nlp and get_nlp() is None:
+            self.use_nlp = False
+        self.patterns = self.engine.patterns
+        self.replacements = self.engine.replacements
+        self.priorities = self.engine.priorities
+        self.anchors = self.engine.anchors
+        # 処理の統計（take_stats で取り出す）
+        self.stats = _new_stats()
+        # 検出結果はカテゴリ番号（engine.categories の添字）で保持する
+        self.categories = self.engine.categories
+        self._codes = {category: code for code, category in enumerate(self.categories)}
+        self._code_replacements = tuple(self.replacements[category] for category in self.categories)
+        self.pseudonymizer = pseudonymizer
+        self.normalize = normalize
+        self._compile_postprocess_patterns()
+        logger.debug("PersonalInfoMasker を初期化しました。NLP使用: %s", self.use_nlp)
+
+    def take_stats(self):
         """
-        正規表現で個人情報をマスキングする
+        処理の統計を返し、カウントを0に戻す
 
-        Args:
-            text (str): 入力テキスト
+        行ごとの処理では辞書の値を加算するだけにし、呼び出し側がチャンク・タスク単位で
+        取り出して集計する（メトリクスの記録などで行ごとにロックを取らないため）。
 
         Returns:
-            tuple: (マスキングしたテキスト, マスキングした情報のリスト)
+            dict: {'rows': 正規表現で処理した行数, 'skipped': カテゴリごとの走査を省略した行数,
+                'chars': 処理した文字数, 'seconds': 段ごとの処理時間（秒）,
+                'detections': カテゴリごとの検出数}
         """
-        masked_text = text
-        masked_items = []
+        stats = self.stats
+        self.stats = _new_stats()
+        categories = self.categories
+        stats['detections'] = Counter({categories[code]: count for code, count in stats['detections'].items()})
+        return stats
 
-        # 検出結果を格納する配列（位置情報を保持するため）
-        detection_results = []
+    def _compile_postprocess_patterns(self):
+        """
+        後処理で使うプレースホルダーの正規表現を一度だけコンパイルする
 
-        # 各パターンで検索して検出結果を収集
-        for pattern_type, pattern in self.patterns.items():
-            matches = list(pattern.finditer(text))  # 元のテキストで検索
+        仮名化する場合は、プレースホルダーに仮名の接尾辞が付いたものにも一致させる。
+        """
+        def pattern(placeholder):
+            return placeholder_pattern(placeholder) if self.pseudonymizer is not None else re.escape(placeholder)
+
+        self._repeated_patterns = [
+            re.compile(f'({pattern(replacement)})\\1+') for replacement in self.replacements.values()
+        ]
+
+        name_placeholder = self.replacements.get('name')
+        company_placeholder = self.replacements.get('company')
+        self._name_ending_pattern = self._name_sentence_end_pattern = None
+        self._company_pattern = self._company_ending_pattern = None
+        if name_placeholder:
+            self._name_ending_pattern = re.compile(rf'({pattern(name_placeholder)})([^\s\.,?!。、．？！]{{1,2}})')
+            self._name_sentence_end_pattern = re.compile(rf'({pattern(name_placeholder)})([すでま]{{1,2}})。')
+        if company_placeholder:
+            self._company_pattern = re.compile(pattern(company_placeholder))
+            self._company_ending_pattern = re.compile(rf'({pattern(company_placeholder)})([^\s\.,?!。、．？！]{{1,3}})')
+
+    def _replacement(self, code, value):
+        """
+        検出した値の置換文字列を返す
 
-            for match in matches:
-                start, end = match.span()
-                original_text = match.group(0)
-
-                # 特殊ケース：birthdateが検出された場合はdateと重複しないように
-                if pattern_type == 'birthdate':
-                    detection_results.append({
-                        'start': start,
-                        'end': end,
-                        'type': pattern_type,
-                        'text': original_text,
-                        'priority': 1  # birthdateは優先度高
-                    })
-                else:
-                    detection_results.append({
-                        'start': start,
-                        'end': end,
-                        'type': pattern_type,
-                        'text': original_text,
-                        'priority': 2  # その他は通常優先度
-                    })
-
-        # 優先度が高く、範囲が広い検出結果を優先するためにソート
-        detection_results.sort(key=lambda x: (x['priority'], -(x['end'] - x['start'])))
-
-        # 重複を除外するための処理
-        processed_ranges = []
-        final_detections = []
+        Args:
+            code (int): カテゴリ番号
+            value (str): 検出した値
 
-        for result in detection_results:
-            # この範囲が既に処理済みの範囲と重複するかチェック
-            is_overlapping = False
-            for proc_start, proc_end in processed_ranges:
-                # 完全包含または部分重複の場合
-                if not (result['end'] <= proc_start or result['start'] >= proc_end):
-                    is_overlapping = True
-                    break
+        Returns:
+            str: プレースホルダー、または仮名化する場合は値の仮名
+        """
+        if self.pseudonymizer is None:
+            return self._code_replacements[code]
+        return self.pseudonymizer.token(self.categories[code], self._code_replacements[code], value)
 
-            # 重複していなければ処理対象に追加
-            if not is_overlapping:
-                processed_ranges.append((result['start'], result['end']))
-                final_detections.append(result)
+    def _mask_with_regex(self, text, alignment=None):
+        """
+        正規表現で個人情報をマスキングする
 
-        # 後ろから処理して置換のずれを防ぐ
-        final_detections.sort(key=lambda x: x['start'], reverse=True)
+        パターンは正規化したテキストに対して照合し、検出範囲を元のテキストの位置に
+        戻してから、元のテキストを置換する。
 
-        for detection in final_detections:
-            pattern_type = detection['type']
-            original_text = detection['text']
-            start = detection['start']
-            end = detection['end']
+        Args:
+            text (str): 入力テキスト
+            alignment (Alignment): 指定した場合は置換した範囲を記録する
 
-            replacement = self.replacements[pattern_type]
+        Returns:
+            tuple: (マスキングしたテキスト, Detection のリスト（開始位置の降順）)
+        """
+        # 検出候補を (優先度, -長さ, カテゴリ番号, 開始, 終了) のタプルで収集する
+        # （タプルのままソートすると、優先度が高く範囲が広いものから、同順位はパターン順・出現順に並ぶ）
+        if self.normalize:
+            normalized, offset_map = normalize_text(text)
+        else:
+            normalized, offset_map = text, None
+
+        self.stats['rows'] += 1
+        skipped = self.stats['skipped']
+        anchors = self.anchors
+
+        candidates = []
+        for code, pattern_type in enumerate(self.categories):
+            pattern = self.patterns.get(pattern_type)
+            if pattern is None:
+                continue
+            # 必須の文字を含まないテキストではパターンを走査しない
+            anchor = anchors.get(pattern_type)
+            if anchor is not None and anchor.search(normalized) is None:
+                skipped[pattern_type] += 1
+                continue
 
-            # マスキング対象を記録
-            masked_item = f"{pattern_type}:{original_text}"
-            masked_items.append(masked_item)
+            # 優先度はレジストリで定義（birthdateはdateと重複しないよう優先度高）
+            priority = self.priorities[pattern_type]
+            for match in pattern.finditer(normalized):
+                start, end = match.span()
+                if offset_map is not None:
+                    start, end = offset_map.start(start), offset_map.end(end)
+                candidates.append((priority, start - end, code, start, end))
 
-            # テキストを置換
-            masked_text = masked_text[:start] + replacement + masked_text[end:]
+        candidates.sort()
 
-        return masked_text, masked_items
+        # 重複を除外するための処理（採用済みの範囲を開始位置順に保持して二分探索する）
+        taken_starts = []
+        taken_ends = []
+        final_detections = []
 
-    def _mask_with_nlp(self, text, already_masked_text):
+        for _, _, code, start, end in candidates:
+            index = bisect_right(taken_starts, start)
+            # 直前・直後の採用済み範囲と重なる場合（完全包含または部分重複）は除外
+            if index and taken_ends[index - 1] > start:
+                continue
+            if index < len(taken_starts) and taken_starts[index] < end:
+                continue
+            taken_starts.insert(index, start)
+            taken_ends.insert(index, end)
+            final_detections.append(Detection(start, end, code))
+
+        if not final_detections:
+            return text, final_detections
+
+        # 先頭から順に置換文字列をつなげてテキストを組み立てる
+        final_detections.sort()
+        pieces = []
+        edits = []
+        position = 0
+        replacements = self._code_replacements
+        pseudonymizer = self.pseudonymizer
+        for start, end, code in final_detections:
+            pieces.append(text[position:start])
+            if pseudonymizer is None:
+                replacement = replacements[code]
+            else:
+                # 仮名は正規化した値から作成する（全角・半角の違いで別の仮名にならないようにする）
+                if offset_map is None:
+                    value = normalized[start:end]
+                else:
+                    value = normalize_text(text[start:end])[0]
+                replacement = self._replacement(code, value)
+            pieces.append(replacement)
+            if alignment is not None:
+                edits.append((start, end, replacement))
+            position = end
+        pieces.append(text[position:])
+        if alignment is not None:
+            alignment.apply(text, edits)
+
+        # マスキングした情報は従来どおり後ろから処理した順（開始位置の降順）で返す
+        final_detections.reverse()
+        return ''.join(pieces), final_detections
+
+    def _mask_with_nlp(self, text, already_masked_text, alignment=None):
         """
         NLPを使って個人情報をマスキングする
 
         Args:
             text (str): 元の入力テキスト
             already_masked_text (str): 正規表現でマスク済みのテキスト
+            alignment (Alignment): 指定した場合は置換した範囲を記録する
 
         Returns:
-            tuple: (マスキングしたテキスト, マスキングした情報のリスト)
+            tuple: (マスキングしたテキスト, Detection のリスト)
         """
         masked_text = already_masked_text
-        masked_items = []
+        detections = []
 
         # NLPで個人情報を検出
-        nlp_entities = detect_personal_info_with_nlp(text)
+        nlp_entities = detect_personal_info_with_nlp(text, self.nlp_categories)
 
         if not nlp_entities:
-            return masked_text, masked_items
+            return masked_text, detections
 
         # 検出した各タイプに対応
         for entity_type, entities in nlp_entities.items():
@@ -137,6 +250,7 @@ class PersonalInfoMasker:
 
             if not replacement:
                 continue
+            code = self._codes[replacement_key]
 
             for entity in entities:
                 # 既にマスキングされていない場合のみ処理
@@ -144,10 +258,15 @@ class PersonalInfoMasker:
                     # エンティティが複数回出現する可能性があるため、
                     # 元のテキストでの位置を特定してから置換
                     entity_escaped = re.escape(entity)
-                    masked_text = re.sub(f"(?<![\\w]){entity_escaped}(?![\\w])", replacement, masked_text)
-                    masked_items.append(f"{replacement_key}:{entity}")
+                    entity_replacement = self._replacement(code, entity)
+                    entity_pattern = re.compile(f"(?<![\\w]){entity_escaped}(?![\\w])")
+                    masked_text = substitute(entity_pattern, lambda _: entity_replacement, masked_text, alignment)
+                    # エンティティは元テキストの部分文字列なので、最初の出現位置で記録する
+                    start = text.find(entity)
+                    if start >= 0:
+                        detections.append(Detection(start, start + len(entity), code))
 
-        return masked_text, masked_items
+        return masked_text, detections
 
     def _map_entity_type_to_replacement(self, entity_type):
         """
@@ -188,42 +307,90 @@ class PersonalInfoMasker:
         Returns:
             tuple: (マスキングしたテキスト, マスキングした情報のリスト)
         """
+        masked_text, detections = self.mask_spans(text)
+        return masked_text, format_detections(detections, text, self.categories)
+
+    def mask_aligned(self, text):
+        """
+        テキスト内の個人情報をマスキングし、元のテキストとマスキング後のテキストの位置の対応も返す
+
+        対応は後処理（二重括弧の修正・連続したプレースホルダーの集約・語尾の削除・
+        空白の集約など）の各段で書き換えと同時に更新するため、検出結果の位置
+        （元のテキストの位置）をマスキング後のテキストの位置に変換できる。
+
+        Args:
+            text (str): 入力テキスト
+
+        Returns:
+            tuple: (マスキングしたテキスト, Detection のリスト, Alignment)
+        """
+        alignment = Alignment(len(text) if isinstance(text, str) else 0)
+        masked_text, masked_items = self.mask_spans(text, alignment)
+        return masked_text, masked_items, alignment
+
+    def mask_spans(self, text, alignment=None):
+        """
+        テキスト内の個人情報をマスキングし、検出結果をそのまま返す
+
+        検出した文字列は取り出さないため、件数や位置だけが必要な呼び出し側は
+        mask_personal_info より少ない割り当てで処理できる。
+
+        Args:
+            text (str): 入力テキスト
+            alignment (Alignment): 指定した場合は、すべての書き換え（後処理を含む）を記録する
+                （通常は mask_aligned を使う）
+
+        Returns:
+            tuple: (マスキングしたテキスト, Detection のリスト)
+        """
         if not text or not isinstance(text, str):
             return "", []
 
+        stats = self.stats
+        seconds = stats['seconds']
+        stats['chars'] += len(text)
+        started = time.perf_counter()
+
         # まず正規表現でマスキング
-        masked_text, masked_items = self._mask_with_regex(text)
+        masked_text, masked_items = self._mask_with_regex(text, alignment)
+        finished = time.perf_counter()
+        seconds['regex'] += finished - started
 
         # NLP使用が有効な場合、追加でマスキング
         if self.use_nlp:
-            masked_text, nlp_masked_items = self._mask_with_nlp(text, masked_text)
+            started = finished
+            masked_text, nlp_masked_items = self._mask_with_nlp(text, masked_text, alignment)
             masked_items.extend(nlp_masked_items)
+            finished = time.perf_counter()
+            seconds['nlp'] += finished - started
+        started = finished
 
         # マスキング後の後処理
 
         # 1. 二重括弧の問題を修正 - 正規表現で[[内容]]を[内容]に変換
-        double_bracket_pattern = re.compile(r'\[\[([^\]]+)\]\]')
-        while double_bracket_pattern.search(masked_text):
-            masked_text = double_bracket_pattern.sub(r'[\1]', masked_text)
+        while DOUBLE_BRACKET_PATTERN.search(masked_text):
+            masked_text = substitute(DOUBLE_BRACKET_PATTERN, r'[\1]', masked_text, alignment)
 
-        # 2. 連続したマスキング表記を一つにまとめる
-        for replacement in self.replacements.values():
-            repeated_pattern = re.compile(f'({re.escape(replacement)})+')
-            masked_text = repeated_pattern.sub(replacement, masked_text)
+        # 2. 連続したマスキング表記（同じ仮名の連続を含む）を一つにまとめる
+        for repeated_pattern in self._repeated_patterns:
+            masked_text = substitute(repeated_pattern, lambda m: m.group(1), masked_text, alignment)
 
         # 3. 一部が不自然に切れている場合に対応
         # 「生年月日」関連キーワードが「企業情報」としてマスキングされる問題の修正
         birth_keywords = ['生年月日', '誕生日', '生まれ', '出生']
 
         # 「生年月日」タイプのマスキングがあるか確認
-        has_birthdate = any(item.startswith('birthdate:') for item in masked_items)
+        birthdate_code = self._codes.get('birthdate')
+        has_birthdate = any(item.code == birthdate_code for item in masked_items)
 
         # 企業情報マスキングの修正
+        company_code = self._codes.get('company')
         company_items = []
         for i, item in enumerate(masked_items):
-            if item.startswith('company:'):
+            if item.code == company_code:
                 # 生年月日関連キーワードを含む企業情報は修正
-                if any(keyword in item for keyword in birth_keywords):
+                item_text = item.text(text)
+                if any(keyword in item_text for keyword in birth_keywords):
                     company_items.append((i, item))
 
         # 「company:生年月日」のようなマスキング項目を削除
@@ -231,36 +398,48 @@ class PersonalInfoMasker:
             for idx, _ in reversed(company_items):
                 masked_items.pop(idx)
 
+        birthdate_placeholder = self.replacements.get('birthdate')
+
         # 生年月日が企業情報としてマスキングされている場合、置き換える
-        if has_birthdate:
-            # 生年月日マスキングが存在する場合、企業情報マスキングを生年月日に置き換え
+        if has_birthdate and self._company_pattern and birthdate_placeholder:
+            # 生年月日マスキングが存在する場合、企業情報マスキング（仮名を含む）を生年月日に置き換え
             for keyword in birth_keywords:
-                if "[企業情報]" in masked_text and keyword in text:
-                    masked_text = masked_text.replace("[企業情報]", "[生年月日]")
+                if keyword in text and self._company_pattern.search(masked_text):
+                    masked_text = substitute(self._company_pattern, lambda _: birthdate_placeholder, masked_text, alignment)
                     break
 
-        # 不自然な切れ目の修正 - 「氏名」の後ろがおかしい場合
-        name_endings = re.findall(r'\[氏名\]([^\s\.,?!。、．？！]{1,2})', masked_text)
-        for ending in name_endings:
-            if ending not in ["の", "が", "を", "に", "は", "も", "で", "と", "へ", "や", "か", "な", "ね", "よ", "ね"]:
-                masked_text = masked_text.replace(f'[氏名]{ending}', '[氏名]')
+        if self._name_ending_pattern:
+            # 不自然な切れ目の修正 - 「氏名」の後ろがおかしい場合
+            name_endings = self._name_ending_pattern.findall(masked_text)
+            for placeholder, ending in name_endings:
+                if ending not in ["の", "が", "を", "に", "は", "も", "で", "と", "へ", "や", "か", "な", "ね", "よ", "ね"]:
+                    masked_text = replace_text(f'{placeholder}{ending}', placeholder, masked_text, alignment)
 
-        # 文末での不自然な切れ目修正（文末が「です」「ます」で終わるケース）
-        masked_text = re.sub(r'\[氏名\]([すでま]{1,2})。', r'[氏名]。', masked_text)
+            # 文末での不自然な切れ目修正（文末が「です」「ます」で終わるケース）
+            masked_text = substitute(self._name_sentence_end_pattern, lambda m: f'{m.group(1)}。', masked_text, alignment)
 
-        # 不自然な切れ目の修正 - 「企業情報」の後ろがおかしい場合
-        company_endings = re.findall(r'\[企業情報\]([^\s\.,?!。、．？！]{1,3})', masked_text)
-        for ending in company_endings:
-            if len(ending) <= 2 and ending not in ["の", "が", "を", "に", "は", "も", "で", "と", "へ", "や", "か", "な", "ね", "よ"]:
-                masked_text = masked_text.replace(f'[企業情報]{ending}', '[企業情報]')
+        if self._company_ending_pattern:
+            # 不自然な切れ目の修正 - 「企業情報」の後ろがおかしい場合
+            company_endings = self._company_ending_pattern.findall(masked_text)
+            for placeholder, ending in company_endings:
+                if len(ending) <= 2 and ending not in ["の", "が", "を", "に", "は", "も", "で", "と", "へ", "や", "か", "な", "ね", "よ"]:
+                    masked_text = replace_text(f'{placeholder}{ending}', placeholder, masked_text, alignment)
 
         # 4. 整形：空白の連続を一つにまとめる
-        masked_text = re.sub(r'\s+', ' ', masked_text)
+        masked_text = substitute(WHITESPACE_PATTERN, ' ', masked_text, alignment)
 
         # 5. マスキング対象が空になっていないか確認
         if len(masked_items) > 0 and len(masked_text.strip()) == 0:
             logger.warning("マスキング処理後にテキストが空になりました。元テキスト長: %d", len(text))
             # 最低限の内容を残す
-            masked_text = "[全文がマスキング対象]"
+            fallback = "[全文がマスキング対象]"
+            if alignment is not None:
+                alignment.apply(masked_text, [(0, len(masked_text), fallback)])
+            masked_text = fallback
+
+        detections = stats['detections']
+        for item in masked_items:
+            detections[item.code] += 1
+        seconds['postprocess'] += time.perf_counter() - started
 
-        return masked_text, masked_items
\ No newline at end of file
+        return masked_text, masked_items
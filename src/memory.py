@@ -0,0 +1,309 @@
+"""
+メモリ上限付きの実行のためのRSS監視モジュール
+
+コンテナのメモリ上限を超えるとプロセスは OOM killer に強制終了され、ログに何も残らない。
+このモジュールは、自プロセスと子孫プロセス（ワーカープロセスなど）の常駐メモリ（RSS）の
+合計を別スレッドで定期的に計測し、上限に近づいた場合に次の対策を取れるようにする。
+
+- 処理中のチャンク・タスクの数を減らす（limit_in_flight）
+- nlp.pipe に一度に渡すセグメント数を減らす（ワーカープロセスとは共有メモリ上の
+  フラグで状態を共有し、memory_pressure で参照する）
+
+閾値を超えた場合は警告をログに残し、処理の最後にピーク値を報告する。
+RSS は Linux の /proc から取得する（取得できない環境では監視しない）。
+"""
+import logging
+import os
+import re
+import threading
+from multiprocessing import sharedctypes
+
+logger = logging.getLogger(__name__)
+
+# 計測の間隔（秒）
+DEFAULT_INTERVAL = 0.5
+
+# 上限に対してこの割合を超えたら処理中のチャンク・タスクを減らし始める
+SOFT_LIMIT_RATIO = 0.8
+
+# 上限に対してこの割合を超えたら処理中のチャンク・タスクを1つに絞る
+HARD_LIMIT_RATIO = 0.95
+
+# メモリサイズの単位
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# 上限に近づいているかどうかのフラグ（親プロセスの監視スレッドが更新し、ワーカープロセスと共有する）
+_pressure_flag = None
+
+
+def parse_memory_size(value):
+    """
+    メモリサイズの文字列をバイト数に変換する
+
+    Args:
+        value (str): '4G', '512M', '1.5GiB', '1073741824' など（単位は1024倍、省略時はバイト）
+
+    Returns:
+        int: バイト数
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', str(value), re.IGNORECASE)
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"メモリサイズの形式が不正です: {value}（例: 4G, 512M）")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def format_bytes(size):
+    """
+    バイト数を表示用の文字列に変換する
+
+    Args:
+        size (int): バイト数
+
+    Returns:
+        str: '1.2GiB' などの文字列
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def process_rss(pid):
+    """
+    プロセスの常駐メモリを取得する
+
+    Args:
+        pid (int): プロセスID
+
+    Returns:
+        int: RSS（バイト）。取得できない場合（終了したプロセス・/proc がない環境）は None
+    """
+    try:
+        with open(f"/proc/{pid}/statm", 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def descendant_pids(pid):
+    """
+    プロセスの子孫プロセスのIDを取得する
+
+    Args:
+        pid (int): プロセスID
+
+    Returns:
+        list: 子孫プロセスのIDのリスト
+    """
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 2番目の項目（コマンド名）は括弧で囲まれ、空白を含む場合がある
+        fields = stat[stat.rfind(b')') + 2:].split()
+        if len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append(int(entry))
+
+    pids = []
+    stack = [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            pids.append(child)
+            stack.append(child)
+    return pids
+
+
+def install_pressure_flag(flag):
+    """
+    上限に近づいているかどうかのフラグをこのプロセスに設定する（ワーカープロセスの初期化で呼ぶ）
+
+    Args:
+        flag (Synchronized): MemoryMonitor.pressure_flag（None の場合は監視しない）
+    """
+    global _pressure_flag
+    _pressure_flag = flag
+
+
+def memory_pressure():
+    """
+    メモリ使用量が上限に近づいているかどうか
+
+    Returns:
+        bool: 監視中で、RSS の合計が上限の SOFT_LIMIT_RATIO を超えている場合は True
+    """
+    return _pressure_flag is not None and bool(_pressure_flag.value)
+
+
+class MemoryMonitor:
+    """
+    自プロセスと子孫プロセスの RSS の合計を定期的に計測し、上限への接近を知らせるクラス
+    """
+
+    def __init__(self, limit, interval=DEFAULT_INTERVAL, soft_ratio=SOFT_LIMIT_RATIO, hard_ratio=HARD_LIMIT_RATIO):
+        """
+        初期化
+
+        Args:
+            limit (int): メモリの上限（バイト）
+            interval (float): 計測の間隔（秒）
+            soft_ratio (float): 処理中のチャンク・タスクを減らし始める上限に対する割合
+            hard_ratio (float): 処理中のチャンク・タスクを1つに絞る上限に対する割合
+        """
+        self.limit = limit
+        self.interval = interval
+        self.soft_limit = int(limit * soft_ratio)
+        self.hard_limit = int(limit * hard_ratio)
+        self.pressure_flag = sharedctypes.RawValue('b', 0)
+
+        self.current = 0
+        self.peak = 0
+        self.peak_self = 0
+        self.peak_children = 0
+        self.samples = 0
+        self.pressure_events = 0
+        self.throttled = 0
+        self.available = True
+        self._level = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """
+        RSS を1回計測し、状態を更新する
+
+        Returns:
+            int: 自プロセスと子孫プロセスの RSS の合計（バイト）
+        """
+        own = process_rss(os.getpid())
+        if own is None:
+            self.available = False
+            return 0
+        children = sum(rss for rss in map(process_rss, descendant_pids(os.getpid())) if rss is not None)
+        total = own + children
+
+        self.current = total
+        self.samples += 1
+        self.peak = max(self.peak, total)
+        self.peak_self = max(self.peak_self, own)
+        self.peak_children = max(self.peak_children, children)
+
+        level = 2 if total >= self.hard_limit else 1 if total >= self.soft_limit else 0
+        if level > self._level:
+            self.pressure_events += 1
+            logger.warning(f"メモリ使用量が上限に近づいています: {format_bytes(total)} / {format_bytes(self.limit)} "
+                           f"(本体 {format_bytes(own)}, 子プロセス {format_bytes(children)})")
+        elif level == 0 and self._level > 0:
+            logger.info(f"メモリ使用量が {format_bytes(total)} に下がりました")
+        self._level = level
+        self.pressure_flag.value = 1 if level else 0
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """
+        監視スレッドを開始し、このプロセスの memory_pressure が監視結果を返すようにする
+        """
+        self.sample()
+        if not self.available:
+            logger.warning("このシステムでは RSS を取得できないため、メモリの監視は行いません")
+            return self
+        install_pressure_flag(self.pressure_flag)
+        self._thread = threading.Thread(target=self._run, name='memory-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        監視スレッドを停止する（最後に1回計測する）
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.sample()
+            install_pressure_flag(None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def limit_in_flight(self, limit):
+        """
+        メモリ使用量に応じて、処理中のチャンク・タスクの数の上限を決める
+
+        Args:
+            limit (int): 通常時の上限
+
+        Returns:
+            int: 上限の SOFT_LIMIT_RATIO 未満では limit、HARD_LIMIT_RATIO 未満では半分、それ以上では1
+        """
+        if self._level == 0:
+            return limit
+        return max(1, limit // 2) if self._level == 1 else 1
+
+    def should_wait(self, in_flight, limit):
+        """
+        処理中の数がメモリ使用量に応じた上限に達しているかどうかを判定する（達している場合は抑制回数を数える）
+
+        Args:
+            in_flight (int): 処理中のチャンク・タスクの数
+            limit (int): 通常時の上限
+
+        Returns:
+            bool: 新しいチャンク・タスクの投入を待つべき場合は True
+        """
+        if in_flight >= self.limit_in_flight(limit) and in_flight < limit:
+            self.throttled += 1
+            return True
+        return False
+
+    def stats(self):
+        """
+        計測結果を返す
+
+        Returns:
+            dict: 上限・ピーク値（合計・本体・子プロセス）・計測回数・上限への接近回数・抑制回数
+        """
+        return {
+            'limit': self.limit,
+            'peak': self.peak,
+            'peak_self': self.peak_self,
+            'peak_children': self.peak_children,
+            'samples': self.samples,
+            'pressure_events': self.pressure_events,
+            'throttled': self.throttled,
+        }
+
+
+def format_memory_stats(stats):
+    """
+    メモリの計測結果を表示用の文字列に変換する
+
+    Args:
+        stats (dict): MemoryMonitor.stats の戻り値
+
+    Returns:
+        str: フォーマットされた計測結果
+    """
+    ratio = stats['peak'] / stats['limit'] if stats['limit'] else 0.0
+    return (f"ピーク {format_bytes(stats['peak'])} / 上限 {format_bytes(stats['limit'])} ({ratio:.0%}) "
+            f"(本体 {format_bytes(stats['peak_self'])}, 子プロセス {format_bytes(stats['peak_children'])}), "
+            f"上限への接近 {stats['pressure_events']} 回, 投入の抑制 {stats['throttled']} 回")
@@ -0,0 +1,310 @@
+"""
+長時間のマスキング処理のメトリクスを公開するモジュール
+
+処理行数・文字数・カテゴリごとの検出数・正規表現と NLP の処理時間・キューの深さ・
+失敗した行数などを MetricsRegistry に集計し、次のいずれかの方法で公開する。
+
+- MetricsServer: ローカルの HTTP エンドポイント（/metrics は Prometheus のテキスト形式、
+  /metrics.json は JSON）
+- SnapshotWriter: 一定間隔で JSON のスナップショットをファイルに書き出す
+
+行ごとの処理では PersonalInfoMasker の統計（辞書の値の加算のみ）に記録し、
+呼び出し側がチャンク・タスクごとに take_stats で取り出して record_masker_stats で
+まとめて反映する。このため、メトリクスのロックを取るのはチャンク・タスクごとに数回のみとなる。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# メトリクス名の接頭辞
+PREFIX = 'masking'
+
+# JSON スナップショットの既定の書き出し間隔（秒）
+DEFAULT_SNAPSHOT_INTERVAL = 10.0
+
+# 定義済みのメトリクス（名前, 種類, 説明, ラベル名）
+METRICS = (
+    ('rows_total', 'counter', 'マスキングした行数', ()),
+    ('chars_total', 'counter', 'マスキングした文字数', ()),
+    ('detections_total', 'counter', 'カテゴリごとの検出数', ('category',)),
+    ('stage_seconds_total', 'counter', '処理の段（regex / nlp / postprocess）ごとの処理時間の合計', ('stage',)),
+    ('anchor_skipped_total', 'counter', 'アンカーがなく正規表現の走査を省略した行数', ('category',)),
+    ('row_errors_total', 'counter', '失敗して代替出力で補完した行数', ()),
+    ('files_total', 'counter', '処理したファイル数（result: succeeded / failed）', ('result',)),
+    ('queue_depth', 'gauge', 'キュー（read / write / tasks）に残っているチャンク・タスク数', ('queue',)),
+)
+
+
+class MetricsRegistry:
+    """
+    カウンターとゲージを集計し、Prometheus のテキスト形式・JSON に変換するクラス
+    """
+
+    def __init__(self):
+        """
+        初期化（METRICS の定義済みのメトリクスを登録する）
+        """
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._values = {}
+        for name, kind, help_text, label_names in METRICS:
+            self._metrics[name] = (kind, help_text, label_names)
+            self._values[name] = {}
+        self.started = time.time()
+
+    def inc(self, name, amount=1, labels=()):
+        """
+        カウンターに加算する
+
+        Args:
+            name (str): メトリクス名（接頭辞なし）
+            amount (float): 加算する値
+            labels (tuple): ラベルの値（ラベル名の順）
+        """
+        if not amount:
+            return
+        values = self._values[name]
+        with self._lock:
+            values[labels] = values.get(labels, 0) + amount
+
+    def set(self, name, value, labels=()):
+        """
+        ゲージの値を設定する
+
+        Args:
+            name (str): メトリクス名（接頭辞なし）
+            value (float): 値
+            labels (tuple): ラベルの値（ラベル名の順）
+        """
+        values = self._values[name]
+        with self._lock:
+            values[labels] = value
+
+    def get(self, name, labels=()):
+        """
+        メトリクスの現在の値を返す
+
+        Args:
+            name (str): メトリクス名（接頭辞なし）
+            labels (tuple): ラベルの値
+
+        Returns:
+            float: 値（未記録の場合は0）
+        """
+        with self._lock:
+            return self._values[name].get(labels, 0)
+
+    def record_masker_stats(self, stats):
+        """
+        PersonalInfoMasker.take_stats で取り出した統計をまとめて反映する
+
+        Args:
+            stats (dict): PersonalInfoMasker.take_stats の戻り値
+        """
+        with self._lock:
+            values = self._values
+            values['chars_total'][()] = values['chars_total'].get((), 0) + stats.get('chars', 0)
+            for name, counts in (('detections_total', stats.get('detections', {})),
+                                 ('stage_seconds_total', stats.get('seconds', {})),
+                                 ('anchor_skipped_total', stats.get('skipped', {}))):
+                target = values[name]
+                for key, value in counts.items():
+                    target[(key,)] = target.get((key,), 0) + value
+
+    def snapshot(self, previous=None):
+        """
+        全メトリクスの現在の値を返す
+
+        Args:
+            previous (dict): 前回の snapshot の戻り値（指定した場合は前回からの処理速度も含める）
+
+        Returns:
+            dict: {'timestamp', 'uptime_seconds', 'metrics': {名前: {ラベル: 値}}, 'rates': 処理速度}
+        """
+        now = time.time()
+        with self._lock:
+            metrics = {
+                name: {','.join(f"{label}={value}" for label, value in zip(self._metrics[name][2], key)): value
+                       for key, value in sorted(values.items())}
+                for name, values in self._values.items()
+            }
+        uptime = now - self.started
+        rows = metrics['rows_total'].get('', 0)
+        chars = metrics['chars_total'].get('', 0)
+        rates = {
+            'rows_per_second': rows / uptime if uptime > 0 else 0.0,
+            'chars_per_second': chars / uptime if uptime > 0 else 0.0,
+        }
+        if previous is not None:
+            interval = now - previous['timestamp']
+            if interval > 0:
+                rates['recent_rows_per_second'] = (rows - previous['metrics']['rows_total'].get('', 0)) / interval
+                rates['recent_chars_per_second'] = (chars - previous['metrics']['chars_total'].get('', 0)) / interval
+        return {'timestamp': now, 'uptime_seconds': uptime, 'metrics': metrics, 'rates': rates}
+
+    def render_prometheus(self):
+        """
+        全メトリクスを Prometheus のテキスト形式に変換する
+
+        Returns:
+            str: テキスト形式のメトリクス
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, label_names) in self._metrics.items():
+                full_name = f"{PREFIX}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                values = self._values[name]
+                if not values and not label_names:
+                    lines.append(f"{full_name} 0")
+                for key, value in sorted(values.items()):
+                    labels = ','.join(f'{label}="{_escape_label(label_value)}"'
+                                      for label, label_value in zip(label_names, key))
+                    lines.append(f"{full_name}{{{labels}}} {value}" if labels else f"{full_name} {value}")
+        lines.append(f"# HELP {PREFIX}_uptime_seconds 処理開始からの経過時間")
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self.started:.3f}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsServer:
+    """
+    メトリクスをローカルの HTTP エンドポイントで公開するクラス（別スレッドで応答する）
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=9108):
+        """
+        初期化
+
+        Args:
+            registry (MetricsRegistry): 公開するメトリクス
+            host (str): 待ち受けアドレス
+            port (int): 待ち受けポート（0 の場合は空いているポートを使う）
+        """
+        self.registry = registry
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry.render_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"メトリクスの要求: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        """
+        待ち受けているアドレス
+
+        Returns:
+            tuple: (ホスト, ポート)
+        """
+        return self._server.server_address[:2]
+
+    def start(self):
+        """
+        応答スレッドを開始する
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        host, port = self.address
+        logger.info(f"メトリクスを http://{host}:{port}/metrics で公開します")
+        return self
+
+    def stop(self):
+        """
+        応答スレッドを停止する
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+
+class SnapshotWriter:
+    """
+    メトリクスの JSON スナップショットを一定間隔でファイルに書き出すクラス
+
+    書き出しは一時ファイルへの書き込みと置き換えで行うため、読み取り側が書きかけの
+    ファイルを読むことはない。停止時に最後のスナップショットを書き出す。
+    """
+
+    def __init__(self, registry, path, interval=DEFAULT_SNAPSHOT_INTERVAL):
+        """
+        初期化
+
+        Args:
+            registry (MetricsRegistry): 書き出すメトリクス
+            path (str): 書き出し先のファイルパス
+            interval (float): 書き出しの間隔（秒）
+        """
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        """
+        現在のスナップショットを書き出す
+        """
+        snapshot = self.registry.snapshot(self._previous)
+        self._previous = snapshot
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"メトリクスのスナップショットを '{self.path}' に書き出せませんでした: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        """
+        書き出しスレッドを開始する
+        """
+        self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+        self._thread.start()
+        logger.info(f"メトリクスのスナップショットを {self.interval:g} 秒ごとに '{self.path}' に書き出します")
+        return self
+
+    def stop(self):
+        """
+        書き出しスレッドを停止し、最後のスナップショットを書き出す
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.write()
@@ -0,0 +1,255 @@
+"""
+メモリマップによる大きなCSVファイルの読み書きモジュール
+
+列数の多いエクスポートから問い合わせ文の1カラムだけをマスキングする場合、
+pd.read_csv は全カラムを Python オブジェクトとして読み込むため、ファイルサイズの
+数倍のメモリを消費する。このモジュールは入力ファイルをメモリマップし、引用符を
+考慮してレコード境界と対象フィールドの位置だけを求める。対象フィールドのみを
+必要になった時点でデコードし、レコードは解析せずにマップしたバッファから
+そのまま出力へコピーして、末尾に追加のカラムを付ける。
+
+入力は UTF-8（',' '"' 改行のバイトがマルチバイト文字の途中に現れない文字コード）を前提とする。
+"""
+import csv
+import mmap
+from typing import NamedTuple
+
+QUOTE = ord('"')
+COMMA = ord(',')
+NEWLINE = ord('\n')
+CARRIAGE_RETURN = ord('\r')
+
+# UTF-8 の BOM
+BOM = b'\xef\xbb\xbf'
+
+
+class RecordSpan(NamedTuple):
+    """
+    1レコード分のバイト範囲
+    """
+    start: int          # レコードの先頭
+    field_start: int    # 対象フィールドの先頭（引用符を含む）
+    field_end: int      # 対象フィールドの末尾（引用符を含む）
+    content_end: int    # 改行を除いたレコードの末尾
+    end: int            # 改行を含めたレコードの末尾
+
+
+def quote_field(text):
+    """
+    CSVのフィールドとして出力する文字列を作成する（必要な場合のみ引用符で囲む）
+
+    Args:
+        text (str): フィールドの値
+
+    Returns:
+        str: 出力する文字列
+    """
+    if any(char in text for char in ',"\n\r'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+class MappedCSV:
+    """
+    メモリマップしたCSVファイルから、1カラムのみを取り出すリーダー
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        """
+        初期化（ファイルをメモリマップし、ヘッダーを読み込む）
+
+        Args:
+            path (str): CSVファイルパス
+            encoding (str): 文字コード
+
+        Raises:
+            ValueError: ヘッダーがない場合
+        """
+        self.path = path
+        self.encoding = encoding
+        self._file = open(path, 'rb')
+        try:
+            self.size = self._file.seek(0, 2)
+            if self.size == 0:
+                raise ValueError(f"'{path}' にヘッダーがありません")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        self.data_start = len(BOM) if self._map[:len(BOM)] == BOM else 0
+        self.header = self._record_end(self.data_start)
+        self.columns = self._split_header(self._map[self.data_start:self.header[0]])
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _split_header(self, raw):
+        text = raw.decode(self.encoding)
+        return next(csv.reader([text])) if text else []
+
+    def _record_end(self, position):
+        """
+        フィールドの区切り位置から、そのレコードの末尾を求める
+
+        position より後ろで、引用符の外側にある最初の改行をレコードの末尾とする。
+
+        Args:
+            position (int): 引用符の外側にある位置
+
+        Returns:
+            tuple: (改行を除いた末尾, 改行を含めた末尾)
+        """
+        mm = self._map
+        parity = 0
+        scanned = position
+        while True:
+            newline = mm.find(b'\n', scanned)
+            if newline < 0:
+                return self.size, self.size
+            parity = (parity + mm[scanned:newline].count(b'"')) % 2
+            if parity == 0:
+                content_end = newline - 1 if newline > position and mm[newline - 1] == CARRIAGE_RETURN else newline
+                return content_end, newline + 1
+            scanned = newline + 1
+
+    def _field_end(self, position):
+        """
+        フィールドの先頭から、そのフィールドの末尾（区切り文字の位置）を求める
+
+        Args:
+            position (int): フィールドの先頭
+
+        Returns:
+            int: フィールドの末尾
+
+        Raises:
+            ValueError: 引用符が閉じられていない場合
+        """
+        mm = self._map
+        size = self.size
+        if position < size and mm[position] == QUOTE:
+            scanned = position + 1
+            while True:
+                quote = mm.find(b'"', scanned)
+                if quote < 0:
+                    raise ValueError(f"'{self.path}' の {position} バイト目から始まる引用符が閉じられていません")
+                if quote + 1 < size and mm[quote + 1] == QUOTE:
+                    scanned = quote + 2  # エスケープされた引用符
+                    continue
+                return quote + 1
+
+        comma = mm.find(b',', position)
+        newline = mm.find(b'\n', position)
+        if newline < 0:
+            newline = size
+        elif newline > position and mm[newline - 1] == CARRIAGE_RETURN:
+            newline -= 1
+        return newline if comma < 0 or newline < comma else comma
+
+    def records(self, column_index):
+        """
+        レコードの範囲を先頭から順に返す（空行は読み飛ばす）
+
+        Args:
+            column_index (int): 対象カラムの位置
+
+        Yields:
+            RecordSpan: レコードの範囲
+
+        Raises:
+            ValueError: 対象カラムまでのフィールドがないレコードがある場合
+        """
+        mm = self._map
+        size = self.size
+        position = self.header[1]
+        while position < size:
+            start = position
+            if mm[position] in (NEWLINE, CARRIAGE_RETURN):
+                # 空行は pandas と同様に読み飛ばす
+                position = mm.find(b'\n', position)
+                position = size if position < 0 else position + 1
+                continue
+
+            # 対象カラムの直前までのフィールドは範囲のみを求める
+            field_start = position
+            for _ in range(column_index):
+                field_end = self._field_end(field_start)
+                if field_end >= size or mm[field_end] != COMMA:
+                    raise ValueError(f"'{self.path}' の {start} バイト目のレコードに対象カラムがありません")
+                field_start = field_end + 1
+
+            field_end = self._field_end(field_start)
+            content_end, end = self._record_end(field_end)
+            yield RecordSpan(start, field_start, field_end, content_end, end)
+            position = end
+
+    def field_text(self, record):
+        """
+        対象フィールドの値をデコードする
+
+        Args:
+            record (RecordSpan): レコードの範囲
+
+        Returns:
+            str: フィールドの値（空の場合は None）
+        """
+        raw = self._map[record.field_start:record.field_end]
+        if raw[:1] == b'"':
+            raw = raw[1:-1].replace(b'""', b'"')
+        if not raw:
+            return None
+        return raw.decode(self.encoding)
+
+    def release(self, position):
+        """
+        処理済みの範囲のページをプロセスのメモリから解放する
+
+        読み取り専用のマップなので、解放したページは必要になればファイルから読み直される。
+        ページを解放しないと、読み進めた分だけ常駐メモリ（RSS）が増え続ける。
+
+        Args:
+            position (int): この位置より前を解放する
+        """
+        length = position - position % mmap.PAGESIZE
+        if length > 0 and hasattr(mmap, 'MADV_DONTNEED'):
+            self._map.madvise(mmap.MADV_DONTNEED, 0, length)
+
+    def write_header(self, out, extra_columns=()):
+        """
+        ヘッダーを出力する（元のヘッダーをそのままコピーし、追加のカラム名を末尾に付ける）
+
+        Args:
+            out (BinaryIO): 出力先
+            extra_columns (iterable): 追加するカラム名
+        """
+        content_end, end = self.header
+        out.write(self._map[:content_end])
+        for column in extra_columns:
+            out.write(b',' + quote_field(column).encode(self.encoding))
+        out.write(self._map[content_end:end] or b'\n')
+
+    def write_record(self, out, record, extra_values=()):
+        """
+        元のレコードの末尾にフィールドを追加して出力する
+
+        元のレコードのバイト列はマップしたバッファからそのままコピーする。
+
+        Args:
+            out (BinaryIO): 出力先
+            record (RecordSpan): レコードの範囲
+            extra_values (iterable): 末尾に追加するフィールドの値
+        """
+        mm = self._map
+        encoding = self.encoding
+        out.write(mm[record.start:record.content_end])
+        for extra in extra_values:
+            out.write(b',' + quote_field(extra).encode(encoding))
+        out.write(mm[record.content_end:record.end] or b'\n')
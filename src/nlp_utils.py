@@ -1,59 +1,232 @@
 """
 NLPを使用した個人情報検出のためのユーティリティモジュール
 """
-import spacy
 from collections import defaultdict
 import re
 import logging
+import threading
 
-# ロガーの設定
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from .memory import memory_pressure
+
+# ロガーの取得（ルートロガーの設定は実行スクリプト側で行う）
 logger = logging.getLogger(__name__)
 
-try:
-    # spaCyの日本語モデルをロード
-    nlp = spacy.load('ja_core_news_md')
-    logger.info("spaCyの日本語モデルを正常にロードしました。")
-except Exception as e:
-    logger.error(f"spaCyモデルのロードに失敗しました: {e}")
-    logger.warning("NLP機能は制限されます。")
-    nlp = None
+# spaCyのモデル（初めてNLP処理を行う時点でロードする）
+nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
 
-def extract_named_entities(text):
+def get_nlp():
     """
-    入力テキストから固有表現を抽出する
+    spaCyの日本語モデルを返す（初回呼び出し時にのみ spaCy をインポートしてロードする）
+
+    使用するモデルは config.ini の [nlp] japanese_model で指定する。
+
+    Returns:
+        spacy.language.Language: ロードしたモデル（ロードに失敗した場合は None）
+    """
+    global nlp, _nlp_loaded
+    if _nlp_loaded:
+        return nlp
+
+    with _nlp_lock:
+        if not _nlp_loaded:
+            from .config_utils import load_config, get_setting
+            model_name = get_setting(load_config(), 'nlp', 'japanese_model', 'ja_core_news_md')
+            try:
+                # spaCyの日本語モデルをロード
+                import spacy
+                nlp = spacy.load(model_name)
+                logger.info("spaCyの日本語モデルを正常にロードしました。")
+            except Exception as e:
+                logger.error(f"spaCyモデルのロードに失敗しました: {e}")
+                logger.warning("NLP機能は制限されます。")
+                nlp = None
+            _nlp_loaded = True
+    return nlp
+
+
+# 長文を分割してから解析する閾値（文字数）
+MAX_SEGMENT_CHARS = 2000
+# 分割したセグメント同士を重ねる文字数（境界をまたぐ固有表現を取りこぼさないため）
+SEGMENT_OVERLAP = 100
+# nlp.pipe に一度に渡すセグメント数
+PIPE_BATCH_SIZE = 8
+# メモリ使用量が上限に近づいている場合に nlp.pipe に一度に渡すセグメント数
+LOW_MEMORY_PIPE_BATCH_SIZE = 1
+# この文字数を超えるテキストはNLP処理を行わない（正規表現のみで処理する）
+MAX_NLP_TEXT_CHARS = 1000000
+
+# NLPで検出できるカテゴリ（電話番号・メールアドレスは正規表現のみで検出する）
+NLP_CATEGORIES = frozenset({'name', 'company', 'address', 'date', 'birthdate'})
+
+# セグメントの区切りとして優先する文字
+SEGMENT_BOUNDARY_PATTERN = re.compile(r'[。！？!?\n]')
+
+
+def segment_text(text, max_chars=MAX_SEGMENT_CHARS, overlap=SEGMENT_OVERLAP):
+    """
+    長いテキストを重なりのあるセグメントに分割する
+
+    各セグメントは max_chars 文字以内で、可能な限り文末（。！？や改行）で区切る。
+    隣り合うセグメントは overlap 文字だけ重なる。各セグメントには担当範囲
+    （重なり部分の中点で区切った範囲）を持たせ、固有表現はその開始位置が
+    担当範囲に含まれるセグメントでのみ採用することで重複を防ぐ。
 
     Args:
         text (str): 入力テキスト
+        max_chars (int): 1セグメントの最大文字数
+        overlap (int): セグメント同士を重ねる文字数
 
     Returns:
-        dict: エンティティのタイプとテキストのリスト
+        list: (開始位置, 担当範囲の開始, 担当範囲の終了, セグメント) のリスト
     """
-    if not nlp:
-        logger.warning("NLPモデルが利用できないため、固有表現抽出はスキップされます。")
-        return {}
+    length = len(text)
+    if length <= max_chars:
+        return [(0, 0, length, text)]
 
-    try:
-        doc = nlp(text)
-        entities = defaultdict(list)
+    overlap = min(overlap, max_chars // 4)
+    windows = []
+    start = 0
+    while start < length:
+        end = min(start + max_chars, length)
+        if end < length:
+            # ウィンドウの後半にある最後の文末で区切る
+            last_boundary = None
+            for match in SEGMENT_BOUNDARY_PATTERN.finditer(text, start + max_chars // 2, end):
+                last_boundary = match.end()
+            if last_boundary is not None:
+                end = last_boundary
+        windows.append((start, end))
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+
+    segments = []
+    for i, (start, end) in enumerate(windows):
+        own_start = 0 if i == 0 else (start + windows[i - 1][1]) // 2
+        own_end = length if i == len(windows) - 1 else (windows[i + 1][0] + end) // 2
+        segments.append((start, own_start, own_end, text[start:end]))
+    return segments
+
+
+def disabled_components(categories):
+    """
+    検出対象のカテゴリに不要なパイプラインコンポーネントを返す
+
+    企業名候補（noun_chunks）を使わない場合は parser を、人名候補（PROPN）と
+    企業名候補のどちらも使わない場合は品詞付与のコンポーネントを無効にする。
+
+    Args:
+        categories (set): 検出対象のカテゴリ（None の場合はすべて）
+
+    Returns:
+        list: 無効にするコンポーネント名のリスト
+    """
+    nlp = get_nlp()
+    if categories is None or not nlp:
+        return []
 
-        # 固有表現を抽出
-        for ent in doc.ents:
+    disabled = []
+    if 'company' not in categories:
+        disabled.append('parser')
+    if 'name' not in categories and 'company' not in categories:
+        disabled.extend(['morphologizer', 'attribute_ruler'])
+    return [name for name in disabled if name in nlp.pipe_names]
+
+
+def _collect_entities(doc, offset, own_start, own_end, entities, known, company_names,
+                      collect_names=True, collect_companies=True):
+    """
+    解析済みのドキュメントから固有表現・人名候補・企業名候補を収集する
+
+    Args:
+        doc (spacy.tokens.Doc): 解析済みのドキュメント
+        offset (int): セグメントの元テキスト内での開始位置
+        own_start (int): このセグメントが担当する範囲の開始位置
+        own_end (int): このセグメントが担当する範囲の終了位置
+        entities (defaultdict): エンティティタイプごとのテキストのリスト（更新される）
+        known (set): 既に収集したエンティティのテキスト（更新される）
+        company_names (list): 企業名候補のリスト（更新される）
+        collect_names (bool): 人名候補（PROPN）を収集するかどうか
+        collect_companies (bool): 企業名候補（noun_chunks）を収集するかどうか
+    """
+    def owned(start_char):
+        return own_start <= offset + start_char < own_end
+
+    # 固有表現を抽出
+    for ent in doc.ents:
+        if owned(ent.start_char):
             entities[ent.label_].append(ent.text)
+            known.add(ent.text)
 
-        # 人名を検出（PERSON以外の方法でも）
+    # 人名を検出（PERSON以外の方法でも）
+    if collect_names:
         for token in doc:
-            if token.pos_ == 'PROPN' and len(token.text) >= 2:
-                if token.text not in [e for ent_list in entities.values() for e in ent_list]:
+            if token.pos_ == 'PROPN' and len(token.text) >= 2 and owned(token.idx):
+                if token.text not in known:
                     entities['PERSON_CANDIDATE'].append(token.text)
+                    known.add(token.text)
 
-        # 企業名の候補を検出（名詞の連続で、数字を含まない）
-        company_names = []
+    # 企業名の候補を検出（名詞の連続で、数字を含まない）
+    if collect_companies:
         for chunk in doc.noun_chunks:
-            if len(chunk.text) >= 3 and not re.search(r'\d', chunk.text):
-                if chunk.text not in [e for ent_list in entities.values() for e in ent_list]:
+            if len(chunk.text) >= 3 and not re.search(r'\d', chunk.text) and owned(chunk.start_char):
+                if chunk.text not in known:
                     company_names.append(chunk.text)
 
+
+def extract_named_entities(text, max_segment_chars=MAX_SEGMENT_CHARS, overlap=SEGMENT_OVERLAP,
+                           batch_size=None, categories=None):
+    """
+    入力テキストから固有表現を抽出する
+
+    max_segment_chars を超える長文は重なりのあるセグメントに分割し、
+    nlp.pipe でまとめて解析する。セグメント単位で解析するため、1行が巨大でも
+    ワーカーのピークメモリはセグメントサイズ × バッチサイズ程度に抑えられる。
+
+    Args:
+        text (str): 入力テキスト
+        max_segment_chars (int): 分割せずに解析する最大文字数
+        overlap (int): セグメント同士を重ねる文字数
+        batch_size (int): nlp.pipe に一度に渡すセグメント数（省略時は PIPE_BATCH_SIZE、
+            --max-memory の上限に近づいている場合は LOW_MEMORY_PIPE_BATCH_SIZE）
+        categories (set): 検出対象のカテゴリ（指定時は不要なコンポーネントと候補抽出を省略する）
+
+    Returns:
+        dict: エンティティのタイプとテキストのリスト
+    """
+    nlp = get_nlp()
+    if not nlp:
+        logger.warning("NLPモデルが利用できないため、固有表現抽出はスキップされます。")
+        return {}
+
+    if len(text) > MAX_NLP_TEXT_CHARS:
+        logger.warning(f"テキストが長すぎるため ({len(text)} 文字)、固有表現抽出はスキップされます。")
+        return {}
+
+    try:
+        entities = defaultdict(list)
+        known = set()
+        company_names = []
+        disable = disabled_components(categories)
+        flags = {
+            'collect_names': categories is None or 'name' in categories,
+            'collect_companies': categories is None or 'company' in categories,
+        }
+
+        segments = segment_text(text, min(max_segment_chars, nlp.max_length), overlap)
+        if len(segments) == 1:
+            doc = nlp(text, disable=disable)
+            _collect_entities(doc, 0, 0, len(text), entities, known, company_names, **flags)
+        else:
+            if batch_size is None:
+                batch_size = LOW_MEMORY_PIPE_BATCH_SIZE if memory_pressure() else PIPE_BATCH_SIZE
+            docs = nlp.pipe((segment for _, _, _, segment in segments), batch_size=batch_size, disable=disable)
+            for (offset, own_start, own_end, _), doc in zip(segments, docs):
+                _collect_entities(doc, offset, own_start, own_end, entities, known, company_names, **flags)
+
         if company_names:
             entities['ORGANIZATION_CANDIDATE'] = company_names
 
@@ -62,17 +235,23 @@ def extract_named_entities(text):
         logger.error(f"固有表現抽出に失敗しました: {e}")
         return {}
 
-def detect_personal_info_with_nlp(text):
+def detect_personal_info_with_nlp(text, categories=None):
     """
     NLPを使用して個人情報を検出する
 
     Args:
         text (str): 入力テキスト
+        categories (set): 検出対象のカテゴリ（None の場合はすべて）
 
     Returns:
         dict: タイプごとの個人情報のリスト
     """
-    entities = extract_named_entities(text)
+    if categories is not None:
+        categories = set(categories) & NLP_CATEGORIES
+        if not categories:
+            return {}
+
+    entities = extract_named_entities(text, categories=categories)
     personal_info = {}
 
     # 人名
@@ -131,4 +310,7 @@ def detect_personal_info_with_nlp(text):
         if normal_dates:
             personal_info['date'] = normal_dates
 
+    if categories is not None:
+        personal_info = {category: items for category, items in personal_info.items() if category in categories}
+
     return personal_info
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+パターン照合前の正規化モジュール
+
+全角英数字・半角カナ・各種ハイフンなどの表記ゆれを NFKC 相当の規則で正規化し、
+正規化後のテキストに対してパターンを照合できるようにする。正規化で文字数が変わる
+文字（'㈱' → '(株)'、半角カナと濁点の合成など）がある場合のみ、正規化後の位置を
+元のテキストの位置へ戻すためのオフセットマップを作成する。
+
+正規化の対応表は、初めて正規化を行う時点で一度だけ作成する。
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+# NFKC では変換されないが、ハイフンとして扱う文字
+HYPHEN_VARIANTS = '‐‑‒–—―−﹣－'
+
+# 長音記号（ー）は数字に隣接する場合のみハイフンとして扱う（カタカナ語の長音は残す）
+PROLONGED_SOUND_HYPHEN_PATTERN = re.compile(r'(?<=[0-9])ー|ー(?=[0-9])')
+
+# 正規化の対応表（初回の正規化時に作成する）
+_one_to_one = None       # 1文字 → 1文字に変換される文字の対応表
+_one_to_one_pattern = None  # 1文字 → 1文字に変換される文字に一致する正規表現
+_multi_pattern = None    # 文字数が変わる文字・合成が必要な文字に一致する正規表現
+_multi_cache = {}        # 基本多言語面以外の文字の正規化結果のキャッシュ
+_tables_lock = threading.Lock()
+
+
+def _char_class(chars):
+    """
+    文字の集合から、連続する範囲をまとめた正規表現の文字クラスを作成する
+
+    Args:
+        chars (iterable): 文字の集合
+
+    Returns:
+        str: 文字クラスの中身
+    """
+    codes = sorted(ord(char) for char in chars)
+    ranges = []
+    for code in codes:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return ''.join(
+        re.escape(chr(first)) if first == last else f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+        for first, last in ranges
+    )
+
+
+def _build_tables():
+    """
+    基本多言語面の全文字について正規化結果を調べ、対応表を作成する
+    """
+    global _one_to_one, _one_to_one_pattern, _multi_pattern
+    one_to_one = {}
+    multi = []
+    for code in range(0x10000):
+        if 0xD800 <= code <= 0xDFFF:
+            continue  # サロゲート
+        char = chr(code)
+        normalized = unicodedata.normalize('NFKC', char)
+        if normalized == char:
+            continue
+        if len(normalized) == 1 and not unicodedata.combining(normalized):
+            one_to_one[code] = normalized
+        else:
+            multi.append(char)
+
+    for char in HYPHEN_VARIANTS:
+        one_to_one[ord(char)] = '-'
+
+    # 基本多言語面以外の文字（数学用英数字記号など）は出現時に個別に正規化する
+    _multi_pattern = re.compile(f"[{_char_class(multi)}\U00010000-\U0010FFFF]")
+    _one_to_one_pattern = re.compile(f"[{_char_class(chr(code) for code in one_to_one)}]")
+    _one_to_one = one_to_one
+
+
+def _ensure_tables():
+    if _one_to_one is None:
+        with _tables_lock:
+            if _one_to_one is None:
+                _build_tables()
+
+
+class OffsetMap:
+    """
+    正規化後のテキストの位置を元のテキストの位置に戻すためのマップ
+
+    文字数が変わった箇所のみを (正規化後の開始, 正規化後の終了, 元の開始, 元の終了) として
+    保持し、それ以外の箇所は直前の箇所からのずれで計算する。
+    """
+
+    __slots__ = ('norm_starts', 'chunks')
+
+    def __init__(self, chunks):
+        """
+        初期化
+
+        Args:
+            chunks (list): 文字数が変わった箇所のリスト（正規化後の位置の昇順）
+        """
+        self.chunks = chunks
+        self.norm_starts = [chunk[0] for chunk in chunks]
+
+    def start(self, position):
+        """
+        範囲の開始位置を元のテキストの位置に戻す（変換された文字の途中なら、その文字の先頭）
+
+        Args:
+            position (int): 正規化後のテキストの位置
+
+        Returns:
+            int: 元のテキストの位置
+        """
+        index = bisect_right(self.norm_starts, position) - 1
+        if index < 0:
+            return position
+        norm_start, norm_end, orig_start, orig_end = self.chunks[index]
+        if position < norm_end:
+            return orig_start
+        return orig_end + (position - norm_end)
+
+    def end(self, position):
+        """
+        範囲の終了位置を元のテキストの位置に戻す（変換された文字の途中なら、その文字の末尾）
+
+        Args:
+            position (int): 正規化後のテキストの位置
+
+        Returns:
+            int: 元のテキストの位置
+        """
+        index = bisect_left(self.norm_starts, position) - 1
+        if index < 0:
+            return position
+        norm_start, norm_end, orig_start, orig_end = self.chunks[index]
+        if position <= norm_end:
+            return orig_end
+        return orig_end + (position - norm_end)
+
+
+def _translate(text):
+    """
+    1文字 → 1文字に変換される文字のみを置き換える（該当する文字がなければそのまま返す）
+
+    Args:
+        text (str): テキスト
+
+    Returns:
+        str: 置き換え後のテキスト
+    """
+    if _one_to_one_pattern.search(text) is None:
+        return text
+    return _one_to_one_pattern.sub(lambda match: _one_to_one[ord(match.group())], text)
+
+
+def _hyphenate_prolonged_sounds(text):
+    """
+    数字に隣接する長音記号をハイフンに置き換える
+
+    Args:
+        text (str): テキスト
+
+    Returns:
+        str: 置き換え後のテキスト
+    """
+    if 'ー' not in text:
+        return text
+    return PROLONGED_SOUND_HYPHEN_PATTERN.sub('-', text)
+
+
+def _normalize_char(char):
+    """
+    文字数が変わる文字を1文字ずつ正規化する
+
+    Args:
+        char (str): 文字
+
+    Returns:
+        str: 正規化後の文字列
+    """
+    normalized = _multi_cache.get(char)
+    if normalized is None:
+        normalized = unicodedata.normalize('NFKC', char)
+        normalized = _translate(normalized)
+        _multi_cache[char] = normalized
+    return normalized
+
+
+def normalize_text(text):
+    """
+    テキストを正規化する
+
+    1文字が1文字に変換されるだけの場合は位置が変わらないため、オフセットマップは作成しない。
+
+    Args:
+        text (str): 元のテキスト
+
+    Returns:
+        tuple: (正規化後のテキスト, OffsetMap（位置が変わらない場合は None）)
+    """
+    _ensure_tables()
+
+    if _multi_pattern.search(text) is None:
+        return _hyphenate_prolonged_sounds(_translate(text)), None
+
+    pieces = []
+    chunks = []
+    norm_length = 0
+    position = 0
+    for match in _multi_pattern.finditer(text):
+        index = match.start()
+        if index > position:
+            piece = _translate(text[position:index])
+            pieces.append(piece)
+            norm_length += len(piece)
+        normalized = _normalize_char(text[index])
+
+        orig_start = index
+        if (normalized and unicodedata.combining(normalized[0]) and index > position
+                and not (chunks and chunks[-1][1] == norm_length)):
+            # 濁点・半濁点などの結合文字は、直前の文字と合成する
+            previous = pieces[-1]
+            normalized = unicodedata.normalize('NFC', previous[-1] + normalized)
+            pieces[-1] = previous[:-1]
+            norm_length -= 1
+            orig_start = index - 1
+
+        pieces.append(normalized)
+        chunks.append((norm_length, norm_length + len(normalized), orig_start, index + 1))
+        norm_length += len(normalized)
+        position = index + 1
+
+    if position < len(text):
+        pieces.append(_translate(text[position:]))
+
+    normalized = _hyphenate_prolonged_sounds(''.join(pieces))
+    return normalized, OffsetMap(chunks)
@@ -46,62 +46,60 @@ COMMON_CITIES = [
 ]
 
 # 住所パターン（都道府県または市から始まり、数字と方角を含む可能性がある）
+# 全角数字は正規化（normalize=True）で半角になるが、正規化しないマスカーのために残す
 ADDRESS_PREFIX_PATTERN = '|'.join([re.escape(name) for name in (PREFECTURE_NAMES + COMMON_CITIES)])
 ADDRESS_PATTERN = rf'(?:({ADDRESS_PREFIX_PATTERN})[\s]*.+?(?:[0-9０-９]+[^0-9０-９\s]{1,3}|丁目|番地|号))'
 
 # 企業情報・職務経歴のパターン
-COMPANY_SUFFIX = '株式会社|有限会社|合同会社|社団法人|財団法人|株式会社|㈱|（株）|\\(株\\)|LLC|Co\\.|Corp\\.|Inc\\.'
+# ㈱・（株）は正規化で (株) になるが、正規化しないマスカーのために残す
+COMPANY_SUFFIX = '株式会社|有限会社|合同会社|社団法人|財団法人|\\(株\\)|㈱|（株）|LLC|Co\\.|Corp\\.|Inc\\.'
 COMPANY_PATTERN = rf'(?:[ァ-ヶー一-龯々A-Za-z]+{COMPANY_SUFFIX}|{COMPANY_SUFFIX}[ァ-ヶー一-龯々A-Za-z]+)'
 
-# コンパイル済みの正規表現パターン
-PATTERNS = {
-    'name': re.compile(NAME_PATTERN),
-    'phone': re.compile(PHONE_PATTERN),
-    'birthdate': re.compile(BIRTHDATE_WITH_CONTEXT_PATTERN),  # 生年月日コンテキスト付き
-    'date': re.compile(DATE_PATTERN),  # 一般的な日付
-    'email': re.compile(EMAIL_PATTERN),
-    'address': re.compile(ADDRESS_PATTERN),
-    'company': re.compile(COMPANY_PATTERN)
+# カテゴリごとのパターン定義（順番が重要：同じ優先度・長さの検出結果はこの順で優先される）
+PATTERN_SOURCES = {
+    'name': NAME_PATTERN,
+    'phone': PHONE_PATTERN,
+    'birthdate': BIRTHDATE_WITH_CONTEXT_PATTERN,  # 生年月日コンテキスト付き
+    'date': DATE_PATTERN,  # 一般的な日付
+    'email': EMAIL_PATTERN,
+    'address': ADDRESS_PATTERN,
+    'company': COMPANY_PATTERN
 }
 
 # マスキング後の置換文字列
 MASK_REPLACEMENTS = {
     'name': '[氏名]',
     'phone': '[電話番号]',
-    'date': '[生年月日]',
+    'birthdate': '[生年月日]',
+    'date': '[日付]',
     'email': '[メールアドレス]',
     'address': '[住所]',
     'company': '[企業情報]'
 }
 
-# 全パターンをまとめた大きな正規表現（順番が重要）
-ALL_PATTERNS_DICT = {
-    'name': (NAME_PATTERN, '[氏名]'),
-    'phone': (PHONE_PATTERN, '[電話番号]'),
-    'birthdate': (BIRTHDATE_WITH_CONTEXT_PATTERN, '[生年月日]'),
-    'date': (DATE_PATTERN, '[日付]'),
-    'email': (EMAIL_PATTERN, '[メールアドレス]'),
-    'address': (ADDRESS_PATTERN, '[住所]'),
-    'company': (COMPANY_PATTERN, '[企業情報]')
+# 重複する検出結果の優先度（小さいほど優先、既定は2）
+# 生年月日は一般的な日付と重複しないよう優先する
+PATTERN_PRIORITIES = {
+    'birthdate': 1
 }
+DEFAULT_PRIORITY = 2
 
-# マスキング後の置換文字列
-MASK_REPLACEMENTS = {
-    'name': '[氏名]',
-    'phone': '[電話番号]',
-    'birthdate': '[生年月日]',
-    'date': '[日付]',
-    'email': '[メールアドレス]',
-    'address': '[住所]',
-    'company': '[企業情報]'
+# パターンが一致するために必ず含まれる文字・文字列（正規表現）
+# アンカーが見つからないテキストではパターン自体の走査を省略する
+PATTERN_ANCHORS = {
+    'name': '[ 　さ様君くち先はで申言]',  # 空白・敬称・「私は」・「です」「申します」「言います」
+    'phone': r'0\d',
+    'birthdate': '生',  # 生年月日・誕生日・生まれ・出生などの文脈語
+    'date': r'\d[年/-]',
+    'email': '@',
+    'address': '[都道府県市]',  # 都道府県名・市名の末尾
+    'company': '[株会法LCI㈱]'  # 株式会社・有限会社・社団法人・(株)・㈱・LLC・Co./Corp.・Inc.
 }
 
-# 全パターンをまとめた大きな正規表現（順番が重要）
+# コンパイル済みの正規表現パターン
+PATTERNS = {category: re.compile(source) for category, source in PATTERN_SOURCES.items()}
+
+# 全パターンと置換文字列の組
 ALL_PATTERNS_DICT = {
-    'name': (NAME_PATTERN, '[氏名]'),
-    'phone': (PHONE_PATTERN, '[電話番号]'),
-    'date': (DATE_PATTERN, '[生年月日]'),
-    'email': (EMAIL_PATTERN, '[メールアドレス]'),
-    'address': (ADDRESS_PATTERN, '[住所]'),
-    'company': (COMPANY_PATTERN, '[企業情報]')
-}
\ No newline at end of file
+    category: (source, MASK_REPLACEMENTS[category]) for category, source in PATTERN_SOURCES.items()
+}
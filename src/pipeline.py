@@ -0,0 +1,497 @@
+"""
+読み込み・マスキング・書き出しのパイプライン処理モジュール
+
+1つのCSVファイルを、読み込みスレッド（チャンク単位の解析）・マスキング（呼び出し元の
+スレッド、またはワーカープロセスのプール）・書き出しスレッド（入力順に出力）の3段に
+分けて処理する。段の間は上限付きのキューでつなぎ、下流の段が詰まった場合は上流の段が
+待機する（バックプレッシャー）ため、メモリに保持するチャンク数は一定に収まる。
+
+ワーカープロセスで処理する場合は、各チャンクを文字数の予算でさらにタスクに分割し
+（長い行は単独のタスクにする）、書き出しの段でチャンクごとに結果をまとめる。
+ワーカープロセスが異常終了した場合はプールを作り直してタスクを一度だけ再投入し、
+それでも失敗したタスクの行はエラーポリシーの代替出力で埋めて隔離する。
+
+各段の処理行数・処理時間・待ち時間と入力キューの深さを記録し、どの段が律速に
+なっているかを処理の最後に報告する。
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .batch import (ALIGNMENT_COLUMN, discard_task_results, fallback_task, mask_records, _init_process_worker,
+                    _mask_task)
+from .compression import detect_compression, open_input, open_output, read_csv
+from .io_utils import atomic_output
+from .log_utils import worker_log_settings
+from .quarantine import ErrorBudgetExceeded
+from .scheduler import ROW_COST_CHARS, AdaptiveScheduler, format_scheduler_stats, text_lengths
+from .shm_transport import start_tracker, unpack_columns
+
+logger = logging.getLogger(__name__)
+
+# 1チャンクあたりの既定行数
+DEFAULT_CHUNK_ROWS = 10000
+
+# 段の間のキューに保持するチャンク数の既定値
+DEFAULT_QUEUE_CHUNKS = 4
+
+# メモリ使用量が上限に近づいている場合に、書き出し待ちのチャンクが減ったかを確認する間隔（秒）
+THROTTLE_INTERVAL = 0.05
+
+# 出力に追加するカラム
+OUTPUT_COLUMNS = ['masked_inquiry', 'masked_items', 'mask_count']
+
+# キューの終端を表す値
+_END = object()
+
+
+class PipelineAborted(Exception):
+    """他の段が失敗したためにパイプラインを停止したことを表す例外"""
+
+
+class StageStats:
+    """
+    パイプラインの1段分の統計
+    """
+
+    def __init__(self, name, has_input_queue=True, queue_name=None):
+        """
+        初期化
+
+        Args:
+            name (str): 段の名前
+            has_input_queue (bool): 入力キューがあるかどうか（読み込みの段にはない）
+            queue_name (str): メトリクスに記録する入力キューの名前
+        """
+        self.name = name
+        self.has_input_queue = has_input_queue
+        self.queue_name = queue_name
+        self.rows = 0
+        self.chunks = 0
+        self.busy = 0.0   # 自分の処理にかかった時間（秒）
+        self.wait = 0.0   # 入力の到着・出力先の空きを待った時間（秒）
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def record_depth(self, depth):
+        """
+        チャンクを受け取った時点の入力キューの深さを記録する
+
+        Args:
+            depth (int): キューに残っているチャンク数
+        """
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    def format(self):
+        """
+        統計を表示用の文字列に変換する
+
+        Returns:
+            str: フォーマットされた統計
+        """
+        rate = self.rows / self.busy if self.busy > 0 else 0.0
+        text = (f"{self.name}: {self.rows} 行 / {self.chunks} チャンク, 処理 {self.busy:.2f}秒 "
+                f"({rate:,.0f} 行/秒), 待機 {self.wait:.2f}秒")
+        if self.has_input_queue:
+            mean_depth = self.depth_total / self.chunks if self.chunks else 0.0
+            text += f", 入力キュー 平均 {mean_depth:.1f} / 最大 {self.depth_max}"
+        return text
+
+
+class CSVPipeline:
+    """
+    1つのCSVファイルを3段のパイプラインでマスキングするクラス
+    """
+
+    def __init__(self, input_file, output_file, inquiry_column, masker=None, workers=1,
+                 chunk_rows=DEFAULT_CHUNK_ROWS, queue_chunks=DEFAULT_QUEUE_CHUNKS,
+                 policy=None, quarantine=None, use_nlp=True, engine=None, pseudonymizer=None,
+                 transport='pickle', schedule='adaptive', memory=None, metrics=None, alignment=False):
+        """
+        初期化
+
+        Args:
+            input_file (str): 入力CSVファイルパス（.gz / .zst は展開しながら読み込む）
+            output_file (str): 出力CSVファイルパス（.gz / .zst は圧縮しながら書き込む）
+            inquiry_column (str): 問い合わせ文のカラム名
+            masker (PersonalInfoMasker): workers が1の場合に使うマスキング処理のインスタンス
+            workers (int): マスキングを行うワーカープロセス数（1の場合は呼び出し元のスレッドで処理）
+            chunk_rows (int): 1チャンクあたりの行数
+            queue_chunks (int): 段の間のキューに保持するチャンク数の上限
+            policy (ErrorPolicy): 行単位で失敗した場合のポリシー
+            quarantine (QuarantineWriter): 失敗した行の書き出し先
+            use_nlp (bool): ワーカープロセスでNLPを使用するかどうか
+            engine (PatternEngine): ワーカープロセスに渡すパターンエンジン
+            pseudonymizer (Pseudonymizer): ワーカープロセスに渡す仮名化のインスタンス
+            transport (str): ワーカープロセスからのマスキング結果の受け渡しの方式（'pickle' または 'shm'）
+            schedule (str): ワーカープロセスで処理する場合のタスクの分割方式（'adaptive' の場合は
+                チャンクを文字数の予算で分割し、'rows' の場合は1チャンクを1タスクにする）
+            memory (MemoryMonitor): 開始済みのメモリの監視（上限に近づいた場合は書き出し待ちのチャンク数を減らす）
+            metrics (MetricsRegistry): 処理行数・検出数・キューの深さなどを記録するメトリクス（省略可）
+            alignment (bool): 元のテキストとマスキング後のテキストの位置の対応を ALIGNMENT_COLUMN に出力するかどうか
+        """
+        if workers <= 1 and masker is None:
+            raise ValueError('ワーカー数が1の場合は masker を指定してください')
+        self.input_file = input_file
+        self.output_file = output_file
+        self.inquiry_column = inquiry_column
+        self.masker = masker
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.queue_chunks = queue_chunks
+        self.policy = policy
+        self.quarantine = quarantine
+        self.use_nlp = use_nlp
+        self.engine = engine
+        self.pseudonymizer = pseudonymizer
+        self.transport = transport
+        self.memory = memory
+        self.metrics = metrics
+        self.alignment = alignment
+        self.output_columns = [*OUTPUT_COLUMNS, ALIGNMENT_COLUMN] if alignment else OUTPUT_COLUMNS
+        self.scheduler = AdaptiveScheduler(workers) if workers > 1 and schedule == 'adaptive' else None
+
+        self.stages = [StageStats('読み込み', has_input_queue=False), StageStats('マスキング', queue_name='read'),
+                       StageStats('書き出し', queue_name='write')]
+        self.failures = 0
+        # 種類ごとの検出数
+        self.counts = Counter()
+        # アンカーによる走査の省略の統計（チャンクごとにマスカーの統計から集計する）
+        self.scan = {'rows': 0, 'skipped': Counter()}
+        self._stop = threading.Event()
+        # 読み込みの段が入力の終端まで読み終えたか（終盤のタスクの縮小に使う）
+        self._read_done = threading.Event()
+        self._errors = []
+        self._unwritten = []
+        # ワーカープロセスのプール（異常終了した場合はマスキングの段・書き出しの段のどちらからでも作り直す）
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _start_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_process_worker,
+                                   initargs=(self.use_nlp, self.engine, self.pseudonymizer,
+                                             self.memory.pressure_flag if self.memory is not None else None,
+                                             worker_log_settings()))
+
+    def _submit(self, payload):
+        # プールが異常終了していた場合は作り直してから投入する
+        with self._executor_lock:
+            try:
+                return self._executor.submit(_mask_task, payload, self.policy, self.transport, self.alignment)
+            except BrokenProcessPool as e:
+                logger.warning(f"ワーカープロセスが異常終了したため、プールを作り直します: {e}")
+                self._executor.shutdown(wait=True)
+                self._executor = self._start_executor()
+                return self._executor.submit(_mask_task, payload, self.policy, self.transport, self.alignment)
+
+    def _task_result(self, task_future, payload):
+        """
+        タスクの結果を受け取る
+
+        ワーカープロセスの異常終了で失敗した場合は一度だけ再投入する。それでも失敗した場合
+        （またはそれ以外の理由で失敗した場合）は、ポリシーがあればタスクの各行を代替出力で埋める。
+
+        Args:
+            task_future (Future): _mask_task のフューチャー
+            payload (list): タスクの内容（再投入・代替出力に使う）
+
+        Returns:
+            tuple: _mask_task の戻り値と同じ形式の結果
+
+        Raises:
+            Exception: ポリシーがない場合は、タスクの失敗の原因となった例外
+        """
+        retried = False
+        while True:
+            try:
+                return task_future.result()
+            except ErrorBudgetExceeded:
+                raise
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool) and not retried:
+                    task_future = self._submit(payload)
+                    retried = True
+                    continue
+                if self.policy is None:
+                    raise
+                # ワーカーを異常終了させた可能性のある行は再処理せず、代替出力で埋めて隔離する
+                logger.warning(f"タスクの処理に失敗したため、{len(payload[0][2])} 行を代替出力で補完します: {e}")
+                return fallback_task(payload, self.policy, e, self.engine, self.pseudonymizer, self.alignment)
+
+    def _put(self, target, item, stats):
+        # 他の段が失敗した場合は待機をやめる
+        started = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                stats.wait += time.perf_counter() - started
+                return
+            except queue.Full:
+                continue
+        raise PipelineAborted()
+
+    def _get(self, source, stats):
+        started = time.perf_counter()
+        depth = source.qsize()
+        while not self._stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            stats.wait += time.perf_counter() - started
+            if item is not _END:
+                stats.record_depth(depth)
+                if self.metrics is not None:
+                    self.metrics.set('queue_depth', source.qsize(), (stats.queue_name,))
+            return item
+        raise PipelineAborted()
+
+    def _record_stats(self, masker_stats):
+        # マスカーの統計をチャンク単位で集計し、メトリクスにまとめて反映する
+        self.scan['rows'] += masker_stats['rows']
+        self.scan['skipped'].update(masker_stats['skipped'])
+        if self.metrics is not None:
+            self.metrics.record_masker_stats(masker_stats)
+
+    def _fail(self, error):
+        if not isinstance(error, PipelineAborted):
+            self._errors.append(error)
+        self._stop.set()
+
+    def _read(self, read_queue):
+        """
+        読み込みの段: 入力をチャンク単位で解析してキューに渡す
+        """
+        import pandas as pd
+
+        stats = self.stages[0]
+        try:
+            with open_input(self.input_file) as source:
+                reader = pd.read_csv(source, chunksize=self.chunk_rows, dtype=str, keep_default_na=False)
+                start_row = 0
+                started = time.perf_counter()
+                for chunk in reader:
+                    stats.busy += time.perf_counter() - started
+                    stats.rows += len(chunk)
+                    stats.chunks += 1
+                    self._put(read_queue, (start_row, chunk), stats)
+                    start_row += len(chunk)
+                    started = time.perf_counter()
+            self._read_done.set()
+            self._put(read_queue, _END, stats)
+        except BaseException as e:
+            self._fail(e)
+
+    def _write(self, write_queue, tmp_path, columns, progress):
+        """
+        書き出しの段: マスキング結果を入力順に受け取り、出力に書き込む
+        """
+        import pandas as pd
+
+        stats = self.stages[2]
+        masking_stats = self.stages[1]
+        pooled = self.workers > 1
+        item = _END
+        try:
+            with open_output(tmp_path, detect_compression(self.output_file)) as out:
+                pd.DataFrame(columns=[*columns, *self.output_columns]).to_csv(out, index=False)
+                rows_done = 0
+                while True:
+                    item = self._get(write_queue, stats)
+                    if item is _END:
+                        break
+                    start_row, chunk, future = item
+
+                    if pooled:
+                        # チャンクを分割したタスクの結果を順に連結する
+                        results = [[] for _ in self.output_columns]
+                        for task_future, chars, payload in future:
+                            # マスキングの完了を待つ時間は待機時間として数える
+                            started = time.perf_counter()
+                            task_results, totals, scan, elapsed, new_pseudonyms = self._task_result(task_future,
+                                                                                                    payload)
+                            stats.wait += time.perf_counter() - started
+                            if self.scheduler is not None:
+                                self.scheduler.record(chars, elapsed)
+                            if new_pseudonyms:
+                                # ワーカーで作成した仮名を親プロセスのテーブルに集める
+                                self.pseudonymizer.merge(new_pseudonyms)
+                            _, _, masked, failures = task_results[0]
+                            for result, values in zip(results, unpack_columns(masked)):
+                                result.extend(values)
+                            masking_stats.busy += elapsed / self.workers
+                            self.counts.update(totals)
+                            self._record_stats(scan)
+                            self.failures += len(failures)
+                            if failures and self.metrics is not None:
+                                self.metrics.inc('row_errors_total', len(failures))
+                            if failures and self.quarantine is not None:
+                                self.quarantine.write(self.input_file, failures)
+                    else:
+                        # マスキングの完了を待つ時間は待機時間として数える
+                        started = time.perf_counter()
+                        results = future.result()
+                        stats.wait += time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    for name, values in zip(self.output_columns, results):
+                        chunk[name] = values
+                    chunk.to_csv(out, header=False, index=False)
+                    stats.busy += time.perf_counter() - started
+                    stats.rows += len(chunk)
+                    stats.chunks += 1
+                    rows_done += len(chunk)
+                    if self.metrics is not None:
+                        self.metrics.inc('rows_total', len(chunk))
+                    if progress is not None:
+                        progress.update(len(chunk))
+
+                    # ワーカープロセスで処理した場合は、エラーバジェットをここで累計して判定する
+                    if pooled and self.policy is not None:
+                        self.policy.check(self.failures, rows_done)
+        except BaseException as e:
+            if pooled and item is not _END:
+                # 途中まで受け取ったチャンクの残りのタスクは、停止後に解放する
+                self._unwritten.extend(task_future for task_future, _, _ in item[2])
+            self._fail(e)
+
+    def _mask(self, read_queue, write_queue):
+        """
+        マスキングの段: チャンクをマスキングし（またはワーカープロセスに渡し）、結果を書き出しの段に渡す
+        """
+        stats = self.stages[1]
+        pooled = self.workers > 1
+        failures = []
+        while True:
+            item = self._get(read_queue, stats)
+            if item is _END:
+                break
+            start_row, chunk = item
+            texts = chunk[self.inquiry_column].tolist()
+
+            # メモリ使用量が上限に近づいている場合は、書き出し待ちのチャンクが減るまで次のチャンクを処理しない
+            if self.memory is not None and self.memory.should_wait(write_queue.qsize(), self.queue_chunks):
+                started = time.perf_counter()
+                while (write_queue.qsize() >= self.memory.limit_in_flight(self.queue_chunks)
+                       and not self._stop.is_set()):
+                    time.sleep(THROTTLE_INTERVAL)
+                stats.wait += time.perf_counter() - started
+
+            if not pooled:
+                started = time.perf_counter()
+                num_failures = len(failures)
+                try:
+                    result = mask_records(self.masker, texts, self.counts, policy=self.policy, failures=failures,
+                                          row_offset=start_row, alignment=self.alignment)
+                finally:
+                    if self.quarantine is not None:
+                        self.quarantine.write(self.input_file, failures[num_failures:])
+                    self.failures = len(failures)
+                    if self.metrics is not None:
+                        self.metrics.inc('row_errors_total', len(failures) - num_failures)
+                    self._record_stats(self.masker.take_stats())
+                stats.busy += time.perf_counter() - started
+                future = Future()
+                future.set_result(result)
+            else:
+                if self.scheduler is not None:
+                    lengths = text_lengths(texts)
+                    remaining = None
+                    if self._read_done.is_set():
+                        # 入力を読み終えた後は、まだマスキングしていないチャンク（このチャンクを含む）も
+                        # このチャンクと同じ文字数とみなして残りの文字数を見積もる
+                        remaining_chunks = self.stages[0].chunks - stats.chunks
+                        remaining = (sum(lengths) + ROW_COST_CHARS * len(lengths)) * remaining_chunks
+                    ranges = self.scheduler.split(lengths, remaining)
+                else:
+                    ranges = [(0, len(texts), 0)]
+                future = []
+                for start, stop, chars in ranges:
+                    payload = [(0, start_row + start, texts[start:stop])]
+                    future.append((self._submit(payload), chars, payload))
+
+            stats.rows += len(texts)
+            stats.chunks += 1
+            try:
+                self._put(write_queue, (start_row, chunk, future), stats)
+            except PipelineAborted:
+                # 書き出しの段に渡せなかったワーカープロセスの結果は、停止後に解放する
+                if pooled:
+                    self._unwritten.extend(task_future for task_future, _, _ in future)
+                raise
+        self._put(write_queue, _END, stats)
+
+    def run(self, progress=None):
+        """
+        パイプラインを実行する
+
+        Args:
+            progress (tqdm): 書き出した行数で進捗を更新する進捗表示（省略可）
+
+        Returns:
+            int: 処理した行数
+
+        Raises:
+            ValueError: 問い合わせ文のカラムが存在しない場合
+            ErrorBudgetExceeded: 失敗した行数がポリシーの上限を超えた場合
+        """
+        columns = read_csv(self.input_file, nrows=0, dtype=str).columns.tolist()
+        if self.inquiry_column not in columns:
+            raise ValueError(f"指定されたカラム '{self.inquiry_column}' がCSVファイルに存在しません")
+
+        read_queue = queue.Queue(maxsize=self.queue_chunks)
+        write_queue = queue.Queue(maxsize=self.queue_chunks)
+        if self.workers > 1:
+            if self.transport == 'shm':
+                start_tracker()
+            self._executor = self._start_executor()
+
+        with atomic_output(self.output_file) as tmp_path:
+            reader = threading.Thread(target=self._read, args=(read_queue,), name='pipeline-reader', daemon=True)
+            writer = threading.Thread(target=self._write, args=(write_queue, tmp_path, columns, progress),
+                                      name='pipeline-writer', daemon=True)
+            reader.start()
+            writer.start()
+            try:
+                self._mask(read_queue, write_queue)
+            except BaseException as e:
+                self._fail(e)
+            finally:
+                reader.join()
+                writer.join()
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True, cancel_futures=True)
+                    # 中断した場合、書き出されなかった結果の共有メモリを解放する
+                    while not write_queue.empty():
+                        item = write_queue.get_nowait()
+                        if item is not _END:
+                            self._unwritten.extend(task_future for task_future, _, _ in item[2])
+                    for future in self._unwritten:
+                        discard_task_results(future)
+                if self.metrics is not None:
+                    for stage in self.stages[1:]:
+                        self.metrics.set('queue_depth', 0, (stage.queue_name,))
+            if self._errors:
+                raise self._errors[0]
+
+        return self.stages[2].rows
+
+    def format_stats(self):
+        """
+        各段の統計を表示用の文字列に変換する
+
+        Returns:
+            str: フォーマットされた統計（律速の段を含む）
+        """
+        lines = [stage.format() for stage in self.stages]
+        bottleneck = max(self.stages, key=lambda stage: stage.busy)
+        lines.append(f"律速: {bottleneck.name}")
+        if self.scheduler is not None:
+            lines.append(f"タスクの分割: {format_scheduler_stats(self.scheduler.stats())}")
+        return '\n'.join(lines)
+
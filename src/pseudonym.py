@@ -0,0 +1,297 @@
+"""
+鍵付きハッシュによる仮名化モジュール
+
+検出した個人情報を固定のプレースホルダーではなく、カテゴリと値から HMAC-SHA256 で
+求めた仮名（例: [氏名_7f3a9c01]）に置き換える。同じ鍵を使う限り、同じ値は常に同じ
+仮名になるため、問い合わせをまたいで同一の顧客を紐付けられる。
+
+計算済みの仮名は上限付きの LRU テーブルに保持し、繰り返し出現する値を再計算しない。
+仮名は鍵と値だけで決まるため、テーブルはワーカーへそのまま渡すことも、並列実行の
+後で結合することもできる。テーブルには元の値が含まれる（仮名から元の値を引ける）ため、
+ファイルは所有者のみが読み書きできる権限（0600）で保存する。保存したファイルは
+出力ファイル以上に厳重に取り扱うこと。
+
+氏名は敬称・自己紹介の定型表現・語尾（さん、様、私は、です、と申します など）を、
+電話番号は区切りのハイフンを除いてから仮名を作成し、同じ人物が表記の違いで別の仮名に
+ならないようにする。
+"""
+import hashlib
+import hmac
+import json
+import os
+import re
+from collections import OrderedDict
+
+from .config_utils import load_config, get_setting
+from .io_utils import atomic_output
+
+# 仮名の16進数の桁数の既定値
+DEFAULT_TOKEN_LENGTH = 8
+
+# テーブルに保持する仮名の件数の既定値
+DEFAULT_MAX_ENTRIES = 100000
+
+# 鍵を渡す環境変数
+KEY_ENV_VAR = 'MASKING_PSEUDONYM_KEY'
+
+# 仮名テーブルのファイルの権限（所有者のみ読み書き可）
+TABLE_FILE_MODE = 0o600
+
+# 氏名の前後から除く表現（自己紹介の定型表現・敬称・語尾）
+NAME_PREFIX_PATTERN = re.compile(r'^(?:私は|わたしは|僕は|ぼくは|俺は|おれは|わたくしは)')
+NAME_SUFFIX_PATTERN = re.compile(r'(?:さん|様|君|くん|ちゃん|先生|と申します|と言います|です)$')
+NAME_SPACE_PATTERN = re.compile(r'[ 　]')
+
+
+def canonical_value(category, value):
+    """
+    仮名を作成する前に値を正規化する（同じ人物・番号が表記の違いで別の仮名にならないようにする）
+
+    Args:
+        category (str): カテゴリ名
+        value (str): 検出した値
+
+    Returns:
+        str: 正規化した値（除いた結果が空になる場合は元の値）
+    """
+    if category == 'name':
+        name, count = NAME_PREFIX_PATTERN.subn('', value)
+        if count:
+            # 「私は山田と」のように引用の「と」まで検出した場合
+            name = name.removesuffix('と')
+        previous = None
+        while name != previous:
+            previous = name
+            name = NAME_SUFFIX_PATTERN.sub('', name)
+        name = NAME_SPACE_PATTERN.sub('', name)
+        return name or value
+    if category == 'phone':
+        return value.replace('-', '') or value
+    return value
+
+
+def format_token(placeholder, digest):
+    """
+    プレースホルダーにハッシュ値を付けた仮名を作成する
+
+    Args:
+        placeholder (str): プレースホルダー（例: '[氏名]'）
+        digest (str): ハッシュ値（16進文字列）
+
+    Returns:
+        str: 仮名（例: '[氏名_7f3a9c01]'）
+    """
+    if placeholder.endswith(']'):
+        return f"{placeholder[:-1]}_{digest}]"
+    return f"{placeholder}_{digest}"
+
+
+def placeholder_pattern(placeholder):
+    """
+    プレースホルダーとその仮名のいずれにも一致する正規表現を作成する
+
+    Args:
+        placeholder (str): プレースホルダー
+
+    Returns:
+        str: 正規表現
+    """
+    if placeholder.endswith(']'):
+        return f"{re.escape(placeholder[:-1])}(?:_[0-9a-f]+)?{re.escape(']')}"
+    return f"{re.escape(placeholder)}(?:_[0-9a-f]+)?"
+
+
+class Pseudonymizer:
+    """
+    カテゴリと値から決定的な仮名を作成するクラス
+    """
+
+    def __init__(self, key, length=DEFAULT_TOKEN_LENGTH, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        初期化
+
+        Args:
+            key (bytes): HMAC の鍵（str の場合は UTF-8 でエンコードする）
+            length (int): 仮名に使う16進数の桁数（短いほど別の値と衝突しやすい）
+            max_entries (int): テーブルに保持する仮名の件数の上限
+        """
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        if not key:
+            raise ValueError('仮名化には空でない鍵が必要です')
+        if not 1 <= length <= 64:
+            raise ValueError(f"仮名の桁数は1〜64で指定してください: {length}")
+        self.key = key
+        self.length = length
+        self.max_entries = max_entries
+        self._table = OrderedDict()
+        self._new_entries = None
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['hits'] = state['misses'] = 0
+        if state['_new_entries'] is not None:
+            state['_new_entries'] = []
+        return state
+
+    def record_new(self):
+        """
+        以降に新しく作成した仮名を記録する（ワーカープロセスのテーブルを親プロセスに集めるため）
+
+        ワーカープロセスに渡す前に呼ぶと、各ワーカーのコピーも記録する。
+        """
+        self._new_entries = []
+
+    def take_new(self):
+        """
+        前回の呼び出し以降に新しく作成した仮名を取り出す
+
+        Returns:
+            list: export() と同じ形式のエントリ（record_new を呼んでいない場合は None）
+        """
+        entries = self._new_entries
+        if entries is not None:
+            self._new_entries = []
+        return entries
+
+    def token(self, category, placeholder, value):
+        """
+        値の仮名を返す
+
+        Args:
+            category (str): カテゴリ名（同じ値でもカテゴリが異なれば別の仮名になる）
+            placeholder (str): カテゴリのプレースホルダー
+            value (str): 元の値（canonical_value で正規化してから仮名を作成する）
+
+        Returns:
+            str: 仮名
+        """
+        value = canonical_value(category, value)
+        cache_key = (category, value)
+        table = self._table
+        digest = table.get(cache_key)
+        if digest is not None:
+            self.hits += 1
+            table.move_to_end(cache_key)
+            return format_token(placeholder, digest)
+
+        self.misses += 1
+        digest = hmac.new(self.key, f"{category}\x1f{value}".encode('utf-8', 'surrogatepass'),
+                          hashlib.sha256).hexdigest()[:self.length]
+        table[cache_key] = digest
+        if self._new_entries is not None:
+            self._new_entries.append([category, value, digest])
+        if len(table) > self.max_entries:
+            table.popitem(last=False)
+        return format_token(placeholder, digest)
+
+    def __len__(self):
+        return len(self._table)
+
+    def export(self):
+        """
+        テーブルの内容を返す
+
+        Returns:
+            list: [カテゴリ, 値, ハッシュ値] のリスト（古いものから順）
+        """
+        return [[category, value, digest] for (category, value), digest in self._table.items()]
+
+    def merge(self, entries):
+        """
+        他のワーカー・実行で作成したテーブルの内容を取り込む
+
+        Args:
+            entries (iterable): export() が返す形式のエントリ、または Pseudonymizer
+
+        Raises:
+            ValueError: 取り込む仮名が、この鍵・桁数で作成したものと一致しない場合
+        """
+        if isinstance(entries, Pseudonymizer):
+            if entries.key != self.key or entries.length != self.length:
+                raise ValueError('鍵または桁数が異なる仮名テーブルは結合できません')
+            entries = entries.export()
+
+        for category, value, digest in entries:
+            if len(digest) != self.length:
+                raise ValueError('桁数が異なる仮名テーブルは結合できません')
+            self._table[(category, value)] = digest
+            self._table.move_to_end((category, value))
+            if len(self._table) > self.max_entries:
+                self._table.popitem(last=False)
+
+    def save(self, path):
+        """
+        テーブルをJSONファイルにアトミックに保存する
+
+        鍵そのものは保存せず、鍵の確認用のハッシュ値のみを記録する。テーブルには元の値が
+        含まれるため、既存のファイルの権限や umask によらず所有者のみが読み書きできる権限で保存する。
+
+        Args:
+            path (str): 保存先のパス
+        """
+        data = {'key_id': self.key_id(), 'length': self.length, 'entries': self.export()}
+        with atomic_output(path, mode=TABLE_FILE_MODE) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+
+    def load(self, path):
+        """
+        保存したテーブルを読み込んで取り込む
+
+        Args:
+            path (str): 保存したファイルのパス
+
+        Raises:
+            ValueError: 別の鍵・桁数で作成したテーブルの場合
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('key_id') != self.key_id() or data.get('length') != self.length:
+            raise ValueError(f"'{path}' は別の鍵または桁数で作成された仮名テーブルです")
+        self.merge(data.get('entries', []))
+
+    def key_id(self):
+        """
+        鍵を識別するためのハッシュ値を返す（鍵そのものは復元できない）
+
+        Returns:
+            str: 鍵の識別子
+        """
+        return hashlib.sha256(b'pseudonym-key-id\x1f' + self.key).hexdigest()[:16]
+
+
+def build_pseudonymizer(config=None, key=None):
+    """
+    設定から仮名化のインスタンスを作成する
+
+    鍵は引数、環境変数 MASKING_PSEUDONYM_KEY、config.ini の [pseudonym] key_file の順に探す。
+
+    Args:
+        config (configparser.ConfigParser): 設定オブジェクト（省略時は config.ini を読み込む）
+        key (str): 鍵（省略時は環境変数・鍵ファイルから読み込む）
+
+    Returns:
+        Pseudonymizer: 作成したインスタンス
+
+    Raises:
+        ValueError: 鍵が見つからない場合
+    """
+    if config is None:
+        config = load_config()
+
+    if key is None:
+        key = os.environ.get(KEY_ENV_VAR)
+    if not key:
+        key_file = get_setting(config, 'pseudonym', 'key_file', '')
+        if key_file:
+            with open(key_file, 'rb') as f:
+                key = f.read().strip()
+    if not key:
+        raise ValueError(f"仮名化の鍵がありません。環境変数 {KEY_ENV_VAR} または [pseudonym] key_file を設定してください")
+
+    length = int(get_setting(config, 'pseudonym', 'length', str(DEFAULT_TOKEN_LENGTH)))
+    max_entries = int(get_setting(config, 'pseudonym', 'max_entries', str(DEFAULT_MAX_ENTRIES)))
+    return Pseudonymizer(key, length=length, max_entries=max_entries)
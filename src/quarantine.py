@@ -0,0 +1,166 @@
+"""
+行単位の障害分離（隔離ファイル・代替出力・エラーバジェット）を行うモジュール
+"""
+import csv
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 代替出力の種類
+FALLBACK_REGEX = 'regex'
+FALLBACK_REDACT = 'redact'
+FALLBACK_MODES = (FALLBACK_REGEX, FALLBACK_REDACT)
+
+# 全文を伏せる場合のプレースホルダー
+REDACTED_PLACEHOLDER = '[全文がマスキング対象]'
+
+# エラー率の判定を始める最小行数（少数の行で率が跳ね上がるのを防ぐ）
+MIN_ROWS_FOR_RATE = 1000
+
+# 隔離ファイルのカラム
+QUARANTINE_COLUMNS = ['source', 'row', 'reason', 'text']
+
+
+class ErrorBudgetExceeded(Exception):
+    """
+    失敗した行数がエラーバジェットを超えた場合に送出される例外
+    """
+
+
+class ErrorPolicy:
+    """
+    行単位で失敗した場合の扱いを定めるポリシー
+
+    ワーカープロセスに渡せるよう、設定値のみを保持する。
+    """
+
+    def __init__(self, fallback=FALLBACK_REGEX, max_errors=None, max_error_rate=None):
+        """
+        初期化
+
+        Args:
+            fallback (str): 失敗した行の代替出力 ('regex': 正規表現のみで再処理, 'redact': 全文を伏せる)
+            max_errors (int): 許容する失敗行数の上限（None の場合は無制限）
+            max_error_rate (float): 許容する失敗率の上限（None の場合は無制限）
+        """
+        if fallback not in FALLBACK_MODES:
+            raise ValueError(f"不明な代替出力です: {fallback}")
+        self.fallback = fallback
+        self.max_errors = max_errors
+        self.max_error_rate = max_error_rate
+        self._regex_masker = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_regex_masker'] = None
+        return state
+
+    def check(self, num_errors, num_rows=None):
+        """
+        失敗行数がエラーバジェット内に収まっているか確認する
+
+        Args:
+            num_errors (int): これまでに失敗した行数
+            num_rows (int): これまでに処理した行数（指定時のみ失敗率を判定する）
+
+        Raises:
+            ErrorBudgetExceeded: バジェットを超えた場合
+        """
+        if self.max_errors is not None and num_errors > self.max_errors:
+            raise ErrorBudgetExceeded(f"失敗した行数 {num_errors} が上限 {self.max_errors} を超えました")
+
+        if (self.max_error_rate is not None and num_rows is not None
+                and num_rows >= MIN_ROWS_FOR_RATE and num_errors / num_rows > self.max_error_rate):
+            raise ErrorBudgetExceeded(
+                f"失敗率 {num_errors / num_rows:.4f} が上限 {self.max_error_rate} を超えました"
+                f" ({num_errors}/{num_rows} 行)"
+            )
+
+    def fallback_result(self, text, engine=None, pseudonymizer=None):
+        """
+        失敗した行の代替出力を作成する
+
+        'regex' の場合はNLPを使わずに再処理し、それも失敗した場合は全文を伏せる。
+
+        Args:
+            text (str): 入力テキスト
+            engine (PatternEngine): 再処理に使うパターンエンジン（省略時は既定のエンジン）
+            pseudonymizer (Pseudonymizer): 再処理で仮名化する場合のインスタンス
+
+        Returns:
+            tuple: (マスキングしたテキスト, マスキングした情報のリスト)
+        """
+        if self.fallback == FALLBACK_REGEX:
+            try:
+                if (self._regex_masker is None or (engine is not None and self._regex_masker.engine != engine)
+                        or self._regex_masker.pseudonymizer is not pseudonymizer):
+                    from .masking import PersonalInfoMasker
+                    self._regex_masker = PersonalInfoMasker(use_nlp=False, engine=engine, pseudonymizer=pseudonymizer)
+                return self._regex_masker.mask_personal_info(text)
+            except Exception as e:
+                logger.warning(f"正規表現のみでの再処理にも失敗したため、全文を伏せます: {e}")
+
+        return REDACTED_PLACEHOLDER, []
+
+
+def describe_error(error):
+    """
+    隔離ファイルに記録する失敗理由を作成する
+
+    Args:
+        error (Exception): 発生した例外
+
+    Returns:
+        str: 失敗理由
+    """
+    return f"{type(error).__name__}: {error}"
+
+
+class QuarantineWriter:
+    """
+    失敗した行を隔離ファイル（CSV）に書き出すクラス
+
+    隔離ファイルは最初の失敗が発生した時点で作成する。
+    元のテキストを含むため、出力ファイルと同様に取り扱いに注意すること。
+    """
+
+    def __init__(self, path):
+        """
+        初期化
+
+        Args:
+            path (str): 隔離ファイルのパス
+        """
+        self.path = Path(path)
+        self.count = 0
+
+    def write(self, source, failures):
+        """
+        失敗した行を追記する
+
+        Args:
+            source (str): 入力ファイル名
+            failures (list): (行番号, 失敗理由, テキスト) のリスト
+        """
+        if not failures:
+            return
+
+        new_file = not self.path.exists()
+        if new_file and str(self.path.parent):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(QUARANTINE_COLUMNS)
+            for row, reason, text in failures:
+                writer.writerow([source, row, reason, text])
+        self.count += len(failures)
+
+    def remove_stale(self):
+        """
+        前回実行時の隔離ファイルが残っていれば削除する
+        """
+        if self.path.exists():
+            os.remove(self.path)
@@ -0,0 +1,193 @@
+"""
+パターン・プレースホルダーのレジストリ
+
+config.ini と追加のパターン定義ファイルから、カテゴリごとのパターン・置換文字列・
+優先度を組み立て、一度だけコンパイルした不変のエンジンとして提供する。
+エンジンはカテゴリ定義（文字列）だけを pickle するため、ワーカープロセスへ
+安価に送ることができる。
+"""
+import configparser
+import re
+from types import MappingProxyType
+from typing import NamedTuple
+
+from .config_utils import load_config, get_setting, get_list_setting
+from .patterns import PATTERN_SOURCES, MASK_REPLACEMENTS, PATTERN_PRIORITIES, PATTERN_ANCHORS, DEFAULT_PRIORITY
+
+
+class PatternSpec(NamedTuple):
+    """
+    1カテゴリ分のパターン定義
+    """
+    category: str
+    pattern: str
+    placeholder: str
+    priority: int = DEFAULT_PRIORITY
+    anchor: str = ''  # パターンの一致に必須の文字を表す正規表現（空の場合は常に走査する）
+
+
+class PatternEngine:
+    """
+    コンパイル済みのパターンと置換文字列をまとめた不変のエンジン
+
+    無効にしたカテゴリはエンジンに含まれないため、正規表現の走査自体が行われない。
+    """
+
+    __slots__ = ('specs', 'categories', 'patterns', 'replacements', 'priorities', 'anchors')
+
+    def __init__(self, specs):
+        """
+        初期化
+
+        Args:
+            specs (iterable): PatternSpec のリスト（この順番で走査する）
+        """
+        specs = tuple(PatternSpec(*spec) for spec in specs)
+        set_attr = object.__setattr__
+        set_attr(self, 'specs', specs)
+        set_attr(self, 'categories', tuple(spec.category for spec in specs))
+        # パターンが空のカテゴリはNLP専用として置換文字列のみを登録する
+        set_attr(self, 'patterns', MappingProxyType(
+            {spec.category: re.compile(spec.pattern) for spec in specs if spec.pattern}
+        ))
+        set_attr(self, 'replacements', MappingProxyType(
+            {spec.category: spec.placeholder for spec in specs}
+        ))
+        set_attr(self, 'priorities', MappingProxyType(
+            {spec.category: spec.priority for spec in specs}
+        ))
+        set_attr(self, 'anchors', MappingProxyType(
+            {spec.category: re.compile(spec.anchor) for spec in specs if spec.pattern and spec.anchor}
+        ))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PatternEngine は変更できません')
+
+    def __reduce__(self):
+        return (PatternEngine, (self.specs,))
+
+    def __eq__(self, other):
+        return isinstance(other, PatternEngine) and self.specs == other.specs
+
+    def __hash__(self):
+        return hash(self.specs)
+
+    def __repr__(self):
+        return f"PatternEngine(categories={self.categories!r})"
+
+    def subset(self, categories):
+        """
+        指定したカテゴリのみを含むエンジンを作成する
+
+        Args:
+            categories (iterable): 残すカテゴリ名
+
+        Returns:
+            PatternEngine: 新しいエンジン
+        """
+        categories = set(categories)
+        unknown = categories - set(self.categories)
+        if unknown:
+            raise ValueError(f"不明なカテゴリです: {', '.join(sorted(unknown))}")
+        return PatternEngine(spec for spec in self.specs if spec.category in categories)
+
+
+def default_specs():
+    """
+    patterns.py に定義された組み込みのパターン定義を返す
+
+    Returns:
+        list: PatternSpec のリスト
+    """
+    return [
+        PatternSpec(category, source, MASK_REPLACEMENTS[category],
+                    PATTERN_PRIORITIES.get(category, DEFAULT_PRIORITY), PATTERN_ANCHORS.get(category, ''))
+        for category, source in PATTERN_SOURCES.items()
+    ]
+
+
+def load_pattern_file(path, specs):
+    """
+    追加のパターン定義ファイルを読み込み、定義を上書き・追加する
+
+    ファイルはINI形式で、セクション名をカテゴリ名とし、pattern / placeholder /
+    priority / anchor を指定する。既存カテゴリでは指定したキーのみを上書きする。
+    ただし pattern を上書きした場合、anchor を指定しなければ既存のアンカーは使わない。
+
+    Args:
+        path (str): パターン定義ファイルのパス
+        specs (dict): カテゴリ名から PatternSpec への辞書（更新される）
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    with open(path, encoding='utf-8') as f:
+        parser.read_file(f)
+
+    for category in parser.sections():
+        current = specs.get(category)
+        pattern = get_setting(parser, category, 'pattern', current.pattern if current else None)
+        placeholder = get_setting(parser, category, 'placeholder', current.placeholder if current else None)
+        if pattern is None or placeholder is None:
+            raise ValueError(f"'{path}' のカテゴリ '{category}' には pattern と placeholder が必要です")
+        priority = parser.getint(category, 'priority',
+                                 fallback=current.priority if current else DEFAULT_PRIORITY)
+        keep_anchor = current is not None and pattern == current.pattern
+        anchor = get_setting(parser, category, 'anchor', current.anchor if keep_anchor else '')
+        re.compile(pattern)  # 不正な正規表現は読み込み時に検出する
+        re.compile(anchor)
+        specs[category] = PatternSpec(category, pattern, placeholder, priority, anchor)
+
+
+def build_engine(config=None, pattern_files=None, enabled=None, disabled=None):
+    """
+    設定からパターンエンジンを組み立てる
+
+    Args:
+        config (configparser.ConfigParser): 設定オブジェクト（省略時は config.ini を読み込む）
+        pattern_files (list): 追加のパターン定義ファイル（省略時は設定の [patterns] pattern_files）
+        enabled (iterable): 有効にするカテゴリ（省略時は設定の [patterns] enabled、空ならすべて）
+        disabled (iterable): 無効にするカテゴリ（省略時は設定の [patterns] disabled）
+
+    Returns:
+        PatternEngine: 組み立てたエンジン
+    """
+    if config is None:
+        config = load_config()
+
+    specs = {}
+    for spec in default_specs():
+        placeholder = get_setting(config, 'masking', f"{spec.category}_placeholder", spec.placeholder)
+        specs[spec.category] = spec._replace(placeholder=placeholder)
+
+    if pattern_files is None:
+        pattern_files = get_list_setting(config, 'patterns', 'pattern_files')
+    for path in pattern_files:
+        load_pattern_file(path, specs)
+
+    if enabled is None:
+        enabled = get_list_setting(config, 'patterns', 'enabled')
+    if disabled is None:
+        disabled = get_list_setting(config, 'patterns', 'disabled')
+
+    enabled = set(enabled) if enabled else set(specs)
+    unknown = (enabled | set(disabled)) - set(specs)
+    if unknown:
+        raise ValueError(f"不明なカテゴリです: {', '.join(sorted(unknown))}")
+
+    return PatternEngine(spec for spec in specs.values()
+                         if spec.category in enabled and spec.category not in set(disabled))
+
+
+_default_engine = None
+
+
+def get_default_engine():
+    """
+    config.ini から組み立てた既定のエンジンを返す（プロセス内で一度だけ組み立てる）
+
+    Returns:
+        PatternEngine: 既定のエンジン
+    """
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = build_engine()
+    return _default_engine
@@ -0,0 +1,246 @@
+"""
+文字数に基づく適応的なタスク分割モジュール
+
+行の長さが1行の短文から長い書き起こしまで大きく異なるデータでは、行数で固定した
+タスクの処理時間がばらつき、最後に残った長いタスクの完了をほかのワーカーが待つことになる。
+
+このモジュールは、タスクの大きさを行数ではなく文字数の予算で決める。完了したタスクの
+文字数と処理時間から1ワーカーあたりの処理速度を推定し、1タスクが目標時間で終わるよう
+予算を調整する。一定以上の長さの行は単独のタスクとし、長いものから先に処理する。
+残りの文字数が少なくなった場合は、全ワーカーに行き渡るようタスクを小さくする。
+"""
+import threading
+
+# 1タスクの目標処理時間（秒）
+DEFAULT_TARGET_SECONDS = 0.5
+
+# 文字数予算の初期値・下限・上限
+DEFAULT_INITIAL_CHARS = 200000
+DEFAULT_MIN_CHARS = 20000
+DEFAULT_MAX_CHARS = 5000000
+
+# この文字数以上の行は単独のタスクにする
+DEFAULT_LONG_ROW_CHARS = 20000
+
+# 1行あたりの固定の処理コスト（文字数に換算した値）
+ROW_COST_CHARS = 50
+
+# 処理速度の推定値の平滑化係数（指数移動平均）
+SMOOTHING = 0.3
+
+
+def text_lengths(texts):
+    """
+    テキストのリストから各行の文字数を求める（文字列以外は0文字とする）
+
+    Args:
+        texts (iterable): テキストのリスト
+
+    Returns:
+        list: 各行の文字数
+    """
+    return [len(text) if isinstance(text, str) else 0 for text in texts]
+
+
+class AdaptiveScheduler:
+    """
+    文字数の予算でタスクを分割し、処理時間の計測結果から予算を調整するスケジューラー
+    """
+
+    def __init__(self, workers, target_seconds=DEFAULT_TARGET_SECONDS, initial_chars=DEFAULT_INITIAL_CHARS,
+                 min_chars=DEFAULT_MIN_CHARS, max_chars=DEFAULT_MAX_CHARS, long_row_chars=DEFAULT_LONG_ROW_CHARS):
+        """
+        初期化
+
+        Args:
+            workers (int): ワーカー数
+            target_seconds (float): 1タスクの目標処理時間（秒）
+            initial_chars (int): 文字数予算の初期値
+            min_chars (int): 文字数予算の下限
+            max_chars (int): 文字数予算の上限
+            long_row_chars (int): この文字数以上の行は単独のタスクにする
+        """
+        self.workers = max(1, workers)
+        self.target_seconds = target_seconds
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.long_row_chars = long_row_chars
+
+        self.budget = initial_chars
+        self.rate = None  # 1ワーカーあたりの処理速度の推定値（文字/秒）
+        self.initial_budget = initial_chars
+        self.min_budget = initial_chars
+        self.max_budget = initial_chars
+        self.adjustments = 0
+        self.tasks = 0
+        self.long_tasks = 0
+        self.tail_tasks = 0
+        self._lock = threading.Lock()
+
+    def record(self, chars, elapsed):
+        """
+        完了したタスクの文字数と処理時間を記録し、文字数予算を調整する
+
+        Args:
+            chars (int): タスクの文字数（行ごとの固定コストを含む）
+            elapsed (float): ワーカーでの処理時間（秒）
+        """
+        if chars <= 0 or elapsed <= 0:
+            return
+        with self._lock:
+            rate = chars / elapsed
+            self.rate = rate if self.rate is None else self.rate + SMOOTHING * (rate - self.rate)
+            budget = int(min(max(self.rate * self.target_seconds, self.min_chars), self.max_chars))
+            if budget != self.budget:
+                self.adjustments += 1
+                self.budget = budget
+                self.min_budget = min(self.min_budget, budget)
+                self.max_budget = max(self.max_budget, budget)
+
+    def _task_budget(self, remaining_chars):
+        # 予算は record と別のスレッドから参照するため、ロックを取って読む
+        with self._lock:
+            budget = self.budget
+            if remaining_chars is not None:
+                # 残りが少なくなったら、全ワーカーに行き渡るようタスクを小さくする
+                tail_budget = max(self.min_chars, remaining_chars // (self.workers * 2))
+                if tail_budget < budget:
+                    self.tail_tasks += 1
+                    budget = tail_budget
+        return budget
+
+    def _count(self, tasks, long_tasks=0):
+        with self._lock:
+            self.tasks += tasks
+            self.long_tasks += long_tasks
+
+    def split(self, lengths, remaining_chars=None):
+        """
+        連続した行の並びを、文字数予算ごとの範囲に分割する
+
+        長い行は単独の範囲にする。予算は呼び出した時点の値を使う。
+
+        Args:
+            lengths (list): 各行の文字数
+            remaining_chars (int): 未処理の文字数の合計（指定した場合は残りに応じてタスクを小さくする）
+
+        Returns:
+            list: (開始行, 終了行, 文字数) のリスト
+        """
+        ranges = []
+        start = 0
+        chars = 0
+        long_tasks = 0
+        budget = self._task_budget(remaining_chars)
+        for row, length in enumerate(lengths):
+            cost = length + ROW_COST_CHARS
+            if length >= self.long_row_chars:
+                if row > start:
+                    ranges.append((start, row, chars))
+                ranges.append((row, row + 1, cost))
+                long_tasks += 1
+                start = row + 1
+                chars = 0
+                continue
+            chars += cost
+            if chars >= budget:
+                ranges.append((start, row + 1, chars))
+                start = row + 1
+                chars = 0
+        if start < len(lengths):
+            ranges.append((start, len(lengths), chars))
+        self._count(len(ranges), long_tasks)
+        return ranges
+
+    def plan(self, file_lengths):
+        """
+        複数ファイルの行からタスクを順に作成する（タスクを取り出した時点の予算で大きさを決める）
+
+        長い行の単独タスクを長いものから先に返し、残りの行は文字数予算に達するまで
+        ファイルをまたいで1タスクにまとめる。
+
+        Args:
+            file_lengths (list): (ファイル番号, 各行の文字数のリスト) のリスト
+
+        Yields:
+            tuple: (タスク, 文字数)。タスクは (ファイル番号, 開始行, 終了行) のリスト
+        """
+        long_rows = []
+        remaining = 0
+        for file_index, lengths in file_lengths:
+            for row, length in enumerate(lengths):
+                if length >= self.long_row_chars:
+                    long_rows.append((length, file_index, row))
+                else:
+                    remaining += length + ROW_COST_CHARS
+
+        long_rows.sort(key=lambda item: (-item[0], item[1], item[2]))
+        for length, file_index, row in long_rows:
+            self._count(1, 1)
+            yield [(file_index, row, row + 1)], length + ROW_COST_CHARS
+
+        task = []
+        chars = 0
+        budget = self._task_budget(remaining)
+        for file_index, lengths in file_lengths:
+            start = None
+            for row, length in enumerate(lengths):
+                if length >= self.long_row_chars:
+                    if start is not None:
+                        task.append((file_index, start, row))
+                        start = None
+                    continue
+                if start is None:
+                    start = row
+                chars += length + ROW_COST_CHARS
+                if chars >= budget:
+                    task.append((file_index, start, row + 1))
+                    start = None
+                    self._count(1)
+                    yield task, chars
+                    remaining -= chars
+                    task = []
+                    chars = 0
+                    budget = self._task_budget(remaining)
+            if start is not None:
+                task.append((file_index, start, len(lengths)))
+        if task:
+            self._count(1)
+            yield task, chars
+
+    def stats(self):
+        """
+        スケジューラーの判断の記録を返す
+
+        Returns:
+            dict: タスク数・長い行の単独タスク数・終盤に縮小したタスク数・文字数予算の推移・推定処理速度
+        """
+        with self._lock:
+            return {
+                'tasks': self.tasks,
+                'long_tasks': self.long_tasks,
+                'tail_tasks': self.tail_tasks,
+                'initial_budget': self.initial_budget,
+                'final_budget': self.budget,
+                'min_budget': self.min_budget,
+                'max_budget': self.max_budget,
+                'adjustments': self.adjustments,
+                'chars_per_second': self.rate,
+            }
+
+
+def format_scheduler_stats(stats):
+    """
+    スケジューラーの判断の記録を表示用の文字列に変換する
+
+    Args:
+        stats (dict): AdaptiveScheduler.stats の戻り値
+
+    Returns:
+        str: フォーマットされた記録
+    """
+    rate = f"{stats['chars_per_second']:,.0f} 文字/秒" if stats['chars_per_second'] else '未計測'
+    return (f"タスク {stats['tasks']} (長い行の単独タスク {stats['long_tasks']}, 終盤に縮小 {stats['tail_tasks']}), "
+            f"文字数予算 {stats['initial_budget']:,} → {stats['final_budget']:,} "
+            f"(最小 {stats['min_budget']:,} / 最大 {stats['max_budget']:,}, 調整 {stats['adjustments']} 回), "
+            f"1ワーカーあたりの推定処理速度 {rate}")
@@ -0,0 +1,431 @@
+"""
+複数ノードでの分散処理のためのシャード分割・結合モジュール
+
+1つの大きな入力をN個のシャードに分割し、マニフェスト（shards.json）に各シャードの
+範囲とハッシュを記録する。各ノードは共有ディレクトリ上の自分のシャードだけを
+独立して処理して完了マーカーを書き込み、最後に merge で全シャードの完了と
+出力のハッシュを確認してから、順番どおりに連結する。
+
+ノード間で共有するのはディレクトリのみで、クラスタ基盤は必要ない。
+"""
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+from .checkpoint import hash_file
+from .compression import detect_compression, open_output
+from .io_utils import atomic_output
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = 'shards.json'
+
+# 入力形式
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+
+# ファイルを走査する際の読み込み単位（バイト）
+READ_BLOCK_SIZE = 1 << 20
+
+# Parquet を読み込む際の1バッチあたりの行数
+PARQUET_BATCH_ROWS = 65536
+
+
+def find_record_boundaries(path, targets):
+    """
+    CSVファイル内で、各目標オフセット以降で最初のレコード境界を求める
+
+    引用符で囲まれたフィールド内の改行はレコード境界とみなさない
+    （ファイル先頭からの '"' の数が偶数の位置にある改行のみを境界とする）。
+
+    Args:
+        path (str): CSVファイルパス
+        targets (list): 目標のバイトオフセット（昇順）
+
+    Returns:
+        list: 各目標に対応するレコード境界のバイトオフセット
+            （境界が見つからない場合はファイルサイズ）
+    """
+    targets = sorted(targets)
+    boundaries = []
+    position = 0
+    parity = 0  # ブロック先頭までの '"' の数の偶奇
+
+    with open(path, 'rb') as f:
+        while len(boundaries) < len(targets):
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+
+            index = 0
+            scanned = 0
+            scan_parity = parity
+            while len(boundaries) < len(targets):
+                # block[index] の改行の直後が境界になるため、目標の1バイト手前から探す
+                index = max(index, targets[len(boundaries)] - position - 1)
+                if index >= len(block):
+                    break
+                newline = block.find(b'\n', index)
+                if newline < 0:
+                    break
+                scan_parity = (scan_parity + block.count(b'"', scanned, newline)) % 2
+                scanned = newline
+                if scan_parity == 0:
+                    # 次の目標も同じ境界になり得るため、index は進めない
+                    boundaries.append(position + newline + 1)
+                    index = newline
+                else:
+                    index = newline + 1
+
+            parity = (parity + block.count(b'"')) % 2
+            position += len(block)
+
+    size = os.path.getsize(path)
+    return boundaries + [size] * (len(targets) - len(boundaries))
+
+
+def _copy_range(src, dst, start, end):
+    """
+    ファイルの指定範囲を書き込み先にコピーする
+
+    Args:
+        src (file): 読み込み元（バイナリモード）
+        dst (file): 書き込み先（バイナリモード）
+        start (int): 開始オフセット
+        end (int): 終了オフセット
+    """
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = src.read(min(READ_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        dst.write(block)
+        remaining -= len(block)
+
+
+def detect_format(input_file):
+    """
+    拡張子から入力形式を判定する
+
+    Args:
+        input_file (str): 入力ファイルパス
+
+    Returns:
+        str: 'csv' または 'parquet'
+    """
+    suffix = Path(input_file).suffix.lower()
+    return FORMAT_PARQUET if suffix in ('.parquet', '.pq') else FORMAT_CSV
+
+
+class ShardManifest:
+    """
+    シャードの範囲と処理状況を管理するマニフェスト
+
+    シャードの入力は 'shard-00000.csv'、出力は 'masked-00000.csv'、
+    完了マーカーは 'masked-00000.json' としてシャードディレクトリに置く。
+    各ノードは自分のシャードの完了マーカーのみを書き込むため、マニフェスト自体は
+    分割後に書き換えられない。
+    """
+
+    def __init__(self, shard_dir):
+        """
+        初期化
+
+        Args:
+            shard_dir (str): シャードディレクトリ（各ノードから共有されるディレクトリ）
+        """
+        self.shard_dir = Path(shard_dir)
+        self.manifest_path = self.shard_dir / MANIFEST_NAME
+        self.header = {}
+        self.shards = []
+
+    @property
+    def num_shards(self):
+        return len(self.shards)
+
+    def input_path(self, index):
+        """
+        シャードの入力ファイルパスを返す
+
+        Args:
+            index (int): シャード番号
+
+        Returns:
+            Path: 入力ファイルパス
+        """
+        return self.shard_dir / f"shard-{index:05d}.csv"
+
+    def output_path(self, index):
+        """
+        シャードの出力ファイルパスを返す
+
+        Args:
+            index (int): シャード番号
+
+        Returns:
+            Path: 出力ファイルパス
+        """
+        return self.shard_dir / f"masked-{index:05d}.csv"
+
+    def marker_path(self, index):
+        """
+        シャードの完了マーカーのパスを返す
+
+        Args:
+            index (int): シャード番号
+
+        Returns:
+            Path: 完了マーカーのパス
+        """
+        return self.shard_dir / f"masked-{index:05d}.json"
+
+    def split(self, input_file, num_shards):
+        """
+        入力をシャードに分割し、マニフェストを書き込む
+
+        CSVはヘッダーを除いたデータ部分をバイト数でほぼ均等に分け、境界をレコードの
+        区切りにそろえる。Parquet は行数で均等に分け、各シャードをCSVとして書き出す。
+        いずれの場合も各シャードの先頭にはヘッダー行を付ける。
+
+        Args:
+            input_file (str): 入力ファイルパス
+            num_shards (int): シャード数
+
+        Returns:
+            list: シャードごとの情報（辞書）のリスト
+        """
+        if num_shards < 1:
+            raise ValueError(f"シャード数は1以上を指定してください: {num_shards}")
+        if detect_compression(input_file):
+            # 圧縮された入力はバイト位置で分割できない
+            raise ValueError(f"圧縮された入力はシャードに分割できません。展開してから分割してください: {input_file}")
+
+        # 以前の分割結果・処理結果が混ざらないよう、シャードディレクトリを作り直す
+        if self.shard_dir.exists():
+            shutil.rmtree(self.shard_dir)
+        self.shard_dir.mkdir(parents=True)
+
+        input_format = detect_format(input_file)
+        if input_format == FORMAT_PARQUET:
+            shards = self._split_parquet(input_file, num_shards)
+        else:
+            shards = self._split_csv(input_file, num_shards)
+
+        self.header = {
+            'version': MANIFEST_VERSION,
+            'input_file': os.path.abspath(input_file),
+            'input_size': os.path.getsize(input_file),
+            'format': input_format,
+            'num_shards': num_shards,
+        }
+        self.shards = shards
+        self.save()
+        logger.info(f"'{input_file}' を {num_shards} 個のシャードに分割しました: {self.shard_dir}")
+        return shards
+
+    def _split_csv(self, input_file, num_shards):
+        """
+        CSVをバイト範囲でシャードに分割する
+
+        Args:
+            input_file (str): 入力ファイルパス
+            num_shards (int): シャード数
+
+        Returns:
+            list: シャードごとの情報のリスト
+        """
+        size = os.path.getsize(input_file)
+        header_end = find_record_boundaries(input_file, [1])[0] if size else 0
+        data_size = size - header_end
+        targets = [header_end + data_size * k // num_shards for k in range(1, num_shards)]
+        edges = [header_end] + find_record_boundaries(input_file, targets) + [size]
+
+        shards = []
+        with open(input_file, 'rb') as src:
+            header = src.read(header_end)
+            for index in range(num_shards):
+                start, end = edges[index], max(edges[index], edges[index + 1])
+                with atomic_output(self.input_path(index)) as tmp_path:
+                    with open(tmp_path, 'wb') as dst:
+                        dst.write(header)
+                        _copy_range(src, dst, start, end)
+                shards.append({
+                    'index': index,
+                    'byte_start': start,
+                    'byte_end': end,
+                    'sha256': hash_file(self.input_path(index)),
+                })
+        return shards
+
+    def _split_parquet(self, input_file, num_shards):
+        """
+        Parquet を行範囲でシャードに分割し、各シャードをCSVとして書き出す
+
+        Args:
+            input_file (str): 入力ファイルパス
+            num_shards (int): シャード数
+
+        Returns:
+            list: シャードごとの情報のリスト
+        """
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet の入力には pyarrow が必要です（pip install pyarrow）") from e
+
+        parquet_file = pq.ParquetFile(input_file)
+        num_rows = parquet_file.metadata.num_rows
+        edges = [num_rows * k // num_shards for k in range(num_shards + 1)]
+
+        columns = parquet_file.schema_arrow.names
+        shards = []
+        batches = parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS)
+        pending = None  # 前のシャードに収まらなかったバッチの残り
+        for index in range(num_shards):
+            start, end = edges[index], edges[index + 1]
+            with atomic_output(self.input_path(index)) as tmp_path:
+                written = 0
+                header = True
+                while written < end - start:
+                    if pending is None:
+                        pending = next(batches).to_pandas()
+                    take = min(len(pending), end - start - written)
+                    pending.iloc[:take].to_csv(tmp_path, mode='w' if header else 'a', index=False, header=header)
+                    header = False
+                    written += take
+                    pending = pending.iloc[take:] if take < len(pending) else None
+                if header:
+                    # 行のないシャードもヘッダーのみのCSVとして書き出す
+                    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                        f.write(','.join(columns) + '\n')
+            shards.append({
+                'index': index,
+                'row_start': start,
+                'row_end': end,
+                'sha256': hash_file(self.input_path(index)),
+            })
+        return shards
+
+    def save(self):
+        """
+        マニフェストをアトミックに保存する
+        """
+        with atomic_output(self.manifest_path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'header': self.header, 'shards': self.shards}, f, ensure_ascii=False, indent=2)
+
+    def load(self):
+        """
+        マニフェストを読み込む
+
+        Returns:
+            ShardManifest: 自身
+
+        Raises:
+            FileNotFoundError: マニフェストが存在しない場合
+        """
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('header', {}).get('version') != MANIFEST_VERSION:
+            raise ValueError(f"対応していないマニフェストです: {self.manifest_path}")
+        self.header = manifest['header']
+        self.shards = manifest['shards']
+        return self
+
+    def verify_input(self, index):
+        """
+        シャードの入力ファイルがマニフェストの記録と一致するか確認する
+
+        Args:
+            index (int): シャード番号
+
+        Raises:
+            ValueError: シャード番号が範囲外、または入力ファイルのハッシュが一致しない場合
+        """
+        if not 0 <= index < self.num_shards:
+            raise ValueError(f"シャード番号は 0〜{self.num_shards - 1} で指定してください: {index}")
+        if hash_file(self.input_path(index)) != self.shards[index]['sha256']:
+            raise ValueError(f"シャード {index} の入力ファイルがマニフェストと一致しません")
+
+    def mark_done(self, index):
+        """
+        シャードの完了マーカーを書き込む
+
+        Args:
+            index (int): シャード番号
+        """
+        marker = {
+            'index': index,
+            'input_sha256': self.shards[index]['sha256'],
+            'output_sha256': hash_file(self.output_path(index)),
+            'output_size': os.path.getsize(self.output_path(index)),
+        }
+        with atomic_output(self.marker_path(index)) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(marker, f, ensure_ascii=False, indent=2)
+
+    def status(self):
+        """
+        各シャードの処理状況を確認する
+
+        Returns:
+            tuple: (完了したシャード番号のリスト, 未完了または不正なシャード番号と理由の辞書)
+        """
+        done = []
+        problems = {}
+        for shard in self.shards:
+            index = shard['index']
+            marker_path = self.marker_path(index)
+            if not marker_path.exists():
+                problems[index] = '未処理'
+                continue
+            with open(marker_path, encoding='utf-8') as f:
+                marker = json.load(f)
+            output_path = self.output_path(index)
+            if marker.get('input_sha256') != shard['sha256']:
+                problems[index] = '入力が処理時と異なります'
+            elif not output_path.exists() or hash_file(output_path) != marker.get('output_sha256'):
+                problems[index] = '出力ファイルが完了マーカーと一致しません'
+            else:
+                done.append(index)
+        return done, problems
+
+    def merge(self, output_file):
+        """
+        全シャードの完了を確認し、出力を順番どおりに連結する
+
+        先頭シャードの出力はヘッダーを含めてそのまま、以降のシャードはヘッダー行を
+        除いて連結する。
+
+        Args:
+            output_file (str): 出力ファイルパス
+
+        Raises:
+            RuntimeError: 未完了・不正なシャードがある場合、またはシャード間でヘッダーが異なる場合
+        """
+        _, problems = self.status()
+        if problems:
+            details = ', '.join(f"{index}: {reason}" for index, reason in sorted(problems.items())[:10])
+            raise RuntimeError(f"完了していないシャードがあります ({len(problems)}/{self.num_shards}) - {details}")
+
+        header = None
+        with atomic_output(output_file) as tmp_path:
+            with open_output(tmp_path, detect_compression(output_file)) as out:
+                for index in range(self.num_shards):
+                    output_path = self.output_path(index)
+                    header_end = find_record_boundaries(output_path, [1])[0]
+                    with open(output_path, 'rb') as part:
+                        shard_header = part.read(header_end)
+                        if header is None:
+                            header = shard_header
+                            out.write(header)
+                        elif shard_header != header:
+                            raise RuntimeError(f"シャード {index} の出力のヘッダーが他のシャードと異なります")
+                        for block in iter(lambda: part.read(READ_BLOCK_SIZE), b''):
+                            out.write(block)
+
+        logger.info(f"{self.num_shards} 個のシャードの出力を '{output_file}' に連結しました")
@@ -0,0 +1,129 @@
+"""
+共有メモリによるマスキング結果の受け渡しモジュール
+
+ワーカープロセスのマスキング結果（マスキング後テキスト・マスキング項目・カウント）は、
+通常は pickle されてパイプ経由で親プロセスに送られ、送信側での直列化・パイプへの
+書き込み・受信側での読み込み・復元と、チャンクの大きさに比例したコピーが何度も発生する。
+
+このモジュールでは、各カラムの文字列を区切り文字（NUL）で連結した UTF-8 のバイト列を
+1つの共有メモリブロックに書き込み、パイプにはブロック名とレイアウトだけを送る。
+親プロセスは共有メモリを直接デコードして区切り文字で分割し、ブロックを解放する。
+行ごとの処理を Python で行わないため、pickle の復元より速い。
+
+値に区切り文字が含まれるカラムがある場合は、そのチャンクのみ pickle で受け渡す。
+"""
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple
+
+# 受け渡しの方式
+TRANSPORTS = ('pickle', 'shm')
+
+# カラム内の値の区切り文字
+SEPARATOR = '\x00'
+
+
+class SharedColumns(NamedTuple):
+    """
+    共有メモリに書き込んだ文字列カラムの参照（pickle してもブロック名とレイアウトのみ）
+    """
+    name: str       # 共有メモリブロックの名前
+    rows: int       # 行数
+    layout: tuple   # カラムごとの (開始位置, バイト数)
+
+
+def start_tracker():
+    """
+    共有メモリの管理プロセスを起動する（ワーカープロセスを起動する前に呼ぶ）
+
+    ワーカープロセスが作成したブロックを親プロセスで解放するため、親プロセスと
+    ワーカープロセスで同じ管理プロセスを共有させる。共有しない場合、ワーカープロセスの
+    終了時に解放済みのブロックが未解放として報告される。
+    """
+    resource_tracker.ensure_running()
+
+
+def pack_columns(columns, transport='shm'):
+    """
+    ワーカープロセスから返す文字列カラムを、受け渡しの方式に合わせて変換する
+
+    共有メモリに書き込んだ場合、このプロセスではブロックを閉じるだけで解放せず、
+    受け取った側が unpack_columns で解放する。
+
+    Args:
+        columns (sequence): 同じ行数の文字列のリストのシーケンス
+        transport (str): 受け渡しの方式（'pickle' の場合はそのまま返す）
+
+    Returns:
+        SharedColumns or sequence: 共有メモリの参照（区切り文字を含む値がある場合は columns のまま）
+    """
+    if transport != 'shm' or not columns:
+        return columns
+    rows = len(columns[0])
+    if rows == 0:
+        return columns
+
+    encoded = []
+    for values in columns:
+        joined = SEPARATOR.join(values)
+        if joined.count(SEPARATOR) != rows - 1:
+            return columns
+        encoded.append(joined.encode('utf-8'))
+
+    layout = []
+    position = 0
+    for data in encoded:
+        layout.append((position, len(data)))
+        position += len(data)
+
+    block = shared_memory.SharedMemory(create=True, size=max(position, 1))
+    try:
+        for (start, size), data in zip(layout, encoded):
+            block.buf[start:start + size] = data
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    return SharedColumns(block.name, rows, tuple(layout))
+
+
+def unpack_columns(payload):
+    """
+    pack_columns で変換した文字列カラムを元に戻す（共有メモリの場合はブロックを解放する）
+
+    Args:
+        payload (SharedColumns or sequence): pack_columns の戻り値
+
+    Returns:
+        list: 文字列のリストのリスト
+    """
+    if not isinstance(payload, SharedColumns):
+        return payload
+
+    block = shared_memory.SharedMemory(name=payload.name)
+    try:
+        columns = []
+        for start, size in payload.layout:
+            with block.buf[start:start + size] as view:
+                columns.append(str(view, 'utf-8').split(SEPARATOR))
+    finally:
+        block.close()
+        block.unlink()
+    return columns
+
+
+def discard_columns(payload):
+    """
+    受け取らなかった共有メモリブロックを解放する（処理を中断した場合など）
+
+    Args:
+        payload (SharedColumns or sequence): pack_columns の戻り値
+    """
+    if not isinstance(payload, SharedColumns):
+        return
+    try:
+        block = shared_memory.SharedMemory(name=payload.name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
@@ -0,0 +1,115 @@
+"""
+元のテキストとマスキング後のテキストの位置の対応のテスト
+"""
+import json
+import random
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+from src.alignment import AlignedSpan, Alignment, substitute
+from src.batch import ALIGNMENT_COLUMN, process_files
+from src.masking import DOUBLE_BRACKET_PATTERN, PersonalInfoMasker
+from src.pipeline import CSVPipeline
+
+# ランダムなテキストの部品（後処理の各規則が働くものを含む）
+PARTS = ['山田太郎', 'です', 'ます', '。', ' ', '  ', '\n', '[[', ']]', '03-1234-5678', 'test@example.com',
+         '株式会社テスト', '生年月日', '1990年1月1日', '様', 'さん', 'の', 'abc', '東京都千代田区1-1']
+
+
+class TestAlignment:
+    """位置の対応のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.masker = PersonalInfoMasker(use_nlp=False)
+
+    def assert_consistent(self, text, masked_text, alignment):
+        # 区間が両方のテキストを隙間なく覆い、書き換えていない区間は元のテキストと一致すること
+        masked_position = orig_position = 0
+        for span in alignment.spans:
+            assert (span.orig_start, span.masked_start) == (orig_position, masked_position)
+            if not span.changed:
+                assert text[span.orig_start:span.orig_end] == masked_text[span.masked_start:span.masked_end]
+            orig_position, masked_position = span.orig_end, span.masked_end
+        assert (orig_position, masked_position) == (len(text), len(masked_text))
+
+    def test_random_texts_are_aligned(self):
+        """後処理を含むすべての書き換えで対応が保たれ、マスキング結果は変わらないこと"""
+        generator = random.Random(1)
+        for _ in range(500):
+            text = ''.join(generator.choice(PARTS) for _ in range(generator.randint(0, 12)))
+            masked_text, detections, alignment = self.masker.mask_aligned(text)
+            assert (masked_text, detections) == self.masker.mask_spans(text)
+            self.assert_consistent(text, masked_text, alignment)
+            # 検出した値はマスキング後の書き換えた区間に対応する
+            for detection in detections:
+                start, end = alignment.to_masked(detection.start, detection.end)
+                if start < end:
+                    orig_start, orig_end = alignment.to_original(start, end)
+                    assert orig_start <= detection.start and detection.end <= orig_end
+
+    def test_postprocessing_rules_are_tracked(self):
+        """空白の集約・語尾の削除で位置がずれても、置換した範囲と後続のテキストの対応が正しいこと"""
+        text = '担当は山田太郎さんです。\n\n電話は 03-1234-5678  です。'
+        masked_text, detections, alignment = self.masker.mask_aligned(text)
+        self.assert_consistent(text, masked_text, alignment)
+        phone = next(detection for detection in detections if detection.text(text) == '03-1234-5678')
+        start, end = alignment.to_masked(phone.start, phone.end)
+        assert masked_text[start:end] == self.masker.replacements['phone']
+        tail = text.rindex('です。')
+        assert alignment.to_masked(tail, len(text)) == (len(masked_text) - 3, len(masked_text))
+
+        masked_text, _, alignment = self.masker.mask_aligned('03-1234-5678')
+        assert [tuple(span) for span in alignment.spans] == [(0, 12, 0, len(masked_text), True)]
+
+    def test_nested_edits_expand_to_changed_span(self):
+        """書き換え済みの区間の途中を書き換える場合は区間全体を1つの書き換えとして扱うこと"""
+        text = 'a[bc]d'
+        alignment = Alignment(len(text))
+        masked_text = alignment.apply(text, [(2, 4, '[X]')])
+        assert masked_text == 'a[[X]]d'
+        masked_text = alignment.apply(masked_text, [(3, 4, 'YY')])
+        assert masked_text == 'a[[YY]]d'
+        assert alignment.changes() == [AlignedSpan(2, 4, 2, 6, True)]
+
+        masked_text = substitute(DOUBLE_BRACKET_PATTERN, r'[\1]', masked_text, alignment)
+        assert masked_text == 'a[YY]d'
+        self.assert_consistent(text, masked_text, alignment)
+        assert alignment.to_original(0, 2) == (0, 2)
+        assert alignment.to_original(2, 4) == (2, 4)
+        assert alignment.to_masked(4, 6) == (4, 6)
+
+    def test_output_column(self, tmp_path):
+        """--alignment の出力は既存のカラムを変えずに位置の対応のカラムを追加し、ワーカー数によらず同じこと"""
+        input_file = str(project_root / 'tests' / 'test_data.csv')
+        expected = tmp_path / 'expected.csv'
+        CSVPipeline(input_file, str(expected), 'inquiry_text', masker=self.masker, chunk_rows=2).run()
+
+        outputs = []
+        for workers in (1, 2):
+            output_file = tmp_path / f"aligned_{workers}.csv"
+            CSVPipeline(input_file, str(output_file), 'inquiry_text', masker=self.masker, workers=workers,
+                        chunk_rows=2, use_nlp=False, alignment=True).run()
+            outputs.append(output_file.read_bytes())
+        batch_file = tmp_path / 'batch.csv'
+        summary = process_files([(input_file, str(batch_file))], 'inquiry_text', use_nlp=False, workers=2,
+                                chunk_rows=2, alignment=True)
+        assert summary['succeeded'] == 1
+        outputs.append(batch_file.read_bytes())
+        assert outputs[0] == outputs[1] == outputs[2]
+
+        df = pd.read_csv(tmp_path / 'aligned_1.csv', keep_default_na=False)
+        assert df.drop(columns=[ALIGNMENT_COLUMN]).equals(pd.read_csv(expected, keep_default_na=False))
+        for text, masked_text, spans in zip(df['inquiry_text'], df['masked_inquiry'], df[ALIGNMENT_COLUMN]):
+            # 書き換えた区間の間は元のテキストと一致する
+            orig_position = masked_position = 0
+            changes = json.loads(spans) + [[len(text), len(text), len(masked_text), len(masked_text)]]
+            for orig_start, orig_end, masked_start, masked_end in changes:
+                assert text[orig_position:orig_start] == masked_text[masked_position:masked_start]
+                orig_position, masked_position = orig_end, masked_end
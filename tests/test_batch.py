@@ -0,0 +1,107 @@
+"""
+一括マスキング処理のテスト
+"""
+import os
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+import src.batch as batch_module
+from src.masking import PersonalInfoMasker
+from src.quarantine import ErrorPolicy, QuarantineWriter
+from src.batch import mask_records, plan_tasks, process_files, EMPTY_COUNT
+from src.pipeline import CSVPipeline
+
+
+class TestBatch:
+    """一括マスキング処理のテストケース"""
+
+    def test_plan_tasks_splits_and_packs(self):
+        """大きなファイルは分割され、小さなファイルはまとめられること"""
+        tasks = plan_tasks([(0, 25), (1, 3), (2, 4), (3, 5)], 10)
+
+        assert tasks[:3] == [[(0, 0, 10)], [(0, 10, 20)], [(0, 20, 25)]]
+        assert tasks[3] == [(1, 0, 3), (2, 0, 4)]
+        assert tasks[4] == [(3, 0, 5)]
+
+    def test_mask_records_invalid_input(self):
+        """文字列以外の入力は空の結果になること"""
+        masker = PersonalInfoMasker(use_nlp=False)
+        masked_texts, masked_items, counts = mask_records(masker, ['example@test.comです。', float('nan')])
+
+        assert masked_texts == ['[メールアドレス]です。', '']
+        assert masked_items == ['email:example@test.com', '']
+        assert counts[1] == EMPTY_COUNT
+
+    def test_process_files(self, tmp_path):
+        """複数ファイルが処理され、行順が保たれること"""
+        jobs = []
+        for i, rows in enumerate([7, 2, 0]):
+            input_file = tmp_path / f"in{i}.csv"
+            texts = [f"連絡先はuser{n}@test.comです。" for n in range(rows)]
+            pd.DataFrame({'id': range(rows), 'text': texts}).to_csv(input_file, index=False)
+            jobs.append((str(input_file), str(tmp_path / f"out{i}.csv")))
+
+        summary = process_files(jobs, 'text', use_nlp=False, chunk_rows=3)
+
+        assert summary['succeeded'] == 3
+        assert summary['rows'] == 9
+        assert summary['counts']['email'] == 9
+        output = pd.read_csv(jobs[0][1])
+        assert output['id'].tolist() == list(range(7))
+        assert output['masked_items'].tolist() == [f"email:user{n}@test.com" for n in range(7)]
+
+    def test_process_files_matches_single_file_output(self, tmp_path):
+        """一括処理・チャンク単位の処理とも、1ファイルの処理と同じ読み込み方法で同じ出力になること"""
+        input_file = tmp_path / 'in.csv'
+        input_file.write_text('id,code,text\n007,NA,連絡先はuser@test.comです。\n010,,NA\n011,1.50,\n',
+                              encoding='utf-8')
+        expected = tmp_path / 'expected.csv'
+        CSVPipeline(str(input_file), str(expected), 'text', masker=PersonalInfoMasker(use_nlp=False)).run()
+
+        for stream_bytes in (1 << 30, 0):
+            output_file = tmp_path / f"out_{stream_bytes}.csv"
+            summary = process_files([(str(input_file), str(output_file))], 'text', use_nlp=False,
+                                    stream_bytes=stream_bytes)
+            assert summary['succeeded'] == 1
+            assert summary['rows'] == 3
+            assert summary['counts']['email'] == 1
+            assert output_file.read_bytes() == expected.read_bytes()
+        assert expected.read_text(encoding='utf-8').splitlines()[1].startswith('007,NA,')
+
+    def test_worker_crash_is_isolated(self, tmp_path, monkeypatch):
+        """ワーカープロセスが異常終了したタスクの行は代替出力で埋めて隔離し、残りのタスクは処理を続けること"""
+        parent = os.getpid()
+        mask_records = batch_module.mask_records
+
+        def crashing_mask_records(masker, texts, *args, **kwargs):
+            # ワーカープロセスでのみ、特定の文字列を含むタスクでプロセスごと異常終了する
+            if os.getpid() != parent and 'CRASH' in texts:
+                os._exit(1)
+            return mask_records(masker, texts, *args, **kwargs)
+
+        monkeypatch.setattr(batch_module, 'mask_records', crashing_mask_records)
+        jobs = []
+        for i, texts in enumerate([['連絡先はuser@test.comです。', 'CRASH'],
+                                   [f"電話は03-1111-{n:04d}です。" for n in range(5)]]):
+            input_file = tmp_path / f"in{i}.csv"
+            pd.DataFrame({'id': range(len(texts)), 'text': texts}).to_csv(input_file, index=False)
+            jobs.append((str(input_file), str(tmp_path / f"out{i}.csv")))
+        quarantine = QuarantineWriter(tmp_path / 'quarantine.csv')
+
+        summary = process_files(jobs, 'text', use_nlp=False, workers=2, chunk_rows=2, schedule='rows',
+                                policy=ErrorPolicy(), quarantine=quarantine)
+
+        assert summary['succeeded'] == 2
+        assert summary['rows'] == 7
+        assert pd.read_csv(jobs[0][1])['masked_inquiry'].tolist() == ['連絡先は[メールアドレス]です。', 'CRASH']
+        assert pd.read_csv(jobs[1][1])['masked_inquiry'].tolist() == ['電話は[電話番号]です。'] * 5
+        quarantined = pd.read_csv(quarantine.path)
+        assert {(jobs[0][0], 0), (jobs[0][0], 1)} <= set(zip(quarantined['source'], quarantined['row']))
+        assert quarantined['reason'].str.startswith('BrokenProcessPool').all()
+        assert summary['errors'] == quarantine.count
@@ -0,0 +1,67 @@
+"""
+チェックポイント管理のテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+from src.checkpoint import CheckpointManifest, hash_texts
+
+
+class TestCheckpointManifest:
+    """チェックポイントのマニフェストのテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.chunks = [pd.DataFrame({'text': [f"row{i}", f"row{i + 1}"]}) for i in range(0, 6, 2)]
+
+    def _manifest(self, tmp_path, chunk_rows=2):
+        input_file = tmp_path / 'input.csv'
+        if not input_file.exists():
+            input_file.write_text('text\n' + '\n'.join(f"row{i}" for i in range(6)) + '\n', encoding='utf-8')
+        return CheckpointManifest(tmp_path / 'out.csv.parts', str(input_file), 'text', chunk_rows)
+
+    def _commit(self, manifest, index):
+        chunk = self.chunks[index]
+        manifest.commit(index, index * 2, len(chunk), hash_texts(chunk['text']), chunk, header=(index == 0))
+
+    def test_resume_skips_committed_chunks(self, tmp_path):
+        """コミット済みのチャンクは再開時に処理済みと判定されること"""
+        manifest = self._manifest(tmp_path)
+        self._commit(manifest, 0)
+        self._commit(manifest, 1)
+
+        resumed = self._manifest(tmp_path)
+        assert resumed.load() == 2
+        assert resumed.is_done(0, 0, hash_texts(self.chunks[0]['text']))
+        assert resumed.is_done(1, 2, hash_texts(self.chunks[1]['text']))
+        assert not resumed.is_done(2, 4, hash_texts(self.chunks[2]['text']))
+        # 入力内容が変わったチャンクは再処理する
+        assert not resumed.is_done(1, 2, hash_texts(['changed']))
+
+        self._commit(resumed, 2)
+        output_file = tmp_path / 'out.csv'
+        resumed.assemble(str(output_file), 3)
+        assert pd.read_csv(output_file)['text'].tolist() == [f"row{i}" for i in range(6)]
+
+    def test_corrupted_part_is_reprocessed(self, tmp_path):
+        """部分ファイルが壊れている場合は処理済みと判定しないこと"""
+        manifest = self._manifest(tmp_path)
+        self._commit(manifest, 0)
+        manifest.part_path(0).write_text('broken', encoding='utf-8')
+
+        resumed = self._manifest(tmp_path)
+        resumed.load()
+        assert not resumed.is_done(0, 0, hash_texts(self.chunks[0]['text']))
+
+    def test_mismatched_settings_discard_manifest(self, tmp_path):
+        """チャンクサイズが異なる場合は記録を破棄すること"""
+        manifest = self._manifest(tmp_path)
+        self._commit(manifest, 0)
+
+        assert self._manifest(tmp_path, chunk_rows=3).load() == 0
@@ -0,0 +1,68 @@
+"""
+圧縮された入出力のテスト
+"""
+import sys
+import gzip
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from main import process_csv, default_output_path
+from src import compression
+from src.compression import open_input, open_output, zstd_frame_spans
+
+
+class TestCompression:
+    """圧縮された入出力のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.data = b''.join(f'{i},"電話番号は03-1234-{i % 10000:04d}です。"\n'.encode('utf-8') for i in range(20000))
+
+    def test_gzip_process_csv(self, tmp_path):
+        """gzip の入力を展開せずに処理し、出力も圧縮されること"""
+        plain = project_root / 'tests' / 'test_data.csv'
+        compressed = tmp_path / 'test_data.csv.gz'
+        compressed.write_bytes(gzip.compress(plain.read_bytes()))
+
+        reference = tmp_path / 'reference.csv'
+        output = tmp_path / 'masked.csv.gz'
+        assert process_csv(str(plain), str(reference), 'inquiry_text', use_nlp=False)
+        assert process_csv(str(compressed), str(output), 'inquiry_text', use_nlp=False)
+        assert gzip.decompress(output.read_bytes()) == reference.read_bytes()
+
+        assert default_output_path(str(compressed)).endswith('.csv.gz')
+        assert '_masked_' in default_output_path(str(compressed))
+
+    def test_zstd_multi_frame(self, tmp_path, monkeypatch):
+        """zstd の出力は複数フレームに分けられ、フレームごとに並列に展開できること"""
+        pytest.importorskip('zstandard')
+        monkeypatch.setattr(compression, 'STREAM_BLOCK_SIZE', 16 * 1024)
+        monkeypatch.setattr(compression, 'ZSTD_FRAME_SIZE', 64 * 1024)
+        path = tmp_path / 'data.csv.zst'
+        with open_output(str(path), threads=2) as f:
+            for start in range(0, len(self.data), 10000):
+                f.write(self.data[start:start + 10000])
+
+        spans = zstd_frame_spans(str(path))
+        assert len(spans) > 1
+        assert sum(length for _, length in spans) == path.stat().st_size
+        with open_input(str(path), threads=2) as f:
+            assert f.read() == self.data
+
+        # 途中で閉じても展開スレッドが終了すること
+        f = open_input(str(path), threads=2)
+        assert f.read(10) == self.data[:10]
+        f.close()
+
+    def test_decompression_error(self, tmp_path):
+        """壊れた入力の展開エラーが読み込み側に伝わること"""
+        path = tmp_path / 'broken.csv.gz'
+        path.write_bytes(gzip.compress(self.data)[:-100])
+        with pytest.raises(EOFError):
+            with open_input(str(path)) as f:
+                f.read()
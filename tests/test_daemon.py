@@ -0,0 +1,113 @@
+"""
+常駐ワーカーのテスト
+"""
+import sys
+import json
+import socket
+import threading
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.masking import PersonalInfoMasker
+from src.daemon import MaskingDaemon
+
+
+class TestMaskingDaemon:
+    """常駐ワーカーのテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.masker = PersonalInfoMasker(use_nlp=False)
+        self.jobs = []
+
+        def process_file(input_file, output_file, column):
+            self.jobs.append((input_file, output_file, column))
+            Path(output_file).write_text(Path(input_file).read_text(encoding='utf-8'), encoding='utf-8')
+            return True
+
+        self.daemon = MaskingDaemon(self.masker, process_file, poll_interval=0.01)
+
+    def test_handle_text_request(self):
+        """テキスト単体のリクエストがマスキングされること"""
+        response = self.daemon.handle_request({'text': 'メールアドレスはexample@test.comです。'})
+
+        assert response['ok']
+        assert response['masked_text'] == 'メールアドレスは[メールアドレス]です。'
+
+    def test_handle_invalid_request(self):
+        """必須項目が欠けたファイルリクエストはエラーを返すこと"""
+        response = self.daemon.handle_request({'input': 'a.csv'})
+
+        assert not response['ok']
+        assert self.jobs == []
+
+        # JSONオブジェクト以外のリクエストは内部のエラーを返さずに拒否する
+        response = self.daemon.handle_request(['input', 'a.csv'])
+        assert response == {'ok': False, 'error': 'リクエストはJSONオブジェクトで指定してください'}
+
+    def test_file_request_restricted_to_roots(self, tmp_path):
+        """ファイルのジョブは入力・出力のルートディレクトリの配下のパスのみ受け付けること"""
+        input_root = tmp_path / 'in'
+        output_root = tmp_path / 'out'
+        input_root.mkdir()
+        (input_root / 'a.csv').write_text('id,text\n1,test\n', encoding='utf-8')
+        (tmp_path / 'secret.csv').write_text('id,text\n1,secret\n', encoding='utf-8')
+        request = {'input': 'a.csv', 'output': 'a_masked.csv', 'column': 'text'}
+
+        # ルートディレクトリを設定していない場合はファイルのジョブを受け付けない
+        assert not self.daemon.handle_request(request)['ok']
+
+        daemon = MaskingDaemon(self.masker, self.daemon.process_file, input_root=str(input_root),
+                               output_root=str(output_root))
+        for rejected in ({'input': '../secret.csv'}, {'input': str(tmp_path / 'secret.csv')},
+                         {'output': '../a_masked.csv'}, {'output': str(input_root / 'a.csv')}):
+            assert not daemon.handle_request(dict(request, **rejected))['ok']
+        assert self.jobs == []
+
+        output_root.mkdir()
+        response = daemon.handle_request(request)
+        assert response == {'ok': True, 'output': str((output_root / 'a_masked.csv').resolve())}
+        assert self.jobs == [(str((input_root / 'a.csv').resolve()), response['output'], 'text')]
+
+    def test_watch_directory(self, tmp_path):
+        """監視ディレクトリに置いたファイルが処理され、processed/ に移動すること"""
+        input_dir = tmp_path / 'in'
+        output_dir = tmp_path / 'out'
+        input_dir.mkdir()
+        (input_dir / 'a.csv').write_text('id,text\n1,test\n', encoding='utf-8')
+        (input_dir / 'b.csv.gz').write_text('id,text\n1,test\n', encoding='utf-8')
+
+        def stop_when_done():
+            while len(self.jobs) < 2:
+                self.daemon.stop_event.wait(0.01)
+            self.daemon.stop()
+
+        threading.Thread(target=stop_when_done, daemon=True).start()
+        self.daemon.watch_directory(str(input_dir), str(output_dir), 'text')
+
+        # 圧縮されたCSVも処理し、出力ファイル名には日時を付ける
+        assert len(list(output_dir.glob('a_masked_*.csv'))) == 1
+        assert len(list(output_dir.glob('b_masked_*.csv.gz'))) == 1
+        assert (input_dir / 'processed' / 'a.csv').exists()
+        assert (input_dir / 'processed' / 'b.csv.gz').exists()
+        assert not (input_dir / 'a.csv').exists()
+
+    def test_socket_server(self):
+        """ソケット経由でJSON行のリクエストを処理できること"""
+        server = self.daemon.create_server('127.0.0.1', 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with socket.create_connection(server.server_address, timeout=5) as conn:
+                request = {'text': '電話番号は03-1234-5678です。'}
+                conn.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                response = json.loads(conn.makefile('rb').readline().decode('utf-8'))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response['ok']
+        assert '[電話番号]' in response['masked_text']
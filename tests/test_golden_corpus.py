@@ -0,0 +1,74 @@
+"""
+ゴールデンコーパスによる回帰チェックのテスト
+"""
+import json
+import random
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+from src.masking import PersonalInfoMasker
+from tools.check_golden_corpus import (DEFAULT_BASELINE, DEFAULT_CORPUS, DEFAULT_TOLERANCE,
+                                       evaluate, find_regressions, load_corpus, match_spans)
+from tools.generate_test_data import (GenerationOptions, generate_adversarial_sentence, generate_corpus,
+                                      generate_golden_corpus)
+
+
+class TestGoldenCorpus:
+    """ゴールデンコーパスのテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.baseline = json.loads(DEFAULT_BASELINE.read_text(encoding='utf-8'))
+
+    def test_match_spans(self):
+        """同じカテゴリで範囲が重なる検出のみを正解とし、1つの正解には1件のみ対応させること"""
+        expected = [('name', 0, 5), ('phone', 10, 22), ('email', 30, 40)]
+        predicted = [('name', 0, 7), ('name', 1, 4), ('address', 10, 22), ('email', 30, 40)]
+        true_positives, false_positives, false_negatives = match_spans(expected, predicted)
+        assert true_positives == {'name': 1, 'email': 1}
+        assert false_positives == {'name': 1, 'address': 1}
+        assert false_negatives == {'phone': 1}
+
+    def test_corpus_is_reproducible(self, tmp_path):
+        """同じ乱数の種から、登録済みのコーパスと同じ内容が生成されること"""
+        output_file = tmp_path / 'corpus.csv'
+        generate_golden_corpus(1000, 20250101, output_file)
+        assert output_file.read_bytes() == DEFAULT_CORPUS.read_bytes()
+
+    def test_generate_corpus_is_deterministic(self, tmp_path):
+        """並列生成の結果がワーカー数によらず同じで、追加した文があっても正解の範囲がずれないこと"""
+        options = GenerationOptions(with_spans=True, length_range=(150, 300), duplicate_ratio=0.2,
+                                    adversarial_ratio=0.2)
+        for workers in (1, 2):
+            assert generate_corpus(500, tmp_path / f"w{workers}.csv", seed=7, workers=workers,
+                                   chunk_rows=120, options=options) == 500
+        assert (tmp_path / 'w1.csv').read_bytes() == (tmp_path / 'w2.csv').read_bytes()
+
+        df = pd.read_csv(tmp_path / 'w1.csv')
+        assert df['id'].tolist() == list(range(1, 501))
+        assert df['inquiry_text'].str.len().min() >= 150
+        assert df['inquiry_text'].nunique() < len(df)
+        for text, name, spans in zip(df['inquiry_text'], df['customer_name'], df['spans']):
+            for category, start, end in json.loads(spans):
+                if category == 'name':
+                    assert text[start:end] == name
+
+    def test_adversarial_sentences_contain_no_pii(self):
+        """正規表現に負荷をかける文はどのパターンにも一致しないこと（正解の範囲に記録しないため）"""
+        masker = PersonalInfoMasker(use_nlp=False)
+        rng = random.Random(0)
+        for _ in range(200):
+            sentence = generate_adversarial_sentence(rng)
+            assert masker.mask_spans(sentence)[1] == []
+
+    def test_accuracy_matches_baseline(self):
+        """正規表現のみのマスキングの検出精度が基準値から低下していないこと（処理速度は比較しない）"""
+        result = evaluate(PersonalInfoMasker(use_nlp=False), load_corpus(DEFAULT_CORPUS), repeat=1)
+        tolerance = dict(DEFAULT_TOLERANCE, **self.baseline.get('tolerance', {}))
+        assert find_regressions(result, self.baseline['modes']['regex'], tolerance, check_throughput=False) == []
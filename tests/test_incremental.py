@@ -0,0 +1,124 @@
+"""
+差分処理（ウォーターマーク）のテスト
+"""
+import json
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+from main import process_csv, process_csv_incremental
+from src.masking import PersonalInfoMasker
+
+
+class CountingMasker(PersonalInfoMasker):
+    """マスキングした行数を数えるマスカー"""
+
+    def __init__(self):
+        super().__init__(use_nlp=False)
+        self.calls = 0
+
+    def mask_personal_info(self, text):
+        self.calls += 1
+        return super().mask_personal_info(text)
+
+
+class TestIncremental:
+    """差分処理のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.rows = [(i, f"電話番号は03-1234-{i:04d}です。") for i in range(5)]
+
+    def _write_input(self, path, rows):
+        pd.DataFrame(rows, columns=['id', 'text']).to_csv(path, index=False)
+
+    def test_appends_only_new_rows(self, tmp_path):
+        """2回目の実行では新しい行のみを処理し、結果が一括処理と一致すること"""
+        input_file = tmp_path / 'export.csv'
+        output_file = tmp_path / 'masked.csv'
+        self._write_input(input_file, self.rows)
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', use_nlp=False)
+
+        self._write_input(input_file, self.rows + [(5, 'メールはnew@example.comです。'), (6, '特になし')])
+        masker = CountingMasker()
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', masker=masker)
+        assert masker.calls == 2
+
+        single = tmp_path / 'single.csv'
+        assert process_csv(str(input_file), str(single), 'text', use_nlp=False)
+        assert output_file.read_bytes() == single.read_bytes()
+
+        # 変更がなければ何も処理しない
+        masker = CountingMasker()
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', masker=masker)
+        assert masker.calls == 0
+        assert output_file.read_bytes() == single.read_bytes()
+
+    def test_changed_rows_replace_old_results(self, tmp_path):
+        """ID を指定した場合、内容が変わった行の古い結果が置き換えられること"""
+        input_file = tmp_path / 'export.csv'
+        output_file = tmp_path / 'masked.csv'
+        self._write_input(input_file, self.rows)
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', id_column='id', use_nlp=False)
+
+        rows = list(self.rows)
+        rows[1] = (1, 'メールはchanged@example.comです。')
+        self._write_input(input_file, rows + [(5, '特になし')])
+        masker = CountingMasker()
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', id_column='id', masker=masker)
+        assert masker.calls == 2
+
+        df = pd.read_csv(output_file)
+        assert sorted(df['id']) == list(range(6))
+        assert df.loc[df['id'] == 1, 'masked_inquiry'].item() == 'メールは[メールアドレス]です。'
+
+    def test_delta_file(self, tmp_path):
+        """差分ファイルを指定した場合は処理した行のみを書き出すこと"""
+        input_file = tmp_path / 'export.csv'
+        watermark = tmp_path / 'export.watermark.json'
+        self._write_input(input_file, self.rows[:3])
+        assert process_csv_incremental(str(input_file), None, 'text', delta_file=str(tmp_path / 'day1.csv'),
+                                       watermark_file=str(watermark), use_nlp=False)
+
+        self._write_input(input_file, self.rows)
+        assert process_csv_incremental(str(input_file), None, 'text', delta_file=str(tmp_path / 'day2.csv'),
+                                       watermark_file=str(watermark), use_nlp=False)
+        assert pd.read_csv(tmp_path / 'day1.csv')['id'].tolist() == [0, 1, 2]
+        assert pd.read_csv(tmp_path / 'day2.csv')['id'].tolist() == [3, 4]
+
+    def test_interrupted_append_is_rolled_back(self, tmp_path):
+        """前回の追記が途中で止まっていた場合、前回完了時の状態に戻してから追記すること"""
+        input_file = tmp_path / 'export.csv'
+        output_file = tmp_path / 'masked.csv'
+        self._write_input(input_file, self.rows[:3])
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', use_nlp=False)
+        with open(output_file, 'a', encoding='utf-8') as f:
+            f.write('3,partial')
+
+        self._write_input(input_file, self.rows)
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', use_nlp=False)
+        assert pd.read_csv(output_file)['id'].tolist() == list(range(5))
+
+    def test_hash_mode_appends_changed_rows(self, tmp_path, caplog):
+        """ID を指定しない場合、変更された行は追記のみ行い、警告を出すこと（記録は今回の入力の行のみ）"""
+        input_file = tmp_path / 'export.csv'
+        output_file = tmp_path / 'masked.csv'
+        self._write_input(input_file, self.rows)
+        assert process_csv_incremental(str(input_file), str(output_file), 'text', use_nlp=False)
+
+        rows = list(self.rows)
+        rows[1] = (1, 'メールはchanged@example.comです。')
+        self._write_input(input_file, rows)
+        with caplog.at_level('WARNING'):
+            assert process_csv_incremental(str(input_file), str(output_file), 'text', use_nlp=False)
+        assert '前回処理した 1 行が今回の入力にありません' in caplog.text
+        assert pd.read_csv(output_file)['id'].tolist() == [0, 1, 2, 3, 4, 1]
+
+        # ウォーターマークには今回の入力の行のみが残る
+        watermark = json.loads((tmp_path / 'masked.csv.watermark.json').read_text(encoding='utf-8'))
+        assert len(watermark['hashes']) == len(rows)
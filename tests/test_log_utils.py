@@ -0,0 +1,135 @@
+"""
+ログ設定のテスト
+"""
+import sys
+import json
+import logging
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.log_utils import (JsonFormatter, RateLimitFilter, configure_worker_logging, setup_logging,
+                           shutdown_logging, worker_log_settings)
+
+
+def make_record(msg, level=logging.WARNING, lineno=10):
+    return logging.LogRecord('test', level, 'test.py', lineno, msg, None, None)
+
+
+def log_warnings(count):
+    # ワーカープロセスで同じ箇所から警告を出力する
+    logger = logging.getLogger('worker')
+    for index in range(count):
+        logger.warning(f"ワーカーの警告 {index}")
+
+
+class TestLogUtils:
+    """ログ設定のテストケース"""
+
+    def test_rate_limit_filter(self):
+        """同じ箇所からのログが上限件数で間引かれ、抑制件数が付記されること"""
+        log_filter = RateLimitFilter(limit=2, interval=0.05)
+
+        assert log_filter.filter(make_record('a'))
+        assert log_filter.filter(make_record('b'))
+        assert not log_filter.filter(make_record('c'))
+        # 別の箇所・INFO 以下・ERROR 以上は間引かない
+        assert log_filter.filter(make_record('d', lineno=11))
+        assert log_filter.filter(make_record('e', level=logging.ERROR))
+        assert all(log_filter.filter(make_record('info', level=logging.INFO)) for _ in range(5))
+
+        import time
+        time.sleep(0.06)
+        record = make_record('f')
+        assert log_filter.filter(record)
+        assert '1 件を抑制しました' in record.getMessage()
+
+    def test_suppressed_count_written_on_shutdown(self, tmp_path):
+        """同じ箇所から後続のログがない場合も、停止時に抑制件数を書き出すこと"""
+        log_file = tmp_path / 'test.log'
+        root_handlers = logging.root.handlers[:]
+        root_level = logging.root.level
+        try:
+            setup_logging(level='INFO', log_file=str(log_file), console=False)
+            logger = logging.getLogger('test')
+            for index in range(15):
+                logger.warning(f"行 {index} の警告")
+            for index in range(13):
+                logger.info(f"ファイル {index} を保存しました")
+            shutdown_logging()
+        finally:
+            for handler in logging.root.handlers[:]:
+                logging.root.removeHandler(handler)
+            for handler in root_handlers:
+                logging.root.addHandler(handler)
+            logging.root.setLevel(root_level)
+
+        content = log_file.read_text(encoding='utf-8')
+        assert content.count('の警告') == 10
+        assert content.count('を保存しました') == 13
+        assert '同じ箇所のログ 5 件を抑制しました' in content
+
+    def test_worker_logs_reach_parent_sink(self, tmp_path):
+        """ワーカープロセスのログが親プロセスのログファイル・形式・間引きの設定で書き出されること"""
+        log_file = tmp_path / 'test.log'
+        config = ConfigParser()
+        config.read_dict({'logging': {'format': 'json', 'rate_limit': '3'}})
+        root_handlers = logging.root.handlers[:]
+        root_level = logging.root.level
+        try:
+            setup_logging(config, level='INFO', log_file=str(log_file), console=False)
+            with ProcessPoolExecutor(max_workers=2, initializer=configure_worker_logging,
+                                     initargs=(worker_log_settings(),)) as executor:
+                list(executor.map(log_warnings, [4, 4]))
+            shutdown_logging()
+        finally:
+            for handler in logging.root.handlers[:]:
+                logging.root.removeHandler(handler)
+            for handler in root_handlers:
+                logging.root.addHandler(handler)
+            logging.root.setLevel(root_level)
+
+        entries = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+        messages = [entry['message'] for entry in entries]
+        # 2つのワーカーの同じ箇所からの警告を合わせて間引く
+        assert sum('ワーカーの警告' in message for message in messages) == 3
+        assert '同じ箇所のログ 5 件を抑制しました' in messages
+        assert all(entry['logger'] == 'worker' for entry in entries)
+
+    def test_json_formatter(self):
+        """JSON形式で出力されること"""
+        line = JsonFormatter().format(make_record('テスト'))
+        entry = json.loads(line)
+
+        assert entry['message'] == 'テスト'
+        assert entry['level'] == 'WARNING'
+
+    def test_setup_logging_writes_file(self, tmp_path):
+        """キュー経由でログファイルに書き込まれること"""
+        log_file = tmp_path / 'logs' / 'test.log'
+        root_handlers = logging.root.handlers[:]
+        root_level = logging.root.level
+        try:
+            setup_logging(level='INFO', log_file=str(log_file), console=False)
+            logging.getLogger('test').info('書き込みテスト')
+            shutdown_logging()
+        finally:
+            for handler in logging.root.handlers[:]:
+                logging.root.removeHandler(handler)
+            for handler in root_handlers:
+                logging.root.addHandler(handler)
+            logging.root.setLevel(root_level)
+
+        assert '書き込みテスト' in log_file.read_text(encoding='utf-8')
+
+    def test_library_import_does_not_configure_root_logger(self):
+        """ライブラリのインポートでルートロガーが設定されないこと"""
+        code = 'import logging, src.masking; print(len(logging.root.handlers))'
+        result = subprocess.run([sys.executable, '-c', code], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == '0'
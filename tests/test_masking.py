@@ -119,4 +119,26 @@ class TestPersonalInfoMasker:
 
         # カウント情報の確認
         count_result = count_masked_info(masked_items)
-        assert count_result["total"] >= 2
\ No newline at end of file
+        assert count_result["total"] >= 2
+    def test_enabled_categories(self):
+        """検出対象を絞った場合、対象外のカテゴリは検出されずNLPも省略されること"""
+        masker = PersonalInfoMasker(use_nlp=True, enabled_categories=['phone', 'email'])
+        text = "山田太郎です。電話番号は03-1234-5678、メールはexample@test.comです。"
+        masked_text, masked_items = masker.mask_personal_info(text)
+
+        assert not masker.use_nlp
+        assert "山田太郎" in masked_text
+        assert "[電話番号]" in masked_text
+        assert "[メールアドレス]" in masked_text
+        assert sorted(item.split(':')[0] for item in masked_items) == ['email', 'phone']
+
+    def test_mask_spans(self):
+        """mask_spans が範囲とカテゴリ番号のみを返し、mask_personal_info と同じ結果になること"""
+        text = "電話番号は03-1234-5678、メールはexample@test.comです。"
+        masked_text, detections = self.masker_no_nlp.mask_spans(text)
+
+        categories = self.masker_no_nlp.categories
+        items = [f"{d.category(categories)}:{d.text(text)}" for d in detections]
+        assert (masked_text, items) == self.masker_no_nlp.mask_personal_info(text)
+        assert [d.text(text) for d in detections] == ['example@test.com', '03-1234-5678']
+        assert all(isinstance(d.code, int) for d in detections)
@@ -0,0 +1,79 @@
+"""
+メモリ上限付きの実行のテスト
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from src.masking import PersonalInfoMasker
+from src.memory import MemoryMonitor, memory_pressure, parse_memory_size, process_rss
+from src.pipeline import CSVPipeline
+
+pytestmark = pytest.mark.skipif(process_rss(os.getpid()) is None, reason='/proc から RSS を取得できない環境')
+
+
+class TestMemoryMonitor:
+    """メモリの監視のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.monitor = MemoryMonitor(parse_memory_size('4G'))
+
+    def test_parse_memory_size(self):
+        """単位付きのメモリサイズをバイト数に変換し、不正な形式は拒否すること"""
+        assert parse_memory_size('4G') == 4 * 1024 ** 3
+        assert parse_memory_size('512m') == 512 * 1024 ** 2
+        assert parse_memory_size('1.5GiB') == int(1.5 * 1024 ** 3)
+        assert parse_memory_size('1024') == 1024
+        for value in ('', '4X', '-1G', '0'):
+            with pytest.raises(ValueError):
+                parse_memory_size(value)
+
+    def test_sample_includes_child_processes(self):
+        """子プロセスの RSS も合計に含め、ピーク値を記録すること"""
+        child = subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], stdin=subprocess.PIPE)
+        try:
+            total = self.monitor.sample()
+        finally:
+            child.communicate(b'')
+        stats = self.monitor.stats()
+        assert stats['peak_children'] > 0
+        assert total == stats['peak'] == stats['peak_self'] + stats['peak_children']
+        assert stats['pressure_events'] == 0
+
+    def test_pressure_limits_in_flight(self):
+        """上限に近づいた場合は処理中の数の上限を下げ、フラグを立てること"""
+        assert self.monitor.limit_in_flight(4) == 4
+        assert not self.monitor.should_wait(2, 4)
+
+        monitor = MemoryMonitor(1).start()
+        try:
+            assert memory_pressure()
+            assert monitor.limit_in_flight(4) == 1
+            assert monitor.should_wait(1, 4)
+            assert not monitor.should_wait(0, 4)
+            assert monitor.stats()['pressure_events'] == 1
+            assert monitor.stats()['throttled'] == 1
+        finally:
+            monitor.stop()
+        assert not memory_pressure()
+
+    def test_pipeline_output_unchanged_under_pressure(self, tmp_path):
+        """上限に近い状態で処理を抑制しても、出力が変わらないこと"""
+        input_file = str(project_root / 'tests' / 'test_data.csv')
+        expected = tmp_path / 'expected.csv'
+        throttled = tmp_path / 'throttled.csv'
+        CSVPipeline(input_file, str(expected), 'inquiry_text', masker=PersonalInfoMasker(use_nlp=False),
+                    chunk_rows=2).run()
+        with MemoryMonitor(1) as monitor:
+            CSVPipeline(input_file, str(throttled), 'inquiry_text', workers=2, chunk_rows=2, use_nlp=False,
+                        memory=monitor).run()
+        assert throttled.read_bytes() == expected.read_bytes()
+        assert monitor.stats()['pressure_events'] == 1
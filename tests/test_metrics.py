@@ -0,0 +1,93 @@
+"""
+メトリクスの公開のテスト
+"""
+import json
+import sys
+import urllib.request
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.batch import process_files
+from src.masking import PersonalInfoMasker
+from src.metrics import MetricsRegistry, MetricsServer, SnapshotWriter
+from src.pipeline import CSVPipeline
+
+
+class TestMetrics:
+    """メトリクスのテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.registry = MetricsRegistry()
+        self.input_file = str(project_root / 'tests' / 'test_data.csv')
+
+    def test_masker_stats(self):
+        """マスカーの統計に文字数・段ごとの処理時間・カテゴリごとの検出数が含まれること"""
+        masker = PersonalInfoMasker(use_nlp=False)
+        masker.take_stats()
+        text = '山田太郎です。電話番号は03-1234-5678、メールはtaro@example.comです。'
+        masker.mask_personal_info(text)
+        stats = masker.take_stats()
+        assert stats['chars'] == len(text)
+        assert stats['detections']['phone'] == 1
+        assert stats['detections']['email'] == 1
+        assert stats['seconds']['regex'] > 0
+        assert masker.take_stats()['chars'] == 0
+
+    def test_render_prometheus(self):
+        """Prometheus のテキスト形式で、ラベルの値はエスケープして出力すること"""
+        self.registry.inc('rows_total', 10)
+        self.registry.record_masker_stats({'chars': 120, 'detections': {'name': 2, 'phone': 1},
+                                           'seconds': {'regex': 0.5}, 'skipped': {}})
+        self.registry.set('queue_depth', 3, ('read',))
+        self.registry.inc('files_total', 1, ('fail"ed',))
+        lines = self.registry.render_prometheus().splitlines()
+        assert '# TYPE masking_rows_total counter' in lines
+        assert 'masking_rows_total 10' in lines
+        assert 'masking_chars_total 120' in lines
+        assert 'masking_detections_total{category="name"} 2' in lines
+        assert 'masking_stage_seconds_total{stage="regex"} 0.5' in lines
+        assert 'masking_queue_depth{queue="read"} 3' in lines
+        assert 'masking_files_total{result="fail\\"ed"} 1' in lines
+        assert 'masking_row_errors_total 0' in lines
+
+    def test_server_and_snapshot(self, tmp_path):
+        """HTTP エンドポイントと JSON スナップショットで同じ値が取得できること"""
+        self.registry.inc('rows_total', 5)
+        server = MetricsServer(self.registry, port=0).start()
+        try:
+            host, port = server.address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                assert 'masking_rows_total 5' in response.read().decode('utf-8')
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics.json") as response:
+                assert json.loads(response.read())['metrics']['rows_total'] == {'': 5}
+        finally:
+            server.stop()
+
+        writer = SnapshotWriter(self.registry, str(tmp_path / 'metrics.json'), interval=60).start()
+        self.registry.inc('rows_total', 5)
+        writer.stop()
+        snapshot = json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))
+        assert snapshot['metrics']['rows_total'] == {'': 10}
+        assert snapshot['rates']['rows_per_second'] > 0
+
+    def test_drivers_record_metrics(self, tmp_path):
+        """パイプライン（呼び出し元・ワーカープロセス）と一括処理で同じ行数・検出数が記録されること"""
+        registries = [MetricsRegistry() for _ in range(3)]
+        CSVPipeline(self.input_file, str(tmp_path / 'inline.csv'), 'inquiry_text',
+                    masker=PersonalInfoMasker(use_nlp=False), chunk_rows=3, metrics=registries[0]).run()
+        CSVPipeline(self.input_file, str(tmp_path / 'pooled.csv'), 'inquiry_text', workers=2, chunk_rows=3,
+                    use_nlp=False, metrics=registries[1]).run()
+        process_files([(self.input_file, str(tmp_path / 'batch.csv'))], 'inquiry_text', use_nlp=False,
+                      workers=2, metrics=registries[2])
+
+        snapshots = [registry.snapshot()['metrics'] for registry in registries]
+        for snapshot in snapshots:
+            assert snapshot['rows_total'] == snapshots[0]['rows_total']
+            assert snapshot['chars_total'] == snapshots[0]['chars_total']
+            assert snapshot['detections_total'] == snapshots[0]['detections_total']
+        assert snapshots[0]['detections_total']
+        assert snapshots[2]['files_total'] == {'result=succeeded': 1}
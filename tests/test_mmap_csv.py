@@ -0,0 +1,67 @@
+"""
+メモリマップによるCSV処理のテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+import pytest
+
+from main import process_csv, process_csv_mmap
+from src.mmap_csv import MappedCSV
+
+
+class TestMappedCSV:
+    """メモリマップによるCSV処理のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.content = (
+            '\ufeffid,"note, quoted",text,tail\r\n'
+            '1,"改行を\r\n含む ""メモ""",電話番号は03-1234-5678です。,a\r\n'
+            '\r\n'
+            '2,plain,"メールは a@example.com, です",\r\n'
+            '3,x,,"末尾\nの改行"'
+        )
+
+    def test_records(self, tmp_path):
+        """引用符内の区切り文字・改行を考慮して対象フィールドだけを取り出すこと"""
+        path = tmp_path / 'input.csv'
+        path.write_bytes(self.content.encode('utf-8'))
+
+        with MappedCSV(str(path)) as reader:
+            assert reader.columns == ['id', 'note, quoted', 'text', 'tail']
+            records = list(reader.records(2))
+            texts = [reader.field_text(record) for record in records]
+
+        assert texts == ['電話番号は03-1234-5678です。', 'メールは a@example.com, です', None]
+
+    def test_matches_pandas(self, tmp_path):
+        """問い合わせ文以外のカラムはそのまま残り、マスキング結果が pandas による処理と一致すること"""
+        path = tmp_path / 'input.csv'
+        path.write_bytes(self.content.encode('utf-8'))
+        mapped = tmp_path / 'mapped.csv'
+        reference = tmp_path / 'reference.csv'
+        assert process_csv_mmap(str(path), str(mapped), 'text', use_nlp=False, batch_rows=2)
+        assert process_csv(str(path), str(reference), 'text', use_nlp=False)
+
+        actual = pd.read_csv(mapped, encoding='utf-8-sig', keep_default_na=False)
+        expected = pd.read_csv(reference, keep_default_na=False)
+        # 出力のカラムは pandas による処理と同じ（元の問い合わせ文も残る）
+        pd.testing.assert_frame_equal(actual, expected)
+        # 元のレコードのバイト列（改行コードを含む）はコピーされる
+        assert mapped.read_bytes().count(b'\r\n') == self.content.count('\r\n') - 1
+
+    def test_missing_column(self, tmp_path):
+        """対象カラムがないレコードはエラーになること"""
+        path = tmp_path / 'input.csv'
+        path.write_text('id,text\n1\n', encoding='utf-8')
+        with MappedCSV(str(path)) as reader:
+            with pytest.raises(ValueError):
+                list(reader.records(1))
+        assert not process_csv_mmap(str(path), str(tmp_path / 'out.csv'), 'text', use_nlp=False)
+        assert not (tmp_path / 'out.csv').exists()
@@ -0,0 +1,46 @@
+"""
+NLPユーティリティのテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.nlp_utils import segment_text
+
+
+class TestSegmentText:
+    """長文分割のテストケース"""
+
+    def test_short_text_is_not_split(self):
+        """閾値以下のテキストは分割されないこと"""
+        assert segment_text('短い文。', max_chars=10) == [(0, 0, 4, '短い文。')]
+
+    def test_segments_cover_text_with_overlap(self):
+        """セグメントが重なりを持ちつつテキスト全体を覆うこと"""
+        text = ''.join(f"これは{i:03d}番目の文です。" for i in range(100))
+        segments = segment_text(text, max_chars=200, overlap=20)
+
+        assert len(segments) > 1
+        for offset, _, _, segment in segments:
+            assert len(segment) <= 200
+            assert text[offset:offset + len(segment)] == segment
+        # 文末で区切られていること
+        assert all(segment.endswith('。') for _, _, _, segment in segments)
+        # 隣り合うセグメントが重なっていること
+        for (offset, _, _, segment), (next_offset, _, _, _) in zip(segments, segments[1:]):
+            assert next_offset < offset + len(segment)
+
+    def test_owned_ranges_partition_text(self):
+        """各セグメントの担当範囲が重複なくテキスト全体を分割すること"""
+        text = 'あ' * 1000
+        segments = segment_text(text, max_chars=128, overlap=16)
+
+        assert segments[0][1] == 0
+        assert segments[-1][2] == len(text)
+        for (_, _, own_end, _), (_, next_own_start, _, _) in zip(segments, segments[1:]):
+            assert own_end == next_own_start
+        for offset, own_start, own_end, segment in segments:
+            assert offset <= own_start < own_end <= offset + len(segment)
@@ -0,0 +1,52 @@
+"""
+正規化処理のテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.masking import PersonalInfoMasker
+from src.normalize import normalize_text
+
+
+class TestNormalize:
+    """正規化処理のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.masker = PersonalInfoMasker(use_nlp=False)
+
+    def test_one_to_one_has_no_offset_map(self):
+        """1文字ずつ変換されるだけの場合はオフセットマップを作成しないこと"""
+        normalized, offset_map = normalize_text('電話０９０ー１２３４－５６７８、メールｙａｍａｄａ＠ｅｘａｍｐｌｅ．ｃｏｍ、ルーシー')
+        assert normalized == '電話090-1234-5678、メールyamada@example.com、ルーシー'
+        assert offset_map is None
+
+    def test_offset_map(self):
+        """文字数が変わる場合、正規化後の範囲を元のテキストの範囲に戻せること"""
+        text = '㈱ｶﾞｽ 090‐1234‐5678'
+        normalized, offset_map = normalize_text(text)
+        assert normalized == '(株)ガス 090-1234-5678'
+
+        start = normalized.index('090')
+        assert text[offset_map.start(start):offset_map.end(len(normalized))] == '090‐1234‐5678'
+        # 変換された文字の途中の位置は、その文字全体に広げる
+        assert text[offset_map.start(1):offset_map.end(2)] == '㈱'
+        assert text[offset_map.start(3):offset_map.end(4)] == 'ｶﾞ'
+
+    def test_masking_uses_normalized_text(self):
+        """全角の電話番号・メールアドレスを検出し、元のテキストを置換すること"""
+        masked_text, masked_items = self.masker.mask_personal_info('ｶﾞｽの件、０９０ー１２３４ー５６７８かｔｅｓｔ＠ｅｘａｍｐｌｅ．ｃｏｍへ')
+        assert masked_text == 'ｶﾞｽの件、[電話番号]か[メールアドレス]へ'
+        assert sorted(masked_items) == ['email:ｔｅｓｔ＠ｅｘａｍｐｌｅ．ｃｏｍ', 'phone:０９０ー１２３４ー５６７８']
+
+        unnormalized = PersonalInfoMasker(use_nlp=False, normalize=False)
+        assert unnormalized.mask_personal_info('０９０ー１２３４ー５６７８')[1] == []
+        # 正規化しない場合も、全角数字の住所・㈱（株）の企業名はパターン自体で検出する
+        text = 'テスト㈱とテスト（株）、東京都千代田区１２番地'
+        assert unnormalized.mask_personal_info(text)[0] == self.masker.mask_personal_info(text)[0]
+        assert '[住所]' in unnormalized.mask_personal_info(text)[0]
+        assert unnormalized.mask_personal_info(text)[0].count('[企業情報]') == 2
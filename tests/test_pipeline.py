@@ -0,0 +1,159 @@
+"""
+パイプライン処理のテスト
+"""
+import os
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+import pytest
+
+import src.batch as batch_module
+from src.masking import PersonalInfoMasker
+from src.pipeline import CSVPipeline
+from src.quarantine import ErrorPolicy, QuarantineWriter
+
+
+class FailingMasker(PersonalInfoMasker):
+    """特定の文字列を含む行で例外を送出するマスキング処理"""
+
+    def mask_personal_info(self, text):
+        if 'FAIL' in text:
+            raise RuntimeError('テスト用の失敗')
+        return super().mask_personal_info(text)
+
+
+class TestCSVPipeline:
+    """パイプライン処理のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.input_file = str(project_root / 'tests' / 'test_data.csv')
+        self.masker = PersonalInfoMasker(use_nlp=False)
+
+    def test_workers_match_inline(self, tmp_path):
+        """ワーカープロセスで処理した結果が、呼び出し元で処理した結果と入力順で一致すること"""
+        inline = tmp_path / 'inline.csv'
+        pooled = tmp_path / 'pooled.csv'
+        rows = CSVPipeline(self.input_file, str(inline), 'inquiry_text', masker=self.masker, chunk_rows=3).run()
+        CSVPipeline(self.input_file, str(pooled), 'inquiry_text', workers=2, chunk_rows=3, use_nlp=False).run()
+
+        assert rows == len(pd.read_csv(self.input_file))
+        assert pooled.read_bytes() == inline.read_bytes()
+        assert pd.read_csv(inline).columns.tolist()[-3:] == ['masked_inquiry', 'masked_items', 'mask_count']
+
+    def test_output_file_mode(self, tmp_path):
+        """出力ファイルは umask に従った権限で作成し、既存のファイルの権限は引き継ぐこと"""
+        output_file = tmp_path / 'out.csv'
+        CSVPipeline(self.input_file, str(output_file), 'inquiry_text', masker=self.masker).run()
+        umask = os.umask(0)
+        os.umask(umask)
+        assert output_file.stat().st_mode & 0o777 == 0o666 & ~umask
+
+        output_file.chmod(0o640)
+        CSVPipeline(self.input_file, str(output_file), 'inquiry_text', masker=self.masker).run()
+        assert output_file.stat().st_mode & 0o777 == 0o640
+
+    def test_stage_stats(self, tmp_path):
+        """各段の処理行数・チャンク数・キューの深さを記録し、律速の段を報告すること"""
+        pipeline = CSVPipeline(self.input_file, str(tmp_path / 'out.csv'), 'inquiry_text',
+                               masker=self.masker, chunk_rows=2, queue_chunks=1)
+        rows = pipeline.run()
+
+        for stage in pipeline.stages:
+            assert stage.rows == rows
+            assert stage.chunks == (rows + 1) // 2
+        # キューの上限を超えてチャンクを保持しない
+        assert all(stage.depth_max <= 1 for stage in pipeline.stages)
+        report = pipeline.format_stats()
+        assert '入力キュー' in report
+        assert '律速: ' in report
+
+    def test_error_aborts_pipeline(self, tmp_path):
+        """いずれかの段で失敗した場合はパイプライン全体を停止し、出力ファイルを残さないこと"""
+        input_file = tmp_path / 'input.csv'
+        texts = [f'電話番号は03-1234-{index:04d}です' for index in range(20)]
+        texts[13] = 'FAIL'
+        pd.DataFrame({'inquiry_text': texts}).to_csv(input_file, index=False)
+        output_file = tmp_path / 'out.csv'
+
+        pipeline = CSVPipeline(str(input_file), str(output_file), 'inquiry_text',
+                               masker=FailingMasker(use_nlp=False), chunk_rows=2, queue_chunks=1)
+        with pytest.raises(RuntimeError):
+            pipeline.run()
+        assert not output_file.exists()
+        assert list(tmp_path.iterdir()) == [input_file]
+
+    def test_writer_error_aborts_inline_pipeline(self, tmp_path, monkeypatch):
+        """呼び出し元で処理する場合も、書き出しの失敗でマスキングの段が停止し、元の例外を送出すること"""
+        from contextlib import contextmanager
+
+        import src.pipeline as pipeline_module
+
+        class FailingOutput:
+            """ヘッダーの後の書き込みで失敗する出力"""
+
+            def __init__(self):
+                self.writes = 0
+
+            def write(self, data):
+                self.writes += 1
+                if self.writes > 1:
+                    raise OSError('テスト用の書き込み失敗')
+                return len(data)
+
+        @contextmanager
+        def failing_output(path, compression=None):
+            yield FailingOutput()
+
+        monkeypatch.setattr(pipeline_module, 'open_output', failing_output)
+        input_file = tmp_path / 'input.csv'
+        pd.DataFrame({'inquiry_text': [f'電話番号は03-1234-{index:04d}です' for index in range(40)]}).to_csv(
+            input_file, index=False)
+        pipeline = CSVPipeline(str(input_file), str(tmp_path / 'out.csv'), 'inquiry_text',
+                               masker=self.masker, chunk_rows=2, queue_chunks=1)
+        with pytest.raises(OSError):
+            pipeline.run()
+        assert [type(error) for error in pipeline._errors] == [OSError]
+        assert not (tmp_path / 'out.csv').exists()
+
+    def test_worker_crash_is_isolated(self, tmp_path, monkeypatch):
+        """ワーカープロセスが異常終了したタスクの行は代替出力で埋めて隔離し、ファイル全体は失敗させないこと"""
+        parent = os.getpid()
+        mask_records = batch_module.mask_records
+
+        def crashing_mask_records(masker, texts, *args, **kwargs):
+            # ワーカープロセスでのみ、特定の文字列を含むタスクでプロセスごと異常終了する
+            if os.getpid() != parent and 'CRASH' in texts:
+                os._exit(1)
+            return mask_records(masker, texts, *args, **kwargs)
+
+        monkeypatch.setattr(batch_module, 'mask_records', crashing_mask_records)
+        input_file = tmp_path / 'input.csv'
+        texts = [f'電話番号は03-1234-{index:04d}です' for index in range(20)]
+        texts[12] = 'CRASH'
+        pd.DataFrame({'inquiry_text': texts}).to_csv(input_file, index=False)
+        expected = tmp_path / 'expected.csv'
+        CSVPipeline(str(input_file), str(expected), 'inquiry_text', masker=self.masker, chunk_rows=5).run()
+
+        output_file = tmp_path / 'out.csv'
+        quarantine = QuarantineWriter(tmp_path / 'quarantine.csv')
+        pipeline = CSVPipeline(str(input_file), str(output_file), 'inquiry_text', workers=2, chunk_rows=5,
+                               schedule='rows', policy=ErrorPolicy(), quarantine=quarantine, use_nlp=False)
+        assert pipeline.run() == 20
+        # 正規表現のみの代替出力は use_nlp=False のマスキング結果と同じになる
+        assert output_file.read_bytes() == expected.read_bytes()
+        quarantined = pd.read_csv(quarantine.path)
+        assert {10, 11, 12, 13, 14} <= set(quarantined['row'])
+        assert quarantined['reason'].str.startswith('BrokenProcessPool').all()
+        assert pipeline.failures == quarantine.count
+
+    def test_missing_column(self, tmp_path):
+        """存在しないカラムを指定した場合は処理を始める前にエラーとすること"""
+        pipeline = CSVPipeline(self.input_file, str(tmp_path / 'out.csv'), 'no_such_column', masker=self.masker)
+        with pytest.raises(ValueError):
+            pipeline.run()
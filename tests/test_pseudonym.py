@@ -0,0 +1,115 @@
+"""
+仮名化のテスト
+"""
+import sys
+import pickle
+import re
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from src.masking import PersonalInfoMasker
+from src.pseudonym import Pseudonymizer
+
+
+class TestPseudonymizer:
+    """仮名化のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.pseudonymizer = Pseudonymizer(b'test-key', length=4, max_entries=3)
+        self.masker = PersonalInfoMasker(use_nlp=False, pseudonymizer=self.pseudonymizer)
+
+    def test_same_value_same_token(self):
+        """同じ値は問い合わせをまたいで同じ仮名になり、別の値・別の鍵では異なること"""
+        first, _ = self.masker.mask_personal_info('電話番号は03-1234-5678です。')
+        second, _ = self.masker.mask_personal_info('折り返しは03-1234-5678へ。')
+        other, _ = self.masker.mask_personal_info('電話番号は03-9999-0000です。')
+
+        token = re.search(r'\[電話番号_[0-9a-f]{4}\]', first).group(0)
+        assert token in second
+        assert token not in other
+        assert '03-1234-5678' not in first
+
+        other_key = PersonalInfoMasker(use_nlp=False, pseudonymizer=Pseudonymizer(b'other-key', length=4))
+        assert token not in other_key.mask_personal_info('電話番号は03-1234-5678です。')[0]
+
+    def test_postprocessing_handles_tokens(self):
+        """仮名にも後処理（同じ仮名の連続をまとめる処理）が適用されること"""
+        masked_text, masked_items = self.masker.mask_personal_info('山田太郎様山田太郎様')
+        assert re.fullmatch(r'\[氏名_[0-9a-f]{4}\]', masked_text)
+        assert len(masked_items) == 2
+
+    def test_name_variants_same_token(self):
+        """敬称・語尾・自己紹介の表現や区切りが違っても、同じ人物・番号は同じ仮名になること"""
+        tokens = {
+            re.search(r'\[氏名_[0-9a-f]{4}\]', self.masker.mask_personal_info(text)[0]).group(0)
+            for text in ('山田太郎です。', '私は山田太郎と申します。', '山田太郎様', '山田 太郎です。')
+        }
+        assert len(tokens) == 1
+        assert self.pseudonymizer.token('phone', '[電話番号]', '03-1234-5678') == \
+            self.pseudonymizer.token('phone', '[電話番号]', '0312345678')
+        assert self.pseudonymizer.token('name', '[氏名]', '山田様') != \
+            self.pseudonymizer.token('name', '[氏名]', '田中様')
+
+    def test_bounded_table(self):
+        """テーブルは上限件数を超えると古いものから破棄され、再計算しても同じ仮名になること"""
+        tokens = [self.pseudonymizer.token('phone', '[電話番号]', f"03-0000-000{i}") for i in range(5)]
+        assert len(self.pseudonymizer) == 3
+        assert self.pseudonymizer.token('phone', '[電話番号]', '03-0000-0000') == tokens[0]
+        assert self.pseudonymizer.misses == 6
+
+    def test_pickle_and_merge(self, tmp_path):
+        """ワーカーへ渡したテーブルを結合・保存・読み込みできること"""
+        self.pseudonymizer.token('email', '[メールアドレス]', 'a@example.com')
+        worker = pickle.loads(pickle.dumps(self.pseudonymizer))
+        assert worker.token('email', '[メールアドレス]', 'a@example.com') == \
+            self.pseudonymizer.token('email', '[メールアドレス]', 'a@example.com')
+        worker.token('email', '[メールアドレス]', 'b@example.com')
+
+        merged = Pseudonymizer(b'test-key', length=4)
+        merged.merge(worker)
+        assert len(merged) == 2
+
+        table = tmp_path / 'table.json'
+        table.write_text('{}', encoding='utf-8')
+        table.chmod(0o644)
+        merged.save(str(table))
+        assert 'test-key' not in table.read_text(encoding='utf-8')
+        # 元の値を含むため、既存のファイルの権限によらず所有者のみが読み書きできる
+        assert table.stat().st_mode & 0o777 == 0o600
+        loaded = Pseudonymizer(b'test-key', length=4)
+        loaded.load(str(table))
+        assert loaded.export() == merged.export()
+
+        with pytest.raises(ValueError):
+            Pseudonymizer(b'other-key', length=4).load(str(table))
+
+    def test_parallel_run_collects_worker_tables(self, tmp_path):
+        """ワーカープロセスで作成した仮名が、親プロセスのテーブルに集まること"""
+        from src.batch import process_files
+        from src.pipeline import CSVPipeline
+
+        input_file = str(project_root / 'tests' / 'test_data.csv')
+        inline = Pseudonymizer(b'test-key', length=4)
+        CSVPipeline(input_file, str(tmp_path / 'inline.csv'), 'inquiry_text',
+                    masker=PersonalInfoMasker(use_nlp=False, pseudonymizer=inline)).run()
+        assert len(inline) > 0
+
+        pooled = Pseudonymizer(b'test-key', length=4)
+        pooled.record_new()
+        CSVPipeline(input_file, str(tmp_path / 'pooled.csv'), 'inquiry_text', workers=2, chunk_rows=2,
+                    use_nlp=False, pseudonymizer=pooled).run()
+        assert sorted(pooled.export()) == sorted(inline.export())
+        assert (tmp_path / 'pooled.csv').read_bytes() == (tmp_path / 'inline.csv').read_bytes()
+
+        batch = Pseudonymizer(b'test-key', length=4)
+        batch.record_new()
+        summary = process_files([(input_file, str(tmp_path / 'batch.csv'))], 'inquiry_text', use_nlp=False,
+                                workers=2, chunk_rows=2, pseudonymizer=batch)
+        assert summary['succeeded'] == 1
+        assert sorted(batch.export()) == sorted(inline.export())
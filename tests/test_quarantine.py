@@ -0,0 +1,75 @@
+"""
+行単位の障害分離のテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from src.masking import PersonalInfoMasker
+from src.batch import mask_records
+from src.quarantine import ErrorPolicy, ErrorBudgetExceeded, QuarantineWriter, REDACTED_PLACEHOLDER
+
+
+class FlakyMasker(PersonalInfoMasker):
+    """'BAD' を含む行で例外を送出するマスカー"""
+
+    def mask_personal_info(self, text):
+        if 'BAD' in text:
+            raise ValueError('broken row')
+        return super().mask_personal_info(text)
+
+
+class TestRowIsolation:
+    """行単位の障害分離のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.masker = FlakyMasker(use_nlp=False)
+        self.texts = ['example@test.comです。', 'BAD example@test.com', '03-1234-5678です。']
+
+    def test_failed_row_uses_regex_fallback(self):
+        """失敗した行は正規表現のみで再処理され、残りの行は処理が続くこと"""
+        failures = []
+        masked_texts, _, _ = mask_records(self.masker, self.texts, policy=ErrorPolicy('regex'),
+                                          failures=failures, row_offset=10)
+
+        assert masked_texts == ['[メールアドレス]です。', 'BAD [メールアドレス]', '[電話番号]です。']
+        assert failures == [(11, 'ValueError: broken row', 'BAD example@test.com')]
+
+    def test_failed_row_redacted(self):
+        """redact の場合は全文が伏せられること"""
+        masked_texts, masked_items, _ = mask_records(self.masker, iter(self.texts), policy=ErrorPolicy('redact'))
+
+        assert masked_texts[1] == REDACTED_PLACEHOLDER
+        assert masked_items[1] == ''
+
+    def test_without_policy_raises(self):
+        """ポリシーを指定しない場合は例外がそのまま送出されること"""
+        with pytest.raises(ValueError):
+            mask_records(self.masker, self.texts)
+
+    def test_error_budget(self):
+        """失敗行数が上限を超えると中断されること"""
+        with pytest.raises(ErrorBudgetExceeded):
+            mask_records(self.masker, self.texts * 2, policy=ErrorPolicy(max_errors=1))
+
+        policy = ErrorPolicy(max_error_rate=0.01)
+        policy.check(5, 100)
+        with pytest.raises(ErrorBudgetExceeded):
+            policy.check(20, 1000)
+
+    def test_quarantine_writer(self, tmp_path):
+        """失敗した行が理由とともに隔離ファイルへ書き出されること"""
+        writer = QuarantineWriter(tmp_path / 'q.csv')
+        writer.write('in.csv', [(3, 'ValueError: broken row', 'BAD')])
+        writer.write('in.csv', [(7, 'ValueError: broken row', 'BAD, again')])
+
+        lines = (tmp_path / 'q.csv').read_text(encoding='utf-8').splitlines()
+        assert lines[0] == 'source,row,reason,text'
+        assert lines[2] == 'in.csv,7,ValueError: broken row,"BAD, again"'
+        assert writer.count == 2
@@ -0,0 +1,100 @@
+"""
+パターンレジストリのテスト
+"""
+import sys
+import pickle
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from src.config_utils import load_config
+from src.masking import PersonalInfoMasker
+from src.registry import PatternEngine, build_engine, get_default_engine
+
+
+class TestPatternRegistry:
+    """パターンレジストリのテストケース"""
+
+    def test_placeholders_from_config(self):
+        """config.ini のプレースホルダーが引用符なしで読み込まれること"""
+        engine = get_default_engine()
+
+        assert engine.replacements['name'] == '[氏名]'
+        assert engine.replacements['date'] == '[日付]'
+        assert engine.categories[0] == 'name'
+        assert engine.priorities['birthdate'] < engine.priorities['date']
+
+    def test_engine_is_immutable_and_picklable(self):
+        """エンジンは変更できず、pickle で同じ内容に復元できること"""
+        engine = build_engine()
+
+        with pytest.raises(AttributeError):
+            engine.patterns = {}
+        with pytest.raises(TypeError):
+            engine.replacements['name'] = 'x'
+
+        restored = pickle.loads(pickle.dumps(engine))
+        assert restored == engine
+        assert restored.patterns['email'].pattern == engine.patterns['email'].pattern
+
+    def test_disabled_categories_are_not_scanned(self):
+        """無効にしたカテゴリは走査対象から外れること"""
+        engine = build_engine(disabled=['email'])
+        masker = PersonalInfoMasker(use_nlp=False, engine=engine)
+
+        assert 'email' not in engine.patterns
+        assert 'email' not in engine.replacements
+        masked_text, masked_items = masker.mask_personal_info('example@test.comと03-1234-5678')
+        assert masked_text == 'example@test.comと[電話番号]'
+        assert masked_items == ['phone:03-1234-5678']
+
+    def test_unknown_category(self):
+        """存在しないカテゴリを指定するとエラーになること"""
+        with pytest.raises(ValueError):
+            build_engine(enabled=['unknown'])
+
+    def test_pattern_file(self, tmp_path):
+        """追加のパターン定義ファイルで上書き・追加できること"""
+        pattern_file = tmp_path / 'patterns.ini'
+        pattern_file.write_text(
+            '[email]\nplaceholder = "<EMAIL>"\n\n'
+            '[member_id]\npattern = MB-\\d{6}\nplaceholder = [会員番号]\n',
+            encoding='utf-8'
+        )
+        config = load_config(str(tmp_path / 'missing.ini'))
+        engine = build_engine(config, pattern_files=[str(pattern_file)])
+        masker = PersonalInfoMasker(use_nlp=False, engine=engine)
+
+        masked_text, masked_items = masker.mask_personal_info('会員番号MB-123456、example@test.com')
+        assert masked_text == '会員番号[会員番号]、<EMAIL>'
+        assert 'member_id:MB-123456' in masked_items
+        assert isinstance(engine, PatternEngine)
+
+    def test_anchors_skip_patterns(self, tmp_path):
+        """アンカーのないテキストではパターンを走査せず、結果はアンカーなしの場合と一致すること"""
+        import pandas as pd
+
+        engine = build_engine()
+        unanchored = PatternEngine(spec._replace(anchor='') for spec in engine.specs)
+        masker = PersonalInfoMasker(use_nlp=False, engine=engine)
+        reference = PersonalInfoMasker(use_nlp=False, engine=unanchored)
+
+        texts = pd.read_csv(project_root / 'tests' / 'advanced_test_data.csv')['inquiry_text'].tolist()
+        for text in texts + ['配送状況を教えてください。']:
+            assert masker.mask_personal_info(text) == reference.mask_personal_info(text)
+
+        stats = masker.take_stats()
+        assert stats['rows'] == len(texts) + 1
+        assert stats['skipped']['email'] >= 1
+        assert reference.take_stats()['skipped'] == {}
+
+        # パターンを上書きした場合、アンカーを指定しなければ既存のアンカーは使わない
+        pattern_file = tmp_path / 'patterns.ini'
+        pattern_file.write_text('[email]\npattern = [a-z]+＠[a-z.]+\n', encoding='utf-8')
+        overridden = build_engine(load_config(str(tmp_path / 'missing.ini')), pattern_files=[str(pattern_file)])
+        assert 'email' not in overridden.anchors
+        assert 'phone' in overridden.anchors
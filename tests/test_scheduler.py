@@ -0,0 +1,106 @@
+"""
+文字数に基づく適応的なタスク分割のテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+
+from src.batch import process_files
+from src.masking import PersonalInfoMasker
+from src.pipeline import CSVPipeline
+from src.scheduler import ROW_COST_CHARS, AdaptiveScheduler
+
+
+class TestAdaptiveScheduler:
+    """適応的なタスク分割のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.scheduler = AdaptiveScheduler(workers=2, initial_chars=1000, min_chars=100, max_chars=10000,
+                                           long_row_chars=500)
+
+    def test_long_rows_are_isolated_and_scheduled_first(self):
+        """長い行は長いものから先に単独のタスクになり、残りの行は漏れなく重複なくタスクに含まれること"""
+        file_lengths = [(0, [10] * 30 + [600] + [10] * 30), (1, [900] + [10] * 5)]
+        planned = list(self.scheduler.plan(file_lengths))
+
+        assert [task for task, _ in planned[:2]] == [[(1, 0, 1)], [(0, 30, 31)]]
+        assert planned[0][1] == 900 + ROW_COST_CHARS
+
+        covered = sorted((index, row) for task, _ in planned for index, start, stop in task
+                         for row in range(start, stop))
+        expected = sorted((index, row) for index, lengths in file_lengths for row in range(len(lengths)))
+        assert covered == expected
+        stats = self.scheduler.stats()
+        assert stats['tasks'] == len(planned)
+        assert stats['long_tasks'] == 2
+
+    def test_budget_follows_measured_latency(self):
+        """計測した処理速度から、目標時間で終わる文字数予算に調整されること（上限・下限あり）"""
+        self.scheduler.record(2000, 1.0)
+        assert self.scheduler.budget == 1000  # 2000 文字/秒 × 0.5 秒
+        # 処理速度は指数移動平均で平滑化する
+        self.scheduler.record(100, 1.0)
+        assert self.scheduler.budget == int((2000 + 0.3 * (100 - 2000)) * 0.5)
+        for _ in range(50):
+            self.scheduler.record(10, 1.0)
+        assert self.scheduler.budget == 100
+        for _ in range(50):
+            self.scheduler.record(1000000, 1.0)
+        assert self.scheduler.budget == 10000
+
+        stats = self.scheduler.stats()
+        assert stats['min_budget'] == 100
+        assert stats['max_budget'] == 10000
+        assert stats['adjustments'] >= 2
+
+    def test_split_respects_budget(self):
+        """連続した行が予算ごとの範囲に分割され、長い行は単独の範囲になること"""
+        ranges = self.scheduler.split([200] * 10 + [700] + [200] * 2)
+        assert [(start, stop) for start, stop, _ in ranges] == [(0, 4), (4, 8), (8, 10), (10, 11), (11, 13)]
+
+        # 残りの文字数が少ない場合は全ワーカーに行き渡るよう予算を小さくする
+        ranges = self.scheduler.split([200] * 10, remaining_chars=1000)
+        assert [(start, stop) for start, stop, _ in ranges] == [(start, start + 1) for start in range(10)]
+        assert self.scheduler.stats()['tail_tasks'] == 1
+
+    def test_pipeline_shrinks_tail_tasks(self, tmp_path):
+        """1ファイルの並列処理でも入力を読み終えた後のチャンクはタスクを小さくし、出力は変わらないこと"""
+        texts = ['山田太郎です。電話は03-1234-5678です。' * 10 for _ in range(400)]
+        input_file = tmp_path / 'input.csv'
+        pd.DataFrame({'id': range(400), 'inquiry_text': texts}).to_csv(input_file, index=False)
+        expected = tmp_path / 'expected.csv'
+        CSVPipeline(str(input_file), str(expected), 'inquiry_text', masker=PersonalInfoMasker(use_nlp=False),
+                    chunk_rows=50).run()
+
+        output_file = tmp_path / 'output.csv'
+        pipeline = CSVPipeline(str(input_file), str(output_file), 'inquiry_text', workers=2, chunk_rows=50,
+                               queue_chunks=1, use_nlp=False)
+        pipeline.scheduler = AdaptiveScheduler(workers=2, initial_chars=100000, min_chars=1000)
+        pipeline.run()
+        assert output_file.read_bytes() == expected.read_bytes()
+        assert pipeline.scheduler.stats()['tail_tasks'] > 0
+
+    def test_process_files_output_matches_rows_schedule(self, tmp_path):
+        """文字数で分割した場合も行数で分割した場合と同じ出力になり、判断の記録がサマリーに含まれること"""
+        texts = ['山田太郎です。電話は03-1234-5678です。' * (1000 if i % 7 == 0 else 1) for i in range(60)]
+        input_file = tmp_path / 'input.csv'
+        pd.DataFrame({'id': range(60), 'inquiry_text': texts}).to_csv(input_file, index=False)
+
+        outputs = {}
+        for schedule in ('adaptive', 'rows'):
+            output_file = tmp_path / f"{schedule}.csv"
+            summary = process_files([(str(input_file), str(output_file))], 'inquiry_text', use_nlp=False,
+                                    workers=2, chunk_rows=16, schedule=schedule)
+            assert summary['succeeded'] == 1
+            outputs[schedule] = output_file.read_bytes()
+            if schedule == 'adaptive':
+                assert summary['scheduler']['long_tasks'] == 9
+            else:
+                assert summary['scheduler'] is None
+        assert outputs['adaptive'] == outputs['rows']
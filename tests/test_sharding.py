@@ -0,0 +1,99 @@
+"""
+シャード分割・結合のテスト
+"""
+import sys
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+import pytest
+
+from main import process_csv
+from src.sharding import ShardManifest, find_record_boundaries
+
+
+class TestSharding:
+    """シャード分割・結合のテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        # 引用符で囲まれた改行を含む行を混ぜる
+        self.df = pd.DataFrame({
+            'id': list(range(20)),
+            'text': [f"電話番号は03-1234-{i:04d}です。\n続きの行" if i % 3 == 0 else f"row{i}"
+                     for i in range(20)],
+        })
+
+    def _input(self, tmp_path):
+        input_file = tmp_path / 'input.csv'
+        self.df.to_csv(input_file, index=False)
+        return input_file
+
+    def test_record_boundaries_skip_quoted_newlines(self, tmp_path):
+        """引用符内の改行はレコード境界とみなさないこと"""
+        input_file = tmp_path / 'quoted.csv'
+        input_file.write_bytes(b'a,b\n1,"x\ny"\n2,z\n')
+        assert find_record_boundaries(input_file, [1, 5, 6, 100]) == [4, 12, 12, 16]
+
+    def test_split_preserves_rows(self, tmp_path):
+        """分割したシャードを順に読むと元の行がそろうこと"""
+        manifest = ShardManifest(tmp_path / 'shards')
+        shards = manifest.split(str(self._input(tmp_path)), 4)
+
+        assert len(shards) == 4
+        frames = [pd.read_csv(manifest.input_path(i)) for i in range(4)]
+        assert all(len(frame) for frame in frames)
+        pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), self.df)
+
+    def test_merge_matches_single_run(self, tmp_path):
+        """各シャードを独立に処理して結合した結果が、一括処理の結果と一致すること"""
+        input_file = self._input(tmp_path)
+        ShardManifest(tmp_path / 'shards').split(str(input_file), 3)
+
+        # 各ノードはマニフェストを読み込んで自分のシャードのみを処理する
+        for index in range(3):
+            node = ShardManifest(tmp_path / 'shards').load()
+            node.verify_input(index)
+            assert process_csv(str(node.input_path(index)), str(node.output_path(index)), 'text', use_nlp=False)
+            node.mark_done(index)
+
+        merged = tmp_path / 'merged.csv'
+        ShardManifest(tmp_path / 'shards').load().merge(str(merged))
+
+        single = tmp_path / 'single.csv'
+        assert process_csv(str(input_file), str(single), 'text', use_nlp=False)
+        assert merged.read_bytes() == single.read_bytes()
+
+    def test_merge_requires_all_shards(self, tmp_path):
+        """未処理・出力が変更されたシャードがある場合は結合しないこと"""
+        manifest = ShardManifest(tmp_path / 'shards')
+        manifest.split(str(self._input(tmp_path)), 2)
+        assert process_csv(str(manifest.input_path(0)), str(manifest.output_path(0)), 'text', use_nlp=False)
+        manifest.mark_done(0)
+
+        with pytest.raises(RuntimeError, match='1: 未処理'):
+            manifest.merge(str(tmp_path / 'merged.csv'))
+
+        assert process_csv(str(manifest.input_path(1)), str(manifest.output_path(1)), 'text', use_nlp=False)
+        manifest.mark_done(1)
+        with open(manifest.output_path(0), 'a', encoding='utf-8') as f:
+            f.write('tampered\n')
+        with pytest.raises(RuntimeError, match='0: 出力ファイル'):
+            manifest.merge(str(tmp_path / 'merged.csv'))
+        assert not (tmp_path / 'merged.csv').exists()
+
+    def test_split_parquet(self, tmp_path):
+        """Parquet の入力を行範囲で分割し、CSVのシャードとして書き出すこと"""
+        pytest.importorskip('pyarrow')
+        input_file = tmp_path / 'input.parquet'
+        self.df.to_parquet(input_file, index=False)
+
+        manifest = ShardManifest(tmp_path / 'shards')
+        shards = manifest.split(str(input_file), 3)
+
+        assert [shard['row_end'] - shard['row_start'] for shard in shards] == [6, 7, 7]
+        frames = [pd.read_csv(manifest.input_path(i)) for i in range(3)]
+        pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), self.df)
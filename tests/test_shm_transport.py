@@ -0,0 +1,56 @@
+"""
+共有メモリによる受け渡しのテスト
+"""
+import sys
+from multiprocessing import shared_memory
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+
+from src.masking import PersonalInfoMasker
+from src.pipeline import CSVPipeline
+from src.shm_transport import SharedColumns, discard_columns, pack_columns, unpack_columns
+
+
+class TestSharedMemoryTransport:
+    """共有メモリによる受け渡しのテストケース"""
+
+    def setup_method(self):
+        """各テスト前に呼ばれる処理"""
+        self.columns = [
+            ['[氏名]です。電話は[電話番号]', '', 'カンマ, "引用符"\n改行'],
+            ['name:山田太郎,phone:03-1234-5678', '', ''],
+            ['氏名:1,電話番号:1', '', ''],
+        ]
+
+    def test_round_trip(self):
+        """共有メモリを経由した値が元の値と一致し、受け取った後はブロックが解放されること"""
+        shared = pack_columns(self.columns, 'shm')
+        assert isinstance(shared, SharedColumns)
+        assert unpack_columns(shared) == self.columns
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shared.name)
+        # 受け取り済みのブロックを解放しようとしても失敗しない
+        discard_columns(shared)
+
+    def test_fallback_to_pickle(self):
+        """区切り文字を含む値がある場合・pickle を指定した場合は、そのまま返すこと"""
+        columns = [['a\x00b', 'c'], ['', ''], ['', '']]
+        assert pack_columns(columns, 'shm') is columns
+        assert pack_columns(self.columns, 'pickle') is self.columns
+        assert unpack_columns(columns) is columns
+
+    def test_pipeline_with_shared_memory(self, tmp_path):
+        """ワーカープロセスから共有メモリで受け取った結果が、呼び出し元で処理した結果と一致すること"""
+        input_file = str(project_root / 'tests' / 'test_data.csv')
+        inline = tmp_path / 'inline.csv'
+        shared = tmp_path / 'shared.csv'
+        CSVPipeline(input_file, str(inline), 'inquiry_text', masker=PersonalInfoMasker(use_nlp=False),
+                    chunk_rows=3).run()
+        CSVPipeline(input_file, str(shared), 'inquiry_text', workers=2, chunk_rows=3, use_nlp=False,
+                    transport='shm').run()
+        assert shared.read_bytes() == inline.read_bytes()
@@ -0,0 +1,65 @@
+"""
+起動時間（インポート時間）のテスト
+"""
+import sys
+import subprocess
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# src.masking のインポートに許容する累積時間（マイクロ秒）
+IMPORT_BUDGET_US = 100000
+
+# ライブラリのインポート時に読み込まれてはならない重い依存関係
+HEAVY_MODULES = ('spacy', 'pandas', 'tqdm')
+
+
+def import_times(module):
+    """
+    python -X importtime でモジュールをインポートし、モジュールごとの累積時間を返す
+
+    Args:
+        module (str): インポートするモジュール名
+
+    Returns:
+        tuple: (モジュール名から累積時間（マイクロ秒）への辞書, 読み込まれたモジュール名の集合)
+    """
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=project_root, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # ヘッダー行
+    return times, set(result.stdout.split())
+
+
+class TestStartup:
+    """起動時間のテストケース"""
+
+    def test_masking_import_is_light(self):
+        """src.masking のインポートで重い依存関係が読み込まれないこと"""
+        _, modules = import_times('src.masking')
+        for name in HEAVY_MODULES:
+            assert name not in modules
+
+    def test_masking_import_time(self):
+        """src.masking のインポートが時間予算内に収まること"""
+        # 初回はディスクキャッシュや .pyc 作成の影響を受けるため、最良値で判定する
+        best = min(import_times('src.masking')[0]['src.masking'] for _ in range(3))
+        assert best < IMPORT_BUDGET_US, f"src.masking のインポートに {best / 1000:.1f}ms かかりました"
+
+    def test_main_import_is_light(self):
+        """main のインポート時点では pandas / tqdm / spaCy が読み込まれないこと"""
+        _, modules = import_times('main')
+        for name in HEAVY_MODULES:
+            assert name not in modules
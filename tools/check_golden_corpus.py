@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+ゴールデンコーパスによる検出精度・処理速度の回帰チェックスクリプト
+
+tools/generate_test_data.py --golden で生成したコーパス（乱数の種を固定し、
+個人情報を埋め込んだ範囲を正解として記録したもの）をマスキングし、
+カテゴリごとの適合率・再現率・F1 と処理速度（行/秒）を表示する。
+基準値ファイルと比較し、F1 または処理速度が許容範囲を超えて低下した場合は
+終了コード 1 で終了する。
+
+検出結果は、正解と同じカテゴリで範囲が重なる場合に正解とみなす（1つの正解に
+対応する検出は1件のみ）。マスキング後のテキスト全体のハッシュも表示し、
+基準値から出力が変わったかどうかを確認できるようにする。
+
+使い方:
+    python tools/check_golden_corpus.py [--nlp] [--update-baseline]
+"""
+import sys
+import argparse
+import hashlib
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+# プロジェクトのルートディレクトリをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+DEFAULT_CORPUS = project_root / 'tests' / 'golden_corpus.csv'
+DEFAULT_BASELINE = project_root / 'tests' / 'golden_baseline.json'
+
+# 許容する低下幅の既定値（F1 は差、処理速度は割合）
+DEFAULT_TOLERANCE = {'f1': 0.005, 'throughput': 0.2}
+
+
+def load_corpus(corpus_file):
+    """
+    ゴールデンコーパスを読み込む
+
+    Args:
+        corpus_file (str): コーパスのCSVファイルパス
+
+    Returns:
+        list: (問い合わせ文, (カテゴリ, 開始位置, 終了位置) のリスト) のリスト
+    """
+    import pandas as pd
+
+    df = pd.read_csv(corpus_file, dtype=str, keep_default_na=False)
+    return [(text, [tuple(span) for span in json.loads(spans)])
+            for text, spans in zip(df['inquiry_text'], df['spans'])]
+
+
+def match_spans(expected, predicted):
+    """
+    1行分の正解と検出結果を対応付ける
+
+    Args:
+        expected (list): 正解の (カテゴリ, 開始位置, 終了位置) のリスト
+        predicted (list): 検出結果の (カテゴリ, 開始位置, 終了位置) のリスト
+
+    Returns:
+        tuple: (カテゴリごとの正解数, 誤検出数, 検出漏れ数) の Counter
+    """
+    true_positives = Counter()
+    false_positives = Counter()
+    false_negatives = Counter()
+    unmatched = list(predicted)
+    for category, start, end in expected:
+        for index, (predicted_category, predicted_start, predicted_end) in enumerate(unmatched):
+            if predicted_category == category and predicted_start < end and start < predicted_end:
+                true_positives[category] += 1
+                del unmatched[index]
+                break
+        else:
+            false_negatives[category] += 1
+    for category, _, _ in unmatched:
+        false_positives[category] += 1
+    return true_positives, false_positives, false_negatives
+
+
+def compute_metrics(true_positives, false_positives, false_negatives):
+    """
+    カテゴリごとの適合率・再現率・F1 を計算する（全カテゴリの合計は 'all'）
+
+    Args:
+        true_positives (Counter): カテゴリごとの正解数
+        false_positives (Counter): カテゴリごとの誤検出数
+        false_negatives (Counter): カテゴリごとの検出漏れ数
+
+    Returns:
+        dict: カテゴリ名 → {'precision', 'recall', 'f1', 'support'}
+    """
+    categories = sorted(set(true_positives) | set(false_positives) | set(false_negatives))
+    totals = [Counter({'all': sum(counter.values())}) for counter in
+              (true_positives, false_positives, false_negatives)]
+    metrics = {}
+    for category, counters in [(category, (true_positives, false_positives, false_negatives))
+                               for category in categories] + [('all', totals)]:
+        tp, fp, fn = (counter[category] for counter in counters)
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        metrics[category] = {
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1': round(f1, 4),
+            'support': tp + fn,
+        }
+    return metrics
+
+
+def evaluate(masker, corpus, repeat=5):
+    """
+    コーパスをマスキングし、検出精度と処理速度を測る
+
+    Args:
+        masker (PersonalInfoMasker): マスキング処理のインスタンス
+        corpus (list): load_corpus の戻り値
+        repeat (int): 処理速度の計測回数（最も速い回を採用する）
+
+    Returns:
+        dict: {'rows', 'metrics', 'rows_per_second', 'digest'}
+    """
+    true_positives = Counter()
+    false_positives = Counter()
+    false_negatives = Counter()
+    digest = hashlib.sha256()
+    categories = masker.categories
+    for text, expected in corpus:
+        masked_text, detections = masker.mask_spans(text)
+        predicted = [(categories[code], start, end) for start, end, code in detections]
+        for total, counter in zip((true_positives, false_positives, false_negatives),
+                                  match_spans(expected, predicted)):
+            total.update(counter)
+        digest.update(masked_text.encode('utf-8') + b'\n')
+
+    # 処理速度は出力と同じ経路（mask_personal_info）で測る
+    texts = [text for text, _ in corpus]
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            masker.mask_personal_info(text)
+        best = min(best, time.perf_counter() - started)
+
+    return {
+        'rows': len(corpus),
+        'metrics': compute_metrics(true_positives, false_positives, false_negatives),
+        'rows_per_second': round(len(texts) / best, 1) if best > 0 else 0.0,
+        'digest': digest.hexdigest(),
+    }
+
+
+def find_regressions(result, baseline, tolerance, check_throughput=True):
+    """
+    基準値と比較し、許容範囲を超えて低下した項目を返す
+
+    Args:
+        result (dict): evaluate の戻り値
+        baseline (dict): 基準値（evaluate の戻り値と同じ形式）
+        tolerance (dict): {'f1': 許容するF1の低下幅, 'throughput': 許容する処理速度の低下率}
+        check_throughput (bool): 処理速度を比較するかどうか
+
+    Returns:
+        list: 低下した項目の説明のリスト（空の場合は回帰なし）
+    """
+    regressions = []
+    for category, expected in baseline['metrics'].items():
+        actual = result['metrics'].get(category, {'f1': 0.0})
+        if actual['f1'] < expected['f1'] - tolerance['f1']:
+            regressions.append(f"{category}: F1 が {expected['f1']:.4f} から {actual['f1']:.4f} に低下しました")
+    if check_throughput and baseline.get('rows_per_second'):
+        minimum = baseline['rows_per_second'] * (1 - tolerance['throughput'])
+        if result['rows_per_second'] < minimum:
+            regressions.append(f"処理速度が {baseline['rows_per_second']:,.0f} 行/秒から "
+                               f"{result['rows_per_second']:,.0f} 行/秒に低下しました")
+    return regressions
+
+
+def format_report(result, baseline=None):
+    """
+    評価結果を表示用の文字列に変換する
+
+    Args:
+        result (dict): evaluate の戻り値
+        baseline (dict): 基準値（指定した場合は F1 の差を併記する）
+
+    Returns:
+        str: フォーマットされた評価結果
+    """
+    lines = [f"{'カテゴリ':<12}{'適合率':>8}{'再現率':>8}{'F1':>8}{'件数':>8}"]
+    for category, metrics in result['metrics'].items():
+        line = (f"{category:<14}{metrics['precision']:>10.4f}{metrics['recall']:>10.4f}"
+                f"{metrics['f1']:>10.4f}{metrics['support']:>10}")
+        if baseline is not None and category in baseline['metrics']:
+            line += f"  (基準値との差 {metrics['f1'] - baseline['metrics'][category]['f1']:+.4f})"
+        lines.append(line)
+    lines.append(f"処理速度: {result['rows_per_second']:,.0f} 行/秒 ({result['rows']} 行)")
+    if baseline is not None:
+        changed = '変化なし' if result['digest'] == baseline.get('digest') else '変化あり'
+        lines.append(f"マスキング結果のハッシュ: {result['digest'][:16]} (基準値から{changed})")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ゴールデンコーパスによる検出精度・処理速度の回帰チェック')
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS), help='ゴールデンコーパスのファイルパス')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基準値ファイルパス')
+    parser.add_argument('--nlp', action='store_true', help='NLP処理を使用する（基準値は別に記録される）')
+    parser.add_argument('--repeat', type=int, default=5, help='処理速度の計測回数')
+    parser.add_argument('--f1-tolerance', type=float, help='許容するF1の低下幅（既定: 基準値ファイルの値）')
+    parser.add_argument('--throughput-tolerance', type=float, help='許容する処理速度の低下率（既定: 基準値ファイルの値）')
+    parser.add_argument('--skip-throughput', action='store_true', help='処理速度を比較しない（基準値と異なるマシンで実行する場合）')
+    parser.add_argument('--update-baseline', action='store_true', help='今回の結果で基準値を更新する')
+    args = parser.parse_args()
+
+    from src.masking import PersonalInfoMasker
+
+    mode = 'nlp' if args.nlp else 'regex'
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+    tolerance = dict(DEFAULT_TOLERANCE, **baselines.get('tolerance', {}))
+    if args.f1_tolerance is not None:
+        tolerance['f1'] = args.f1_tolerance
+    if args.throughput_tolerance is not None:
+        tolerance['throughput'] = args.throughput_tolerance
+
+    corpus = load_corpus(args.corpus)
+    result = evaluate(PersonalInfoMasker(use_nlp=args.nlp), corpus, repeat=args.repeat)
+    baseline = baselines.get('modes', {}).get(mode)
+    print(format_report(result, baseline))
+
+    if args.update_baseline:
+        baselines.setdefault('tolerance', DEFAULT_TOLERANCE)
+        baselines.setdefault('modes', {})[mode] = result
+        baseline_path.write_text(json.dumps(baselines, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"基準値を '{baseline_path}' に保存しました ({mode})")
+        return 0
+
+    if baseline is None:
+        print(f"'{baseline_path}' に {mode} の基準値がありません（--update-baseline で作成してください）")
+        return 1
+
+    regressions = find_regressions(result, baseline, tolerance, check_throughput=not args.skip_throughput)
+    if regressions:
+        print("\n回帰を検出しました:")
+        for regression in regressions:
+            print(f"- {regression}")
+        return 1
+    print("\n回帰はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,27 @@
 #!/usr/bin/env python3
 """
 大規模なテストデータを生成するスクリプト
+
+チャンクごとに乱数の種を決めて複数プロセスで並列に生成し、生成した順に
+CSV（.gz / .zst も可）または Parquet へ書き出す。チャンクの種は全体の種と
+チャンク番号だけで決まるため、ワーカー数を変えても同じデータが生成される。
+--spans を指定した場合は、問い合わせ文に埋め込んだ個人情報の位置（正解の範囲）を
+spans カラムにJSONで記録する。
+
+--golden を指定した場合は、正解の範囲を記録したゴールデンコーパスを出力する
+（tools/check_golden_corpus.py で使用）。
 """
 import sys
+import argparse
+import functools
+import json
+import string
 import pandas as pd
 import numpy as np
 import random
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
 
 # プロジェクトのルートディレクトリをパスに追加
 project_root = Path(__file__).parent.parent
@@ -68,48 +83,78 @@ inquiry_templates = [
     "{name}と申します。{date}に御社でお買い物をしました。返品したいのですが、手続きを教えてください。住所は{address}、メールは{email}です。"
 ]
 
-def generate_random_phone():
+# 問い合わせ文の長さを調整するための、個人情報を含まない文
+filler_sentences = [
+    "いつもお世話になっております。",
+    "ご確認のほどよろしくお願いいたします。",
+    "先日の件について追加で質問があります。",
+    "画面の表示が崩れてしまい、操作ができません。",
+    "ログイン後にエラーメッセージが表示されます。",
+    "お忙しいところ恐れ入りますが、ご対応をお願いします。",
+    "以前にも同様の問い合わせをしましたが、解決していません。",
+    "マニュアルを確認しましたが、該当する記載が見つかりませんでした。"
+]
+
+# 正規表現に負荷をかける文に使う漢字（氏名・住所の手がかりになる文字を含むが、敬称・番地・丁目・号・
+# 会社の種類など検出を完結させる文字は含めない。正解の範囲に記録しないため、検出されてはならない）
+adversarial_kanji = "東京都大阪府神奈川県市区町村佐藤鈴木高橋田中山本式殿生年月申言"
+
+# 正規表現に負荷をかける数字の並びに使う数字（0 を含めないことで電話番号として検出されないようにする）
+adversarial_digits = "123456789"
+
+# テンプレートのフィールドと、正解の範囲として記録するカテゴリの対応（age は個人情報として扱わない）
+FIELD_CATEGORIES = {
+    "name": "name",
+    "phone": "phone",
+    "email": "email",
+    "company": "company",
+    "address": "address",
+    "date": "date",
+    "birthdate": "birthdate",
+}
+
+def generate_random_phone(rng=random):
     """
     ランダムな電話番号を生成する
     """
-    format = random.choice(phone_formats)
+    format = rng.choice(phone_formats)
     phone = ""
     for c in format:
         if c == "X":
-            phone += str(random.randint(0, 9))
+            phone += str(rng.randint(0, 9))
         else:
             phone += c
     return phone
 
-def generate_random_email(name):
+def generate_random_email(name, rng=random):
     """
     ランダムなメールアドレスを生成する
     """
-    domain = random.choice(email_domains)
+    domain = rng.choice(email_domains)
     name_part = name.lower().replace(" ", ".").replace("　", ".")
 
     # ランダムに数字を追加
-    if random.random() > 0.5:
-        name_part += str(random.randint(1, 999))
+    if rng.random() > 0.5:
+        name_part += str(rng.randint(1, 999))
 
     return f"{name_part}@{domain}"
 
-def generate_random_address():
+def generate_random_address(rng=random):
     """
     ランダムな住所を生成する
     """
-    prefecture = random.choice(prefectures)
-    city = random.choice(cities)
-    chome = f"{random.randint(1, 10)}-{random.randint(1, 20)}-{random.randint(1, 15)}"
+    prefecture = rng.choice(prefectures)
+    city = rng.choice(cities)
+    chome = f"{rng.randint(1, 10)}-{rng.randint(1, 20)}-{rng.randint(1, 15)}"
     return f"{prefecture}{city}{chome}"
 
-def generate_random_date():
+def generate_random_date(rng=random):
     """
     ランダムな日付を生成する (2023-2025年)
     """
-    year = random.randint(2023, 2025)
-    month = random.randint(1, 12)
-    day = random.randint(1, 28)  # 簡易化のため28日まで
+    year = rng.randint(2023, 2025)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)  # 簡易化のため28日まで
 
     # 日付表記のバリエーション
     formats = [
@@ -118,15 +163,15 @@ def generate_random_date():
         f"{year}-{month}-{day}"
     ]
 
-    return random.choice(formats)
+    return rng.choice(formats)
 
-def generate_random_birthdate():
+def generate_random_birthdate(rng=random):
     """
     ランダムな生年月日を生成する (1960-2000年)
     """
-    year = random.randint(1960, 2000)
-    month = random.randint(1, 12)
-    day = random.randint(1, 28)  # 簡易化のため28日まで
+    year = rng.randint(1960, 2000)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)  # 簡易化のため28日まで
 
     # 日付表記のバリエーション
     formats = [
@@ -135,15 +180,263 @@ def generate_random_birthdate():
         f"{year}-{month}-{day}"
     ]
 
-    return random.choice(formats)
+    return rng.choice(formats)
+
+@functools.lru_cache(maxsize=None)
+def _parse_template(template):
+    # テンプレートの解析結果は使い回す
+    return tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(template))
+
+def format_with_spans(template, values):
+    """
+    テンプレートに値を埋め込み、個人情報を埋め込んだ範囲を記録する
+
+    Args:
+        template (str): 問い合わせ内容のテンプレート
+        values (dict): フィールド名と値の対応
+
+    Returns:
+        tuple: (問い合わせ文, (カテゴリ, 開始位置, 終了位置) のリスト)
+    """
+    pieces = []
+    spans = []
+    position = 0
+    for literal, field in _parse_template(template):
+        pieces.append(literal)
+        position += len(literal)
+        if field is None:
+            continue
+        value = str(values[field])
+        if field in FIELD_CATEGORIES:
+            spans.append((FIELD_CATEGORIES[field], position, position + len(value)))
+        pieces.append(value)
+        position += len(value)
+    return ''.join(pieces), spans
+
+def generate_record(record_id, rng=random):
+    """
+    1件分のテストデータを生成する
+
+    Args:
+        record_id (int): レコードID
+        rng (random.Random): 乱数生成器（省略時は random モジュールの共有の生成器）
+
+    Returns:
+        tuple: (レコードの辞書, 問い合わせ文の正解の範囲のリスト)
+    """
+    # 名前を生成
+    last_name = rng.choice(last_names)
+    first_name = rng.choice(first_names)
+    full_name = f"{last_name} {first_name}"
+
+    # 問い合わせカテゴリ
+    categories = ["アカウント", "商品", "決済", "返品", "サービス", "技術サポート", "その他"]
+    category = rng.choice(categories)
+
+    # 電話番号を生成
+    phone = generate_random_phone(rng)
+
+    # メールアドレスを生成
+    email = generate_random_email(full_name, rng)
+
+    # 企業名を生成
+    company = rng.choice(companies)
+
+    # 住所を生成
+    address = generate_random_address(rng)
+
+    # 日付を生成
+    date = generate_random_date(rng)
+
+    # 生年月日を生成
+    birthdate = generate_random_birthdate(rng)
+    age = 2025 - int(birthdate.split("年")[0] if "年" in birthdate else birthdate.split("/")[0].split("-")[0])
+
+    # テンプレートを選択して問い合わせ文を生成
+    template = rng.choice(inquiry_templates)
+    inquiry_text, spans = format_with_spans(template, {
+        "name": full_name,
+        "phone": phone,
+        "email": email,
+        "company": company,
+        "address": address,
+        "date": date,
+        "birthdate": birthdate,
+        "age": age
+    })
+
+    # 対応状況をランダムに選択
+    status = rng.choice(["対応済み", "対応中", "未対応"])
+
+    record = {
+        "id": record_id,
+        "problem_category": category,
+        "customer_name": full_name,
+        "inquiry_text": inquiry_text,
+        "response_status": status
+    }
+    return record, spans
+
+def generate_adversarial_sentence(rng=random):
+    """
+    正規表現に負荷をかける文（長い数字の並び・長い漢字の並びなど）を生成する
+
+    Args:
+        rng (random.Random): 乱数生成器
+
+    Returns:
+        str: 生成した文（どのパターンにも一致しない。正解の範囲には何も追加しない）
+    """
+    kind = rng.randrange(4)
+    if kind == 0:
+        # 区切りのない長い数字の並び
+        body = ''.join(rng.choice(adversarial_digits) for _ in range(rng.randint(50, 500)))
+    elif kind == 1:
+        # ハイフンでつないだ数字の並び（電話番号に似た形。日付にならないよう各区切りを3桁以上にする）
+        body = '-'.join(''.join(rng.choice(adversarial_digits) for _ in range(rng.randint(3, 4)))
+                        for _ in range(rng.randint(10, 100)))
+    elif kind == 2:
+        # 句読点のない長い漢字の並び
+        body = ''.join(rng.choice(adversarial_kanji) for _ in range(rng.randint(100, 1000)))
+    else:
+        # アンカーになる文字の繰り返し
+        body = rng.choice(["@", "株", "生", "-"]) * rng.randint(50, 300)
+    return body + "。"
+
+class GenerationOptions(NamedTuple):
+    """
+    テストデータの生成条件
+    """
+    with_spans: bool = False        # 正解の範囲を spans カラムに記録する
+    length_range: tuple = None      # 問い合わせ文の長さの (最小, 最大)。この範囲の長さまで個人情報を含まない文を追加する
+    duplicate_ratio: float = 0.0    # 同じチャンク内の既出の問い合わせ文を再利用する割合
+    adversarial_ratio: float = 0.0  # 正規表現に負荷をかける文を追加する割合
+
+def generate_chunk(seed, chunk_index, start_id, num_records, options=GenerationOptions()):
+    """
+    1チャンク分のテストデータを生成する
+
+    乱数の種は seed とチャンク番号から決めるため、どのプロセスで生成しても同じ結果になる。
+
+    Args:
+        seed (int): 全体の乱数の種
+        chunk_index (int): チャンク番号
+        start_id (int): 最初のレコードID
+        num_records (int): 生成するレコード数
+        options (GenerationOptions): 生成条件
+
+    Returns:
+        pd.DataFrame: 生成したデータフレーム
+    """
+    rng = random.Random(f"{seed}:{chunk_index}")
+    data = []
+    generated = []
+    for record_id in range(start_id, start_id + num_records):
+        if generated and options.duplicate_ratio and rng.random() < options.duplicate_ratio:
+            # 既出の問い合わせ文を ID だけ変えて再利用する
+            record, spans = rng.choice(generated)
+            record = dict(record, id=record_id)
+        else:
+            record, spans = generate_record(record_id, rng)
+            # 追加する文は末尾に付けるため、正解の範囲は変わらない
+            text = record["inquiry_text"]
+            if options.adversarial_ratio and rng.random() < options.adversarial_ratio:
+                text += generate_adversarial_sentence(rng)
+            if options.length_range:
+                target = rng.randint(*options.length_range)
+                while len(text) < target:
+                    text += rng.choice(filler_sentences)
+            record["inquiry_text"] = text
+            if options.duplicate_ratio:
+                generated.append((record, spans))
+
+        if options.with_spans:
+            record = dict(record, spans=json.dumps(spans))
+        data.append(record)
+    return pd.DataFrame(data)
+
+def _write_chunks(chunks, output_file):
+    """
+    生成したチャンクを順に出力ファイルへ書き出す（拡張子が .parquet の場合は Parquet）
+
+    Args:
+        chunks (iterable): pd.DataFrame のイテレーター
+        output_file (str): 出力ファイルパス
 
-def generate_large_test_data(num_records=50, output_file=None):
+    Returns:
+        int: 書き出した行数
+    """
+    total = 0
+    if str(output_file).endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet の出力には pyarrow が必要です（pip install pyarrow）") from e
+        writer = None
+        try:
+            for df in chunks:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(str(output_file), table.schema)
+                writer.write_table(table)
+                total += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return total
+
+    from src.compression import open_output
+    with open_output(str(output_file)) as out:
+        for df in chunks:
+            df.to_csv(out, header=(total == 0), index=False)
+            total += len(df)
+    return total
+
+def generate_corpus(num_records, output_file, seed=0, workers=1, chunk_rows=100000,
+                    options=GenerationOptions()):
+    """
+    テストデータをチャンク単位で並列に生成し、生成した順に出力ファイルへ書き出す
+
+    Args:
+        num_records (int): 生成するレコード数
+        output_file (str): 出力ファイルパス（.csv / .csv.gz / .csv.zst / .parquet）
+        seed (int): 乱数の種
+        workers (int): 生成に使うプロセス数
+        chunk_rows (int): 1チャンクのレコード数
+        options (GenerationOptions): 生成条件
+
+    Returns:
+        int: 書き出した行数
+    """
+    starts = list(range(0, num_records, chunk_rows))
+    args = [(seed, index, start + 1, min(chunk_rows, num_records - start), options)
+            for index, start in enumerate(starts)]
+
+    if workers <= 1:
+        return _write_chunks((generate_chunk(*arg) for arg in args), output_file)
+
+    def ordered_chunks(executor):
+        # 先行して生成するチャンク数を制限し、メモリに保持するチャンクを抑える
+        pending = []
+        for arg in args:
+            pending.append(executor.submit(generate_chunk, *arg))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _write_chunks(ordered_chunks(executor), output_file)
+
+def generate_large_test_data(num_records=50, output_file=None, with_spans=False):
     """
     大規模なテストデータを生成する
 
     Args:
         num_records (int): 生成するレコード数
         output_file (str): 出力ファイルパス
+        with_spans (bool): 正解の範囲を spans カラムにJSONで記録する
 
     Returns:
         pd.DataFrame: 生成したデータフレーム
@@ -153,58 +446,10 @@ def generate_large_test_data(num_records=50, output_file=None):
 
     # レコードを生成
     for i in range(1, num_records + 1):
-        # 名前を生成
-        last_name = random.choice(last_names)
-        first_name = random.choice(first_names)
-        full_name = f"{last_name} {first_name}"
-
-        # 問い合わせカテゴリ
-        categories = ["アカウント", "商品", "決済", "返品", "サービス", "技術サポート", "その他"]
-        category = random.choice(categories)
-
-        # 電話番号を生成
-        phone = generate_random_phone()
-
-        # メールアドレスを生成
-        email = generate_random_email(full_name)
-
-        # 企業名を生成
-        company = random.choice(companies)
-
-        # 住所を生成
-        address = generate_random_address()
-
-        # 日付を生成
-        date = generate_random_date()
-
-        # 生年月日を生成
-        birthdate = generate_random_birthdate()
-        age = 2025 - int(birthdate.split("年")[0] if "年" in birthdate else birthdate.split("/")[0].split("-")[0])
-
-        # テンプレートを選択して問い合わせ文を生成
-        template = random.choice(inquiry_templates)
-        inquiry_text = template.format(
-            name=full_name,
-            phone=phone,
-            email=email,
-            company=company,
-            address=address,
-            date=date,
-            birthdate=birthdate,
-            age=age
-        )
-
-        # 対応状況をランダムに選択
-        status = random.choice(["対応済み", "対応中", "未対応"])
-
-        # データに追加
-        data.append({
-            "id": i,
-            "problem_category": category,
-            "customer_name": full_name,
-            "inquiry_text": inquiry_text,
-            "response_status": status
-        })
+        record, spans = generate_record(i)
+        if with_spans:
+            record["spans"] = json.dumps(spans)
+        data.append(record)
 
     # データフレームを作成
     df = pd.DataFrame(data)
@@ -216,10 +461,73 @@ def generate_large_test_data(num_records=50, output_file=None):
 
     return df
 
+def generate_golden_corpus(num_records, seed, output_file):
+    """
+    正解の範囲を記録したゴールデンコーパスを生成する
+
+    乱数の種を固定するため、同じ引数からは常に同じコーパスが生成される。
+
+    Args:
+        num_records (int): 生成するレコード数
+        seed (int): 乱数の種
+        output_file (str): 出力ファイルパス
+
+    Returns:
+        pd.DataFrame: 生成したデータフレーム（spans カラムに正解の範囲をJSONで格納）
+    """
+    rng = random.Random(seed)
+    data = []
+    for i in range(1, num_records + 1):
+        record, spans = generate_record(i, rng)
+        data.append({
+            "id": record["id"],
+            "inquiry_text": record["inquiry_text"],
+            "spans": json.dumps(spans)
+        })
+
+    df = pd.DataFrame(data)
+    df.to_csv(output_file, index=False)
+    print(f"{num_records}件のゴールデンコーパス (seed={seed}) を '{output_file}' に出力しました。")
+    return df
+
+def parse_length_range(value):
+    """
+    --length-range の値（例: 100,2000）を解析する
+    """
+    minimum, maximum = (int(part) for part in value.split(','))
+    if not 0 < minimum <= maximum:
+        raise argparse.ArgumentTypeError('最小,最大 の形式で 0 < 最小 <= 最大 となるように指定してください')
+    return minimum, maximum
+
 if __name__ == "__main__":
     # 出力ファイルのパス（相対パス）
     current_dir = Path(__file__).parent.parent  # プロジェクトのルートディレクトリ
-    output_path = current_dir / "tests" / "large_test_data.csv"
 
-    # 100件のテストデータを生成
-    generate_large_test_data(100, output_path)
+    parser = argparse.ArgumentParser(description='テストデータ生成')
+    parser.add_argument('-o', '--output',
+                        help='出力ファイルパス（.csv / .csv.gz / .csv.zst / .parquet。既定: tests/large_test_data.csv、'
+                             '--golden の場合は tests/golden_corpus.csv）')
+    parser.add_argument('--rows', type=int, help='生成するレコード数（既定: 100、--golden の場合は 1000）')
+    parser.add_argument('--golden', action='store_true', help='正解の範囲を記録したゴールデンコーパスを生成する')
+    parser.add_argument('--seed', type=int, default=20250101, help='乱数の種')
+    parser.add_argument('--workers', type=int, default=1, help='生成に使うプロセス数')
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='1チャンクのレコード数')
+    parser.add_argument('--spans', action='store_true', help='正解の範囲を spans カラムに記録する')
+    parser.add_argument('--length-range', type=parse_length_range, metavar='MIN,MAX',
+                        help='問い合わせ文の長さの範囲（足りない分は個人情報を含まない文を追加する）')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0, help='既出の問い合わせ文を再利用する割合')
+    parser.add_argument('--adversarial-ratio', type=float, default=0.0,
+                        help='長い数字・漢字の並びなど、正規表現に負荷をかける文を追加する割合')
+    args = parser.parse_args()
+
+    if args.golden:
+        generate_golden_corpus(args.rows or 1000, args.seed,
+                               args.output or current_dir / "tests" / "golden_corpus.csv")
+    else:
+        num_records = args.rows or 100
+        output_file = args.output or current_dir / "tests" / "large_test_data.csv"
+        options = GenerationOptions(with_spans=args.spans, length_range=args.length_range,
+                                    duplicate_ratio=args.duplicate_ratio, adversarial_ratio=args.adversarial_ratio)
+        generate_corpus(num_records, output_file, seed=args.seed, workers=args.workers,
+                        chunk_rows=args.chunk_rows, options=options)
+        print(f"{num_records}件のテストデータを '{output_file}' に出力しました。")